@@ -0,0 +1,381 @@
+#!/usr/bin/env python
+''' Benchmark the stages of the specification, example and validation
+pipeline: time and peak memory (resident set size) of each stage.
+
+Each stage is run in a fresh interpreter, in a copy of the repository (the
+outputs written by the stages are discarded). Stages are benchmarked on the
+real ontology ("real" scenario) and, with --scale, on synthetic ontologies in
+which every NIDM-Results term is duplicated N times and with synthetic
+examples of about 1000xN peaks ("scaled-xN" scenarios). The synthetic_*
+stages validate and query the synthetic examples.
+
+The results are written as JSON (by default in .benchmarks/<commit>.json at
+the root of the repository) and can be compared with the results of another
+commit with --compare.
+
+Usage: python benchmarks/run_benchmarks.py [--stage STAGE ...]
+    [--scale N ...] [--repeat R] [--owl-cache] [--output FILE]
+    [--compare BASELINE]
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+
+import os
+import re
+import sys
+import json
+import shutil
+import timeit
+import argparse
+import platform
+import resource
+import datetime
+import tempfile
+import subprocess
+import collections
+
+RELPATH = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(RELPATH)
+RESULTS_DIR = os.path.join(REPO_ROOT, ".benchmarks")
+
+RESULTS_SCRIPTS = os.path.join("nidm", "nidm-results", "scripts")
+EXPE_SCRIPTS = os.path.join("nidm", "nidm-experiment", "scripts")
+RESULTS_OWL = os.path.join("nidm", "nidm-results", "terms", "nidm-results.owl")
+
+# Stage name -> description
+STAGES = collections.OrderedDict([
+    ("results_specification",
+     "create_results_specification.main('dev')"),
+    ("experiment_specification", "create_expe_specification.main()"),
+    ("examples", "recompute_all_ex.main()"),
+    ("examples_per_instance_owl",
+     "recompute_all_ex.main() with one ontology per example "
+     "(shared_owl_reader.py)"),
+    ("terms_readme", "UpdateTermReadme.main()"),
+    ("nidmr_context", "create_nidmr_context.main()"),
+    ("validation", "nidm-results/test suite"),
+    ("synthetic_examples", "create_synthetic_examples.main(), ~1000xN peaks"),
+    ("synthetic_validation", "nidm_validate.validate() on the synthetic "
+     "examples"),
+    ("synthetic_queries", "nidm_queries (SPARQL) on the synthetic examples, "
+     "except peaks"),
+    ("synthetic_tables", "nidm_tables cluster_table() and peak_table() of "
+     "the synthetic examples"),
+])
+
+# Directory (in the copy of the repository) of the synthetic examples, read
+# by the stages in SYNTHETIC_STAGES
+SYNTHETIC_DIR = "synthetic_examples"
+SYNTHETIC_STAGES = ["synthetic_validation", "synthetic_queries",
+                    "synthetic_tables"]
+
+# Number of lines of the standard error of a failed stage kept in its result
+STDERR_TAIL = 40
+
+# Alphanumeric identifiers of the terms duplicated in the scaled ontologies
+SCALED_TERM_RE = re.compile(r'^(.*[#/](?:NIDM|SPM|FSL)_)(\d+)$')
+
+
+def _run_stage(stage, scale):
+    """ Run stage (in the current directory, a copy of the repository)"""
+    sys.path.append(os.path.join(os.getcwd(), "scripts"))
+    sys.path.append(os.path.join(os.getcwd(), RESULTS_SCRIPTS))
+    sys.path.append(os.path.join(os.getcwd(), EXPE_SCRIPTS))
+    sys.path.append(os.path.join(os.getcwd(), "benchmarks"))
+
+    if stage == "results_specification":
+        import create_results_specification
+        create_results_specification.main("dev")
+    elif stage == "experiment_specification":
+        import create_expe_specification
+        create_expe_specification.main()
+    elif stage == "examples":
+        import recompute_all_ex
+        recompute_all_ex.main()
+    elif stage == "examples_per_instance_owl":
+        import shared_owl_reader
+        shared_owl_reader.time_recompute_all_ex(shared=False)
+    elif stage == "terms_readme":
+        import UpdateTermReadme
+        UpdateTermReadme.main()
+    elif stage == "nidmr_context":
+        import create_nidmr_context
+        create_nidmr_context.main()
+    elif stage == "validation":
+        import unittest
+        from StringIO import StringIO
+        suite = unittest.TestLoader().discover(
+            os.path.join("nidm", "nidm-results", "test"),
+            pattern='[t|T]est*.py')
+        result = unittest.TextTestRunner(stream=StringIO()).run(suite)
+        return dict(tests=result.testsRun,
+                    failures=len(result.failures)+len(result.errors))
+    elif stage == "synthetic_examples":
+        import create_synthetic_examples
+        if os.path.isdir(SYNTHETIC_DIR):
+            shutil.rmtree(SYNTHETIC_DIR)
+        create_synthetic_examples.main(
+            SYNTHETIC_DIR, clusters=100*scale, peaks=10)
+    elif stage in SYNTHETIC_STAGES:
+        return _run_synthetic_stage(stage)
+    else:
+        raise ValueError("Unknown stage: " + stage)
+
+
+def _run_synthetic_stage(stage):
+    """ Run a stage reading the synthetic examples (Turtle documents)"""
+    import glob
+    documents = sorted(glob.glob(os.path.join(SYNTHETIC_DIR, "*", "*.ttl")))
+
+    if stage == "synthetic_validation":
+        import nidm_validate
+        reports = list(nidm_validate.validate(documents))
+        return dict(documents=len(reports),
+                    invalid=sum(not report["valid"] for report in reports))
+
+    from rdflib.graph import Graph
+    num_rows = 0
+    for document in documents:
+        graph = Graph()
+        graph.parse(document, format='turtle')
+        if stage == "synthetic_queries":
+            # peak.rq takes hours with rdflib's SPARQL engine on ~1000 peaks
+            # (superlinear): peaks are benchmarked by synthetic_tables
+            import nidm_queries
+            for name in nidm_queries.QUERIES:
+                if name != "peaks":
+                    num_rows += len(nidm_queries.query(name, graph))
+        else:
+            import nidm_tables
+            num_rows += len(nidm_tables.cluster_table(graph)["cluster"])
+            num_rows += len(nidm_tables.peak_table(graph)["peak"])
+    return dict(documents=len(documents), rows=num_rows)
+
+
+def peak_rss():
+    """ Peak resident set size of this process (in kB)"""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on Mac OS and in kB on Linux
+    if sys.platform == "darwin":
+        max_rss /= 1024
+    return max_rss
+
+
+def run_child(stage, scale, result_file):
+    """ Entry point of the interpreter running a single stage"""
+    start = timeit.default_timer()
+    details = _run_stage(stage, scale)
+    result = collections.OrderedDict([
+        ("seconds", timeit.default_timer() - start),
+        ("peak_rss_kb", peak_rss())])
+    if details:
+        result.update(sorted(details.items()))
+    with open(result_file, 'w') as fid:
+        json.dump(result, fid)
+
+
+def scale_ontology(owl_file, scale):
+    """ Duplicate all NIDM-Results terms of owl_file scale-1 times (the
+    copies, e.g. nidm:NIDM_1000019 for nidm:NIDM_0000019, have the same
+    definitions, labels suffixed by the copy number, and relations to the
+    copies of the related terms)"""
+    import rdflib as rl
+
+    g = rl.Graph()
+    g.parse(owl_file, format='turtle')
+
+    terms = set(s for s in g.subjects() if isinstance(s, rl.URIRef) and
+                SCALED_TERM_RE.match(s))
+
+    def copy_term(term, copy, bnodes):
+        if isinstance(term, rl.BNode):
+            if term not in bnodes:
+                bnodes[term] = rl.BNode()
+                copy_triples(term, copy, bnodes)
+            return bnodes[term]
+        if term in terms:
+            prefix, number = SCALED_TERM_RE.match(term).groups()
+            return rl.URIRef(
+                "%s%07d" % (prefix, int(number) + copy*1000000))
+        return term
+
+    def copy_triples(subject, copy, bnodes):
+        for p, o in list(g.predicate_objects(subject)):
+            if p == rl.RDFS['label']:
+                o = rl.Literal(o + " " + str(copy), lang=o.language,
+                               datatype=o.datatype)
+            g.add((copy_term(subject, copy, bnodes), p,
+                   copy_term(o, copy, bnodes)))
+
+    for copy in range(1, scale):
+        bnodes = dict()
+        for term in sorted(terms):
+            copy_triples(term, copy, bnodes)
+
+    g.serialize(owl_file, format='turtle')
+    return len(terms)*scale
+
+
+def copy_repository(scale):
+    """ Copy of the repository (with a scaled ontology if scale > 1)"""
+    root = tempfile.mkdtemp(prefix="nidm_benchmark_")
+    shutil.rmtree(root)
+    shutil.copytree(REPO_ROOT, root, ignore=shutil.ignore_patterns(
+        ".git", ".owl_cache", ".benchmarks", "*.pyc", "debug.log"))
+    if scale > 1:
+        scale_ontology(os.path.join(root, RESULTS_OWL), scale)
+    return root
+
+
+def benchmark(stage, root, scale, owl_cache=False):
+    """ Run stage in a new interpreter and return its timing and peak RSS
+    (or its exit code and the end of its standard error if it failed)"""
+    fid, result_file = tempfile.mkstemp(suffix=".json")
+    os.close(fid)
+    env = dict(os.environ)
+    if not owl_cache:
+        # Measure turtle parsing, not the on-disk ontology cache
+        env["NIDM_OWL_CACHE"] = "0"
+
+    # The standard error (logs included) can be large: it is written to a
+    # file rather than read through a pipe
+    with open(os.devnull, 'w') as devnull, \
+            tempfile.TemporaryFile() as stderr:
+        returncode = subprocess.call(
+            [sys.executable, os.path.join(root, "benchmarks",
+                                          os.path.basename(__file__)),
+             "--child", stage, "--scale", str(scale),
+             "--result", result_file],
+            cwd=root, env=env, stdout=devnull, stderr=stderr)
+
+        try:
+            if returncode or not os.path.getsize(result_file):
+                stderr.seek(0)
+                tail = collections.deque(stderr, STDERR_TAIL)
+                return collections.OrderedDict([
+                    ("error", returncode),
+                    ("stderr", "".join(tail).decode('utf-8', 'replace'))])
+            with open(result_file, 'r') as fid:
+                return json.load(
+                    fid, object_pairs_hook=collections.OrderedDict)
+        finally:
+            os.remove(result_file)
+
+
+def git_commit():
+    """ Commit of the repository (suffixed by "+" if there are local
+    modifications), None if not available"""
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT).strip()
+        modified = subprocess.check_output(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=REPO_ROOT).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("+" if modified else "")
+
+
+def main(stages=None, scales=(1,), repeat=1, owl_cache=False, out=None):
+    stages = stages or list(STAGES)
+    out = out or sys.stdout
+
+    results = collections.OrderedDict([
+        ("commit", git_commit()),
+        ("date", datetime.datetime.now().isoformat()),
+        ("python", platform.python_version()),
+        ("platform", platform.platform()),
+        ("repeat", repeat),
+        ("owl_cache", owl_cache),
+        ("scenarios", collections.OrderedDict())])
+
+    for scale in scales:
+        scenario = "real" if scale == 1 else "scaled-x%d" % scale
+        scenario_results = collections.OrderedDict()
+        results["scenarios"][scenario] = scenario_results
+
+        root = copy_repository(scale)
+        try:
+            for stage in stages:
+                if stage in SYNTHETIC_STAGES and not os.path.isdir(
+                        os.path.join(root, SYNTHETIC_DIR)):
+                    # Synthetic examples read by the stage (not timed)
+                    benchmark("synthetic_examples", root, scale, owl_cache)
+                runs = [benchmark(stage, root, scale, owl_cache)
+                        for i in range(repeat)]
+                # Best time of all runs, largest peak memory
+                best = min(runs, key=lambda run: run.get("seconds", 0))
+                if "peak_rss_kb" in best:
+                    best["peak_rss_kb"] = max(
+                        run["peak_rss_kb"] for run in runs)
+                scenario_results[stage] = best
+                out.write(format_result(scenario, stage, best) + "\n")
+        finally:
+            shutil.rmtree(root)
+
+    return results
+
+
+def format_result(scenario, stage, result):
+    name = "%-12s %-27s" % (scenario, stage)
+    if "error" in result:
+        lines = result.get("stderr", "").strip().splitlines()
+        return name + " failed (exit code %s)%s" % (
+            result["error"], ": " + lines[-1] if lines else "")
+    return name + " %9.2fs %9.1f MB" % (
+        result["seconds"], result["peak_rss_kb"]/1024.0)
+
+
+def compare(baseline, results, out=None):
+    """ Print the time and peak memory of results relative to baseline"""
+    out = out or sys.stdout
+    out.write("%-12s %-27s %10s %10s\n" % (
+        "Scenario", "Stage", "Time", "Memory"))
+    for scenario, stages in results["scenarios"].items():
+        for stage, result in stages.items():
+            base = baseline["scenarios"].get(scenario, {}).get(stage)
+            if not base or "error" in base or "error" in result:
+                continue
+            out.write("%-12s %-27s %9.2fx %9.2fx\n" % (
+                scenario, stage, result["seconds"]/base["seconds"],
+                float(result["peak_rss_kb"])/base["peak_rss_kb"]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--stage", nargs="+", choices=list(STAGES),
+                        help="stages to run (default: all)")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1],
+                        help="number of copies of each term in the "
+                        "ontology (1: real ontology)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="number of runs of each stage (best is kept)")
+    parser.add_argument("--owl-cache", action="store_true",
+                        help="keep the on-disk ontology cache enabled")
+    parser.add_argument("--output", help="JSON results file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="JSON results to compare with")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.scale[0], args.result)
+        sys.exit(0)
+
+    results = main(args.stage, args.scale, args.repeat, args.owl_cache)
+
+    output = args.output
+    if output is None:
+        if not os.path.isdir(RESULTS_DIR):
+            os.mkdir(RESULTS_DIR)
+        output = os.path.join(
+            RESULTS_DIR, (results["commit"] or "results") + ".json")
+    with open(output, 'w') as fid:
+        json.dump(results, fid, indent=2, separators=(",", ": "))
+    sys.stdout.write("Results written in " + output + "\n")
+
+    if args.compare:
+        with open(args.compare, 'r') as fid:
+            compare(json.load(fid), results)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+''' Benchmark re-generation of all NIDM-Results examples
+(recompute_all_ex.main) with one ontology per ExampleFromTemplate (previous
+behaviour) and with the ontology shared by all example generators.
+
+Usage: python benchmarks/shared_owl_reader.py [--repeat N] [--disk-cache]
+
+The time and memory of both variants are also recorded by run_benchmarks.py
+(stages "examples" and "examples_per_instance_owl").
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+
+import os
+import sys
+import argparse
+import timeit
+
+RELPATH = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(RELPATH)
+
+sys.path.append(os.path.join(REPO_ROOT, "scripts"))
+sys.path.append(os.path.join(REPO_ROOT, "nidm", "nidm-results", "scripts"))
+
+import owl_cache
+import create_example_from_templates
+import recompute_all_ex
+
+
+def time_recompute_all_ex(shared):
+    """ Time recompute_all_ex.main() and return elapsed time and number of
+    ontology loads"""
+    example_class = create_example_from_templates.ExampleFromTemplate
+    shared_owl = example_class.owl
+    owl_cache.clear_owl_readers()
+
+    # Previous behaviour: one ontology per ExampleFromTemplate instance
+    readers = dict()
+
+    def per_instance_owl(example):
+        if id(example) not in readers:
+            readers[id(example)] = owl_cache.CachedOwlReader(
+                example.owl_file, example.import_files)
+        return readers[id(example)]
+
+    if not shared:
+        example_class.owl = property(per_instance_owl)
+
+    start = timeit.default_timer()
+    try:
+        recompute_all_ex.main()
+    finally:
+        example_class.owl = shared_owl
+    elapsed = timeit.default_timer() - start
+
+    if shared:
+        return elapsed, len(owl_cache._owl_readers)
+    return elapsed, len(readers)
+
+
+def main(repeat=3, disk_cache=False):
+    if not disk_cache:
+        # Measure turtle parsing, not the on-disk cache
+        os.environ["NIDM_OWL_CACHE"] = "0"
+
+    results = dict()
+    for shared in (False, True):
+        timings = list()
+        for i in range(repeat):
+            elapsed, num_loads = time_recompute_all_ex(shared)
+            timings.append(elapsed)
+        results[shared] = min(timings)
+        sys.stdout.write(
+            "%-40s %8.2fs (best of %d, %d ontology loads)\n" % (
+                "recompute_all_ex.main() " +
+                ("shared ontology" if shared else "one ontology per example"),
+                results[shared], repeat, num_loads))
+
+    sys.stdout.write("Speed-up: x%.1f\n" % (results[False] / results[True]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--disk-cache", action="store_true",
+                        help="keep the on-disk ontology cache enabled")
+    args = parser.parse_args()
+    main(args.repeat, args.disk_cache)
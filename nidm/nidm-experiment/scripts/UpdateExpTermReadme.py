@@ -25,7 +25,7 @@ NIDMEXPERIMENTPATH = os.path.dirname(RELPATH)
 
 # Append parent script directory to path
 sys.path.append(os.path.join(RELPATH, os.pardir, os.pardir, os.pardir, "scripts"))
-from nidmresults.owl.owl_reader import OwlReader
+from owl_cache import CachedOwlReader
 from nidmresults.objects.constants_rdflib import *
 
 logging.basicConfig(level=logging.DEBUG)
@@ -52,7 +52,7 @@ CURATION_ORDER = list([OBO_PENDING_FINAL, OBO_METADATA_INCOMPLETE, OBO_REQUIRES_
 class UpdateExpTermReadme():
 
     def __init__(self, owl_file):
-        self.owl = OwlReader(owl_file)
+        self.owl = CachedOwlReader(owl_file)
 
 
     # Write out Readme
@@ -31,13 +31,8 @@ TERMS_FOLDER = os.path.join(NIDM_EXPE_PATH, 'terms')
 RELEASED_TERMS_FOLDER = os.path.join(TERMS_FOLDER, "releases")
 
 
-def main():
-    if len(sys.argv) > 1:
-        nidm_original_version = sys.argv[1]
-        nidm_version = nidm_original_version.replace(".", "")
-    else:
-        nidm_original_version = "dev"
-        nidm_version = 'dev'
+def main(nidm_original_version="dev"):
+    nidm_version = nidm_original_version.replace(".", "")
 
     # Retrieve owl file for NIDM-Results
     if nidm_version == "dev":
@@ -126,4 +121,9 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    if len(sys.argv) > 1:
+        nidm_version = sys.argv[1]
+    else:
+        nidm_version = 'dev'
+
+    main(nidm_version)
@@ -25,6 +25,8 @@ NIDMRESULTSPATH = os.path.dirname(SCRIPT_PATH)
 # Append test directory to path
 sys.path.append(os.path.join(SCRIPT_PATH, "..", "test"))
 from nidmresults.test.test_commons import *
+sys.path.append(os.path.join(NIDMRESULTSPATH, os.pardir, os.pardir, "scripts"))
+from graph_hash import compare_ttl_documents
 
 logging.basicConfig(filename='debug.log', level=logging.DEBUG, filemode='w')
 logger = logging.getLogger(__name__)
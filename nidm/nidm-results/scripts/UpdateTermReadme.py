@@ -20,7 +20,7 @@ NIDMRESULTSPATH = os.path.dirname(RELPATH)
 
 # Append parent script directory to path
 sys.path.append(os.path.join(RELPATH, os.pardir, os.pardir, os.pardir, "scripts"))
-from nidmresults.owl.owl_reader import OwlReader
+from owl_cache import CachedOwlReader
 from nidmresults.objects.constants_rdflib import *
 
 logging.basicConfig(level=logging.DEBUG)
@@ -47,7 +47,7 @@ CURATION_ORDER = list([OBO_PENDING_FINAL, OBO_METADATA_INCOMPLETE, OBO_REQUIRES_
 class UpdateTermReadme():
 
     def __init__(self, owl_file):
-        self.owl = OwlReader(owl_file)
+        self.owl = CachedOwlReader(owl_file)
 
     # Write out Readme
     def write_readme(self, readme_file, readme_txt):
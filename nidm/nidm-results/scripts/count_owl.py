@@ -15,6 +15,7 @@ NIDMPATH = os.path.join(NIDMRESULTSPATH, os.pardir)
 sys.path.append(os.path.join(NIDMRESULTSPATH, os.pardir, os.pardir, "scripts"))
 from nidmresults.owl.owl_reader import *
 from nidmresults.objects.constants_rdflib import *
+from owl_cache import CachedOwlReader
 
 logging.basicConfig(filename='debug.log', level=logging.DEBUG, filemode='w')
 logger = logging.getLogger(__name__)
@@ -25,7 +26,7 @@ def main(owl=None):
         owl = os.path.join(NIDMRESULTSPATH, "terms",
                            "nidm-results.owl")
 
-    owl_reader = OwlReader(owl)
+    owl_reader = CachedOwlReader(owl)
     num_terms, num_classes, num_attributes, num_reused, all_terms = \
         owl_reader.count_by_namespaces()
 
@@ -9,111 +9,503 @@ from string import Template
 import logging
 import re
 import glob
+import copy
+import urllib
+import urlparse
 import rdflib as rl
 import pyld as ld
 import json
+import csv
 
 NIDM_TERMS_DIR = os.path.join(os.path.dirname(
         os.path.dirname(os.path.abspath(__file__))), 'terms')
 NIDMPATH = os.path.join(NIDM_TERMS_DIR, os.pardir, os.pardir)
 TPL_DIR = os.path.join(NIDM_TERMS_DIR, 'templates')
 EX_DIR = os.path.join(NIDM_TERMS_DIR, 'examples')
+# JSON-LD context published at NIDMR_CONTEXT_URL (created by
+# create_nidmr_context.py)
+NIDMR_CONTEXT_URL = 'http://purl.org/nidash/context'
+NIDMR_CONTEXT_FILE = os.path.join(NIDM_TERMS_DIR, 'nidmr.json')
+# Preferred prefixes of the terms (created by create_prefixes.py)
+NIDM_PREFIXES_FILE = os.path.join(NIDM_TERMS_DIR, 'prefixes.csv')
 
 # Append parent script directory to path
 RELPATH = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(
     os.path.join(RELPATH, os.pardir, os.pardir, os.pardir, "scripts"))
-from nidmresults.owl.owl_reader import OwlReader
+from owl_cache import get_owl_reader
 from nidmresults.objects.constants_rdflib import *
 
 logging.basicConfig(filename='debug.log', level=logging.DEBUG, filemode='w')
 logger = logging.getLogger(__name__)
 
+# Templates looked up and files written by ExampleFromTemplate in this process
+# (used by scripts/refresh.py to track the dependencies of each example)
+templates_read = set()
+files_written = set()
+
+
+class TemplateRegistry(object):
+    """ Templates of terms/templates, read and compiled once per process and
+    re-loaded only when the template file is modified"""
+
+    def __init__(self, tpl_dir):
+        self.tpl_dir = tpl_dir
+        # Template name -> (mtime, size, text, compiled template)
+        self._templates = dict()
+        # Template names -> triple patterns (GraphTemplate)
+        self._compiled = dict()
+
+    def path(self, name):
+        return os.path.join(self.tpl_dir, name+".txt")
+
+    def refresh(self):
+        """ Load new or modified templates and forget deleted ones"""
+        found = set()
+        for tpl_file in glob.glob(self.path("*")):
+            name = os.path.basename(tpl_file)[:-4]
+            found.add(name)
+            stat = os.stat(tpl_file)
+            loaded = self._templates.get(name)
+            if loaded is None or loaded[:2] != (stat.st_mtime, stat.st_size):
+                self._load(name, stat)
+
+        for name in set(self._templates) - found:
+            del self._templates[name]
+            self._compiled.clear()
+
+    def _load(self, name, stat=None):
+        fid = open(self.path(name), 'r')
+        text = fid.read()
+        fid.close()
+        if stat is None:
+            stat = os.stat(self.path(name))
+        self._templates[name] = (stat.st_mtime, stat.st_size, text,
+                                 Template(text))
+        # Triple patterns may include the previous version of the template
+        self._compiled.clear()
+
+    def _get(self, name):
+        templates_read.add(self.path(name))
+        if name not in self._templates:
+            # Raises IOError if there is no such template
+            self._load(name)
+        return self._templates[name]
+
+    def exists(self, name):
+        templates_read.add(self.path(name))
+        return name in self._templates or os.path.isfile(self.path(name))
+
+    def read(self, name):
+        return self._get(name)[2]
+
+    def template(self, name):
+        return self._get(name)[3]
+
+    def _template_names(self, class_key):
+        """ Templates making up class_key (e.g. StatisticMap and
+        StatisticMap_T for "StatisticMap_T"), base template first"""
+        sub_templates = str.split(class_key, "_")
+        base_template_name = sub_templates[0]
+        if len(sub_templates) > 1 and self.exists(base_template_name):
+            return [base_template_name] + [
+                base_template_name+"_"+str.split(sub_template, "-")[0]
+                for sub_template in sub_templates[1:]]
+        return [str.split(class_key, "-")[0]]
+
+    def _join(self, class_key, template_texts):
+        """ Concatenate the (substituted) templates of class_key, the final
+        dot of each template is replaced by a ";" """
+        class_example = ""
+        for template_name, text in zip(
+                self._template_names(class_key), template_texts):
+            if class_example:
+                class_example = class_example[:-1]+";\n"
+            logger.debug(" "+template_name)
+            class_example += text
+        return class_example
+
+    def render(self, class_key, substitutes):
+        """ Turtle description of class_key (e.g. "StatisticMap_T" for the
+        base template StatisticMap.txt followed by StatisticMap_T.txt)"""
+        return self._join(class_key, [
+            self.template(name).substitute(**substitutes)
+            for name in self._template_names(class_key)])
+
+    def source(self, class_key):
+        """ Turtle description of class_key before substitution"""
+        return self._join(class_key, [
+            self.read(name) for name in self._template_names(class_key)])
+
+    def graph_template(self, class_key):
+        """ Triple patterns of class_key (compiled on first use, and shared
+        by the class keys made of the same templates, e.g. "Peak-1" and
+        "Peak-2")"""
+        template_names = tuple(self._template_names(class_key))
+        if template_names not in self._compiled:
+            self._compiled[template_names] = GraphTemplate(
+                self.read("Namespaces"), self.source(class_key))
+        return self._compiled[template_names]
+
+
+# Placeholders in node positions (and literals including placeholders) are
+# replaced by these IRIs when the templates are compiled into triple patterns
+PLACEHOLDER_NS = "urn:nidm-template:"
+LITERAL_PLACEHOLDER = PLACEHOLDER_NS + "literal/"
+# Long and single-quoted string literals, string literals (lexical form,
+# datatype, language), IRIs and comments of a Turtle template
+TURTLE_TOKEN_RE = re.compile(
+    r'"""(?:[^"\\]|\\.|"(?!""))*"""'
+    r"|'''(?:[^'\\]|\\.|'(?!''))*'''"
+    r'|"((?:[^"\\\n]|\\.)*)"'
+    r'(?:\^\^(<[^>\s]*>|[\w-]*:[\w-]+(?:\.[\w-]+)*)|@([\w-]+))?'
+    r"|'(?:[^'\\\n]|\\.)*'"
+    r'|<[^>\s]*>|#[^\n]*')
+PREFIX_RE = re.compile(r'@prefix\s+([\w-]*):\s*<([^>]*)>')
+QNAME_RE = re.compile(r'^([A-Za-z][\w-]*)?:([\w-]+(?:\.[\w-]+)*)?$')
+# Substitutes that can be added to a literal without parsing and the escape
+# sequences they may include
+LITERAL_VALUE_RE = re.compile(r'^(?:[^"\\\n\r]|\\[tbnrf"\'\\])*$')
+ECHAR_RE = re.compile(r'\\(.)')
+ECHARS = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', 'f': '\f', '"': '"',
+          "'": "'", '\\': '\\'}
+NUMERIC_RE = [
+    (re.compile(r'^[+-]?\d+$'), XSD['integer']),
+    (re.compile(r'^[+-]?\d*\.\d+$'), XSD['decimal']),
+    (re.compile(r'^[+-]?(?:\d+\.?\d*|\.\d+)[eE][+-]?\d+$'), XSD['double']),
+]
+
+
+class GraphTemplate(object):
+    """ Triple patterns of a class template: the substitutes are added to a
+    graph as rdflib terms, without writing and parsing Turtle"""
+
+    def __init__(self, namespaces, source):
+        self.namespaces = dict(
+            (prefix, rl.Namespace(uri))
+            for prefix, uri in PREFIX_RE.findall(namespaces))
+        # Placeholders in node positions, in literals and anywhere else
+        # (e.g. comments). Substitutes are required for all of them, as for
+        # the text templates
+        self.nodes = set()
+        self.literals = set()
+        self.required = set()
+        # Literals including placeholders: (lexical form template, datatype,
+        # language). They are not parsed as the lexical form of typed
+        # literals is normalised (e.g. "$scaling"^^xsd:boolean is false)
+        self.literal_patterns = list()
+        # Placeholders within IRIs (<...$x...>), within long or
+        # single-quoted strings or within literals with escaped characters
+        # are not compiled
+        self.compiled = True
+
+        tokens = [(match.start(), match.end(), match)
+                  for match in TURTLE_TOKEN_RE.finditer(source)]
+        # Start of replaced text -> (end of replaced text, replacement)
+        replacements = dict()
+        for match in Template.pattern.finditer(source):
+            name = match.group("named") or match.group("braced")
+            if name is None:
+                continue
+            self.required.add(name)
+            token = [(start, end, token_match)
+                     for start, end, token_match in tokens
+                     if start <= match.start() < end]
+            if not token:
+                self.nodes.add(name)
+                replacements[match.start()] = (
+                    match.end(), "<" + PLACEHOLDER_NS + name + ">")
+            elif source.startswith('"""', token[0][0]) or \
+                    source[token[0][0]] == "'":
+                # Placeholders within long or single-quoted strings are not
+                # compiled
+                self.compiled = False
+            elif source[token[0][0]] == '"':
+                self.literals.add(name)
+                start, end, token_match = token[0]
+                if start not in replacements:
+                    replacements[start] = (end, "<%s%d>" % (
+                        LITERAL_PLACEHOLDER, len(self.literal_patterns)))
+                    self.literal_patterns.append(
+                        self._literal_pattern(token_match))
+            elif source[token[0][0]] == '<':
+                self.compiled = False
+
+        pattern_source = ""
+        last = 0
+        for start in sorted(replacements):
+            end, replacement = replacements[start]
+            pattern_source += source[last:start] + replacement
+            last = end
+        pattern_source += source[last:]
+
+        self.patterns = list()
+        if self.compiled:
+            g = rl.Graph()
+            g.parse(data=namespaces+"\n"+pattern_source, format='turtle')
+            self.patterns = list(g)
+
+    def _literal_pattern(self, token_match):
+        lexical, datatype, language = token_match.groups()
+        if "\\" in lexical:
+            self.compiled = False
+        if datatype is not None:
+            if datatype.startswith("<"):
+                datatype = rl.URIRef(datatype[1:-1])
+            else:
+                datatype = self.node(datatype)
+                if datatype is None:
+                    self.compiled = False
+        return (Template(lexical.decode('utf-8')), datatype, language)
+
+    def node(self, value):
+        """ rdflib term for a substitute in node position (a prefixed name,
+        an IRI or a number), None for any other Turtle"""
+        value = value.strip()
+        match = QNAME_RE.match(value)
+        if match:
+            prefix, local_name = match.groups()
+            if (prefix or "") in self.namespaces:
+                return self.namespaces[prefix or ""][local_name or ""]
+            return None
+        if value.startswith("<") and value.endswith(">") and \
+                ":" in value and not re.search(r'[\s<>"{}|^`\\]',
+                                               value[1:-1]):
+            return rl.URIRef(value[1:-1])
+        if value in ("true", "false"):
+            return rl.Literal(value, datatype=XSD['boolean'])
+        for number_re, datatype in NUMERIC_RE:
+            if number_re.match(value):
+                return rl.Literal(value, datatype=datatype)
+        return None
+
+    def add_to(self, graph, substitutes):
+        """ Add the triples of the template to graph, return False (and
+        leave the graph untouched) if the substitutes cannot be added as
+        terms (e.g. lists of objects) and must be parsed as Turtle"""
+        for name in sorted(self.required):
+            if name not in substitutes:
+                raise KeyError(name)
+        if not self.compiled:
+            return False
+
+        nodes = dict()
+        for name in self.nodes:
+            nodes[name] = self.node("%s" % substitutes[name])
+            if nodes[name] is None:
+                return False
+        literals = dict()
+        for name in self.literals:
+            value = "%s" % substitutes[name]
+            if not LITERAL_VALUE_RE.match(value):
+                return False
+            try:
+                # Escaped characters are unescaped as by the Turtle parser
+                literals[name] = ECHAR_RE.sub(
+                    lambda echar: ECHARS[echar.group(1)], unicode(value))
+            except UnicodeDecodeError:
+                return False
+
+        bnodes = dict()
+
+        def term(pattern):
+            if isinstance(pattern, rl.URIRef) and \
+                    pattern.startswith(LITERAL_PLACEHOLDER):
+                lexical, datatype, language = self.literal_patterns[
+                    int(pattern[len(LITERAL_PLACEHOLDER):])]
+                return rl.Literal(lexical.substitute(substitutes, **literals),
+                                  lang=language, datatype=datatype)
+            if isinstance(pattern, rl.URIRef) and \
+                    pattern.startswith(PLACEHOLDER_NS):
+                return nodes[pattern[len(PLACEHOLDER_NS):]]
+            if isinstance(pattern, rl.BNode):
+                # New blank nodes for each instance of the template
+                return bnodes.setdefault(pattern, rl.BNode())
+            return pattern
+
+        for triple in self.patterns:
+            graph.add(tuple(term(pattern) for pattern in triple))
+        return True
+
+
+# Templates shared by all the examples created in this process
+templates = TemplateRegistry(TPL_DIR)
+
+# Local name of the terms with an alphanumeric identifier (e.g. NIDM_0000082,
+# STATO_0000039, birnlex_2094) in terms/prefixes.csv
+ALPHANUM_LOCAL_NAME_RE = re.compile(r'[#/:][A-Za-z]+_\d+$')
+
+# Alphanumeric identifiers of terms/prefixes.csv: (mtime, identifier (qname
+# or URI) -> term URI, regular expression matching the identifiers)
+_alphanum_ids = None
+
+# (owl file, term URI) -> (prefix name, prefix definition)
+_alphanum_prefixes = dict()
+
+# Local JSON-LD contexts already read: url -> (mtime, context)
+_contexts = dict()
+
+
+def alphanum_ids():
+    """ Alphanumeric identifiers (qnames and URIs) of the terms listed in
+    terms/prefixes.csv -> term URI, and the regular expression matching
+    them (re-read only if the file is modified)"""
+    global _alphanum_ids
+    mtime = os.path.getmtime(NIDM_PREFIXES_FILE)
+    if _alphanum_ids is None or _alphanum_ids[0] != mtime:
+        ids = dict()
+        with open(NIDM_PREFIXES_FILE, 'rb') as fid:
+            for row in csv.DictReader(fid):
+                if ALPHANUM_LOCAL_NAME_RE.search(row['URI']):
+                    term_uri = rl.URIRef(row['URI'])
+                    ids[row['qname']] = term_uri
+                    ids[row['URI']] = term_uri
+        # Longest identifiers first, not followed by another character of
+        # an identifier
+        pattern = "|".join(
+            re.escape(idt) for idt in sorted(ids, key=len, reverse=True))
+        _alphanum_ids = (
+            mtime, ids, re.compile("(?:" + pattern + r")(?![\w-])"))
+    return _alphanum_ids[1:]
+
+
+def load_context_document(url):
+    """ pyld document loader reading the NIDM-Results context from
+    terms/nidmr.json (kept in memory) instead of fetching it online"""
+    if url != NIDMR_CONTEXT_URL:
+        return ld.jsonld.get_document_loader()(url)
+
+    mtime = os.path.getmtime(NIDMR_CONTEXT_FILE)
+    if url not in _contexts or _contexts[url][0] != mtime:
+        with open(NIDMR_CONTEXT_FILE, 'r') as fid:
+            _contexts[url] = (mtime, json.load(fid))
+
+    return {'contextUrl': None, 'documentUrl': url,
+            'document': copy.deepcopy(_contexts[url][1])}
+
+
+def file_uri(path):
+    """ Identifier of the graph parsed from the file at path"""
+    return urlparse.urljoin("file:", urllib.pathname2url(
+        os.path.abspath(path)))
+
+
+def compact_json_ld(g):
+    """ JSON-LD version of graph g, compacted with the NIDM-Results context
+    (read from terms/nidmr.json rather than downloaded)"""
+    return ld.jsonld.compact(
+        json.loads(g.serialize(format='json-ld')), NIDMR_CONTEXT_URL,
+        {'documentLoader': load_context_document})
+
 
 class ExampleFromTemplate(object):
+    """ Example created from the class templates. With backend "text" the
+    substituted templates are written as is (and parsed to create the
+    JSON-LD version). With backend "graph" the triples are added to a graph
+    from which the Turtle and JSON-LD versions are serialised"""
+
+    BACKENDS = ("text", "graph")
 
     def __init__(self, nidm_classes, example_file, one_file_per_class=False,
-                 owl_file=None, remove_att=None):
+                 owl_file=None, remove_att=None, backend="text"):
+        if backend not in self.BACKENDS:
+            raise ValueError("Unknown backend: " + str(backend))
+        if backend == "graph" and one_file_per_class:
+            raise ValueError(
+                "The graph backend only creates complete documents")
         self.nidm_classes = nidm_classes
         self.one_file_per_class = one_file_per_class
         self.remove_att = remove_att
+        self.backend = backend
 
-        self.owl = None
+        import_files = None
         if owl_file is None:
             import_files = glob.glob(
                 os.path.join(NIDMPATH, "imports", '*.ttl'))
             owl_file = os.path.join(NIDM_TERMS_DIR, 'nidm-results.owl')
 
-        self.owl = OwlReader(owl_file, import_files)
+        self.owl_file = owl_file
+        self.import_files = import_files
 
         if not one_file_per_class:
             self.file = example_file
         else:
             self.dir = example_file
 
-    def create_example(self):
+    @property
+    def owl(self):
+        # The ontology is loaded on first use and shared by all examples
+        # created in this process
+        return get_owl_reader(self.owl_file, self.import_files)
+
+    def create_graph(self, identifier=None):
+        """ Graph of the example, built from the triple patterns of the
+        templates (classes with substitutes that are not single terms are
+        parsed from their Turtle description)"""
+        templates.refresh()
+        namespaces = templates.read("Namespaces")
+
+        g = rl.ConjunctiveGraph(identifier=identifier)
+        for nidm_class, substitutes in sorted(self.nidm_classes.items()):
+            try:
+                added = templates.graph_template(nidm_class).add_to(
+                    g, substitutes)
+                if not added:
+                    class_example = templates.render(nidm_class, substitutes)
+                    # Attributes to remove might not be valid Turtle
+                    if self.remove_att is not None:
+                        class_example = self.remove_attributes(
+                            self.remove_att, class_example)
+                    class_graph = rl.Graph()
+                    class_graph.parse(
+                        data=namespaces+"\n"+str(class_example),
+                        format='turtle')
+                    for triple in class_graph:
+                        g.add(triple)
+            except KeyError, k:
+                logger.debug("--- Key error on ---")
+                logger.debug(self.file)
+                logger.debug(nidm_class)
+                logger.debug(substitutes)
+                raise KeyError(k)
+
+        for prefix, uri in PREFIX_RE.findall(namespaces):
+            g.bind(prefix, uri)
+        if self.remove_att:
+            for term in self.remove_att:
+                g.remove((None, term, None))
+        return g
+
+    def render(self):
+        """ Turtle of the example, as written by create_example, without
+        writing any file (with one_file_per_class: dict of the Turtle of each
+        class indexed by file)"""
+        if self.backend == "graph":
+            return self.create_graph(
+                identifier=rl.URIRef(file_uri(self.file))).serialize(
+                    format='turtle')
+
+        # Re-load the templates modified since the previous example
+        templates.refresh()
+
         # To make a complete document, we need to add namespaces at
         # the beginning
-        fid = open(os.path.join(TPL_DIR, "Namespaces.txt"), 'r')
-        namespaces = fid.read()
-        fid.close()
+        namespaces = templates.read("Namespaces")
 
         example = ""
+        class_examples = dict()
         for nidm_class, substitutes in sorted(self.nidm_classes.items()):
-
-            templates = str.split(nidm_class, "_")
-            if len(templates) > 1:
-                base_template_name = templates[0]
-            else:
-                base_template_name = None
-
-            if base_template_name and \
-                os.path.isfile(
-                    os.path.join(TPL_DIR, base_template_name+".txt")):
-                fid = open(
-                    os.path.join(TPL_DIR, base_template_name+".txt"), 'r')
-                nidm_base_tpm = Template(fid.read())
-                fid.close()
-            else:
-                nidm_base_tpm = None
-                templates = ["", nidm_class]
-
-            class_example = ""
-
-            if nidm_base_tpm:
-                try:
-                    class_example += nidm_base_tpm.substitute(**substitutes)
-                except KeyError, k:
-                    logger.debug("--- Key error on ---")
-                    logger.debug(self.file)
-                    logger.debug(nidm_class)
-                    logger.debug(substitutes)
-                    raise KeyError(k)
-
-            for template in templates[1:]:
-                template_name = str.split(template, "-")[0]
-                if nidm_base_tpm is not None:
-                    template_name = base_template_name+"_"+template_name
-                    if class_example:
-                        class_example = class_example[:-1]+";\n"
-                logger.debug(" "+template_name)
-
-                fid = open(os.path.join(TPL_DIR, template_name+".txt"), 'r')
-                nidm_tpm = Template(fid.read())
-                fid.close()
-
-                try:
-                    class_example += nidm_tpm.substitute(**substitutes)
-                except KeyError, k:
-                    logger.debug("--- Key error on ---")
-                    logger.debug(self.file)
-                    logger.debug(nidm_class)
-                    logger.debug(substitutes)
-                    raise KeyError(k)
+            try:
+                class_example = templates.render(nidm_class, substitutes)
+            except KeyError, k:
+                logger.debug("--- Key error on ---")
+                logger.debug(self.file)
+                logger.debug(nidm_class)
+                logger.debug(substitutes)
+                raise KeyError(k)
 
             if self.one_file_per_class:
                 example_file = os.path.join(self.dir, nidm_class+".txt")
-                example_fid = open(example_file, 'w')
                 if self.remove_att is not None:
                     class_example = \
                         self.remove_attributes(self.remove_att, class_example)
@@ -123,114 +515,118 @@ class ExampleFromTemplate(object):
                 if "comment" in substitutes.keys():
                     class_example = "#  " + substitutes['comment'] + "\n\n" + \
                                     class_example
-                example_fid.write(str(class_example))
-                example_fid.close()
-
+                class_examples[example_file] = str(class_example)
             else:
                 example += class_example+"\n\n"
 
-        if not self.one_file_per_class:
-                if self.remove_att is not None:
-                    example = self.remove_attributes(self.remove_att, example)
-                if self.owl:
-                    example = self.replace_alphanum_id_by_prefixes(example)
-                example = namespaces+"\n"+example
-                if "comment" in substitutes.keys():
-                    class_example = "#  " + substitutes['comment'] + "\n\n" + \
-                                    class_example
-                if not os.path.isdir(os.path.dirname(self.file)):
-                    os.mkdir(os.path.dirname(self.file))
-                example_file = self.file
-                example_fid = open(example_file, 'w')
-                example_fid.write(str(example))
-                example_fid.close()
-
-                # Create JSON-LD version
-                g = rl.ConjunctiveGraph()
-                g.parse(example_file, format='turtle')
-                g2 = g.serialize(format='json-ld')
-
-                # Create nice JSON-LD version
-
-                # with open(os.path.join(TPL_DIR, "..", "nidmr.json")) as jnidm:
-                #     context = json.load(jnidm)
-
-                # context = {"@context":
-                #            os.path.join(TPL_DIR, "..", "nidmr.json")}
-                foo = ld.jsonld.compact(json.loads(g2), 
-                                        'http://purl.org/nidash/context')
-                with open(self.file.replace('.ttl', '.json'), "w") as fid:
-                    fid.write(json.dumps(foo, indent=2))
+        if self.one_file_per_class:
+            return class_examples
+
+        if self.remove_att is not None:
+            example = self.remove_attributes(self.remove_att, example)
+        if self.owl:
+            example = self.replace_alphanum_id_by_prefixes(example)
+        return str(namespaces+"\n"+example)
+
+    def create_example(self, json_ld=True):
+        """ Write the example (and its JSON-LD version if json_ld)"""
+        if self.backend == "graph":
+            self._create_example_from_graph(json_ld)
+            return
+
+        if self.one_file_per_class:
+            for example_file, class_example in sorted(self.render().items()):
+                with open(example_file, 'w') as example_fid:
+                    example_fid.write(class_example)
+                files_written.add(example_file)
+            return
+
+        example = self.render()
+        if not os.path.isdir(os.path.dirname(self.file)):
+            os.mkdir(os.path.dirname(self.file))
+        example_file = self.file
+        with open(example_file, 'w') as example_fid:
+            example_fid.write(example)
+        files_written.add(example_file)
+
+        # Create JSON-LD version (from the example in memory, with
+        # the same identifier as if the file was parsed)
+        if json_ld:
+            g = rl.ConjunctiveGraph()
+            g.parse(data=example, format='turtle',
+                    publicID=file_uri(example_file))
+            self._write_json_ld(g)
+
+    def _create_example_from_graph(self, json_ld=True):
+        g = self.create_graph(identifier=rl.URIRef(file_uri(self.file)))
+
+        if not os.path.isdir(os.path.dirname(self.file)):
+            os.mkdir(os.path.dirname(self.file))
+        with open(self.file, 'w') as fid:
+            fid.write(g.serialize(format='turtle'))
+        files_written.add(self.file)
+        if json_ld:
+            self._write_json_ld(g)
+
+    def _write_json_ld(self, g):
+        # Create nice JSON-LD version
+        with open(self.file.replace('.ttl', '.json'), "w") as fid:
+            fid.write(json.dumps(compact_json_ld(g), indent=2))
+        files_written.add(self.file.replace('.ttl', '.json'))
 
     def remove_attributes(self, terms, example):
-        for term in terms:
-            for att in re.findall(r"\s*"+q_graph.qname(term)+".*", example):
-                example = example.replace(att, "")
-                # If we removed the final dot then put it back
-                if att.rsplit(None, 1)[-1] == ".":
-                    example = example[::-1].replace(
-                        ";"[::-1], "."[::-1], 1)[::-1]
+        if not terms:
+            return example
+
+        # Lines (with the preceding whitespace) of all the attributes to
+        # remove, found in a single pass
+        att_re = re.compile(r"\s*(?:" + "|".join(
+            re.escape(q_graph.qname(term)) for term in terms) + ").*")
+
+        removed = att_re.findall(example)
+        example = att_re.sub("", example)
+
+        # If we removed final dots then put them back (on the last ";")
+        num_dots = len([att for att in removed
+                        if att.rsplit(None, 1)[-1] == "."])
+        if num_dots:
+            example = ".".join(example.rsplit(";", num_dots))
         return example
 
     def replace_alphanum_id_by_prefixes(self, example):
-        # FIXME: This should be done automatically using prefixes.csv
-        alphanum_ids = re.findall('nidm:NIDM_\d*', example) + \
-                       re.findall(
-                        'http://purl.org/nidash/nidm#NIDM_\d*', example) + \
-                       re.findall('obo:STATO_\d*', example) + \
-                       re.findall(
-                        'http://purl.obolibrary.org/obo/STATO_\d*', example) +\
-                       re.findall('obo:OBI_\d*', example) + \
-                       re.findall('spm:SPM_\d*', example) + \
-                       re.findall(
-                        'http://purl.org/nidash/spm#SPM_\d*', example) + \
-                       re.findall('fsl:FSL_\d*', example) + \
-                       re.findall(
-                        'http://purl.org/nidash/fsl#FSL_\d*', example) + \
-                       re.findall('nlx:[\w-]*', example) + \
-                       re.findall(
-                        'http://scicrunch.org/resolver/SCR_\d*', example) + \
-                       re.findall('scr:SCR_\w*', example)
-
-        prefix_definitions = ""
-        for idt in alphanum_ids:
-            if idt.startswith("nidm:"):
-                term_uri = NIDM[idt.split(":")[1]]
-            elif idt.startswith("http://purl.org/nidash/nidm"):
-                term_uri = NIDM[idt.split("#")[1]]
-            elif idt.startswith("obo:"):
-                term_uri = OBO[idt.split(":")[1]]
-            elif idt.startswith("http://purl.obolibrary.org/obo/STATO_"):
-                term_uri = OBO[idt.split("/")[-1]]
-            elif idt.startswith("spm:"):
-                term_uri = SPM[idt.split(":")[1]]
-            elif idt.startswith("http://purl.org/nidash/spm"):
-                term_uri = SPM[idt.split("#")[1]]
-            elif idt.startswith("fsl:"):
-                term_uri = FSL[idt.split(":")[1]]
-            elif idt.startswith("http://purl.org/nidash/fsl"):
-                term_uri = FSL[idt.split("#")[1]]
-            elif idt.startswith("nlx:"):
-                term_uri = NLX[idt.split(":")[1]]
-            elif idt.startswith("scr:"):
-                term_uri = SCR[idt.split(":")[1]]
-            elif idt.startswith("http://scicrunch.org/resolver/SCR_"):
-                term_uri = SCR[idt.split("/")[1]]
-            else:
-                raise Exception('Unknown alphanumeric id: ' + idt)
-
-            prefix_name = self.owl.get_label(term_uri).replace(" ", "")\
-                                                      .replace(":", "_")\
-                                                      .replace("'", "")\
-                                                      .replace("-", "")+":"
-            prefix_definition = "@prefix " + prefix_name + " <" + \
-                                str(term_uri)+"> .\n"
-            if prefix_definition not in prefix_definitions:
-                prefix_definitions += prefix_definition
-
-            example = example.replace(idt, prefix_name)
-
+        """ Replace the alphanumeric identifiers of the terms listed in
+        terms/prefixes.csv by prefixes named after the term labels"""
+        ids, alphanum_id_re = alphanum_ids()
+        # Prefix definition -> position of its first use
+        first_use = dict()
+        owl = self.owl
+
+        def replace(match):
+            prefix_name, prefix_definition = self._alphanum_prefix(
+                owl, ids[match.group(0)])
+            first_use.setdefault(prefix_definition, match.start())
+            return prefix_name
+
+        example = alphanum_id_re.sub(replace, example)
+
+        # Definitions are listed by order of appearance
+        prefix_definitions = "".join(
+            sorted(first_use, key=first_use.get))
         if prefix_definitions:
             example = prefix_definitions+"\n\n"+example
 
         return example
+
+    def _alphanum_prefix(self, owl, term_uri):
+        """ Prefix name (from the term label in owl) and prefix definition to
+        use in place of the alphanumeric identifier of term_uri"""
+        key = (self.owl_file, term_uri)
+        if key not in _alphanum_prefixes:
+            prefix_name = owl.get_label(term_uri).replace(" ", "")\
+                                                 .replace(":", "_")\
+                                                 .replace("'", "")\
+                                                 .replace("-", "")+":"
+            prefix_definition = "@prefix " + prefix_name + " <" + \
+                                str(term_uri)+"> .\n"
+            _alphanum_prefixes[key] = (prefix_name, prefix_definition)
+        return _alphanum_prefixes[key]
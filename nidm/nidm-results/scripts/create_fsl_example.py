@@ -20,7 +20,7 @@ from Constants import STATO_OLS_STR, STATO_OLS_LABEL, STATO_TSTATISTIC_STR, \
     q_graph, NLX_FMRI_PROTOCOL
 
 
-def main():
+def main(write=True):
     nidm_classes = {
         "ImagingInstrument": dict(
             id="niiri:mr_scanner_id",
@@ -488,7 +488,9 @@ id",
         os.path.dirname(os.path.abspath(__file__))), 'fsl')
     ttl_file = os.path.join(NIDM_FSL_DIR, 'fsl_results.ttl')
     example = ExampleFromTemplate(nidm_classes, ttl_file, False)
-    example.create_example()
+    if write:
+        example.create_example()
+    return example
 
 if __name__ == '__main__':
     main()
@@ -20,7 +20,7 @@ from Constants import STATO_GLS_STR, STATO_GLS_LABEL, STATO_TSTATISTIC_STR, \
     NLX_FMRI_PROTOCOL
 
 
-def main():
+def main(write=True):
     nidm_classes = {
         "ImagingInstrument": dict(
             id="niiri:mr_scanner_id",
@@ -694,7 +694,9 @@ fe9bfae278c7fc372b65cac7232ea58fd8fb5914014e7b9a5d6200592b12b2a728b",
         os.path.dirname(os.path.abspath(__file__))), 'fsl', "example001")
     ttl_file = os.path.join(NIDM_FSL_DIR, 'fsl_nidm.ttl')
     example = ExampleFromTemplate(nidm_classes, ttl_file, False)
-    example.create_example()
+    if write:
+        example.create_example()
+    return example
 
 if __name__ == '__main__':
     main()
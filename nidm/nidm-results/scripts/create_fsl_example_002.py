@@ -17,7 +17,7 @@ sys.path.append(os.path.join(NIDMRESULTSPATH, os.pardir, os.pardir, "scripts"))
 from Constants import OBO_P_VALUE_FWER_QNAME, OBO_STATISTIC_QNAME
 
 
-def main():
+def main(write=True):
     nidm_classes = {
         "HeightThreshold": dict(
             height_threshold_id="niiri:height_threshold_id",
@@ -44,7 +44,9 @@ def main():
         'voxelwise_p050_fwe')
     ttl_file = os.path.join(NIDM_FSL_DIR, 'nidm.ttl')
     example = ExampleFromTemplate(nidm_classes, ttl_file, False)
-    example.create_example()
+    if write:
+        example.create_example()
+    return example
 
 if __name__ == '__main__':
     main()
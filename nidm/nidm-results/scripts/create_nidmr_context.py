@@ -19,10 +19,16 @@ NIDMPATH = os.path.join(NIDMRESULTSPATH, os.pardir)
 
 # Append parent script directory to path
 sys.path.append(os.path.join(NIDMRESULTSPATH, os.pardir, os.pardir, "scripts"))
+from owl_cache import CachedOwlReader
 
 logging.basicConfig(filename='debug.log', level=logging.DEBUG, filemode='w')
 logger = logging.getLogger(__name__)
 
+# Ranges of the properties typed in the context
+NUMERIC_RANGES = frozenset([
+    XSD['int'], XSD['integer'], XSD['positiveInteger'], XSD['double'],
+    XSD['float']])
+
 
 def main(owl=None):
 
@@ -34,7 +40,7 @@ def main(owl=None):
         os.path.join(os.path.dirname(owl),
                      os.pardir, os.pardir, "imports", '*.ttl'))
 
-    owl = OwlReader(owl, import_owl_files=owl_imports)
+    owl = CachedOwlReader(owl, import_owl_files=owl_imports)
 
     prefix_file = os.path.join(
         os.path.dirname(__file__), '..', 'terms', 'prefixes.csv')
@@ -73,11 +79,16 @@ def main(owl=None):
     for s, o in sorted(owl.graph.subject_objects(SKOS['prefLabel'])):
         json_key = str(o)
         context['@context'][json_key] = OrderedDict()
+        # Numeric values are typed by the context. All the ranges are looked
+        # at (e.g. xsd:double and xsd:float) so that the type does not depend
+        # on the order of the set
+        numeric_ranges = sorted(
+            owl.ranges.get(s, set()) & NUMERIC_RANGES)
         if s in owl.ranges:
-            ranges = next(iter(owl.ranges[s]))
-            if 'http://www.w3.org/2001/XMLSchema#int' in ranges or 'http://www.w3.org/2001/XMLSchema#double' in ranges or 'http://www.w3.org/2001/XMLSchema#integer' in ranges or  'http://www.w3.org/2001/XMLSchema#positiveInteger' in ranges:
+            if numeric_ranges:
                 context['@context'][json_key]['@id'] = str(s)
-                context['@context'][json_key]['@type'] = ranges
+                context['@context'][json_key]['@type'] = str(
+                    numeric_ranges[0])
             else:
                 context['@context'][json_key] = str(s)
         else:
@@ -16,6 +16,7 @@ NIDMPATH = os.path.join(NIDMRESULTSPATH, os.pardir)
 sys.path.append(os.path.join(NIDMRESULTSPATH, os.pardir, os.pardir, "scripts"))
 from nidmresults.owl.owl_reader import *
 from nidmresults.objects.constants_rdflib import *
+from owl_cache import CachedOwlReader
 
 logging.basicConfig(filename='debug.log', level=logging.DEBUG, filemode='w')
 logger = logging.getLogger(__name__)
@@ -30,7 +31,7 @@ def main(owl=None):
         os.path.join(os.path.dirname(owl),
                      os.pardir, os.pardir, "imports", '*.ttl'))
 
-    owl_reader = OwlReader(owl, import_owl_files=owl_imports)
+    owl_reader = CachedOwlReader(owl, import_owl_files=owl_imports)
 
     owl_file = os.path.basename(owl)
     if "_" in owl_file:
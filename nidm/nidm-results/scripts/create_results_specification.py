@@ -2,6 +2,15 @@
 ''' Automatically-generates NIDM-Results specification based on
 nidm-results.owl
 
+Usage: python create_results_specification.py [version ...] [--all]
+                                              [--jobs N] [--manifest FILE]
+                                              [--spec-dir DIR]
+
+Several versions (or --all released versions and dev) can be built in one
+run, optionally in N parallel processes. A JSON manifest with the outcome
+and build time of each version is then written. Specifications are written
+in doc/content/specs (or DIR).
+
 @author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
 @copyright: University of Warwick 2014
 '''
@@ -12,6 +21,11 @@ from rdflib.compare import *
 import sys
 import collections
 import glob
+import json
+import timeit
+import argparse
+import traceback
+import multiprocessing
 
 RELPATH = os.path.dirname(os.path.abspath(__file__))
 NIDMRESULTSPATH = os.path.dirname(RELPATH)
@@ -19,7 +33,7 @@ NIDMPATH = os.path.join(NIDMRESULTSPATH, os.pardir)
 
 # Append parent script directory to path
 sys.path.append(os.path.join(NIDMRESULTSPATH, os.pardir, os.pardir, "scripts"))
-from owl_to_webpage import OwlSpecification
+from owl_to_webpage import OwlSpecification, DOC_FOLDER
 from nidmresults.objects.constants_rdflib import *
 
 logging.basicConfig(level=logging.DEBUG)
@@ -27,11 +41,19 @@ logger = logging.getLogger(__name__)
 
 TERMS_FOLDER = os.path.join(NIDMRESULTSPATH, 'terms')
 RELEASED_TERMS_FOLDER = os.path.join(TERMS_FOLDER, "releases")
+MANIFEST_FILE = os.path.join(
+    NIDMPATH, os.pardir, ".spec_build_manifest.json")
 
+# Released versions that can be built -> version of the previous
+# specification (linked from the header)
+PREVIOUS_VERSIONS = {
+    "020": "010",
+    "110": "100",
+    "130": "120",
+}
 
-def main(nidm_original_version):
-    nidm_version = nidm_original_version.replace(".", "")
 
+def get_owl_files(nidm_version):
     # Retreive owl file for NIDM-Results
     if nidm_version == "dev":
         owl_file = os.path.join(TERMS_FOLDER, 'nidm-results.owl')
@@ -43,6 +65,28 @@ def main(nidm_original_version):
         # For released version of the ontology imports are embedded
         import_files = None
 
+    return owl_file, import_files
+
+
+def released_versions():
+    """ Versions with an owl file in terms/releases that can be built (i.e.
+    with a known previous specification), e.g. 1.3.0"""
+    versions = list()
+    for owl_file in sorted(glob.glob(
+            os.path.join(RELEASED_TERMS_FOLDER, 'nidm-results_*.owl'))):
+        version = os.path.basename(owl_file)[len('nidm-results_'):-4]
+        if version not in PREVIOUS_VERSIONS:
+            continue
+        number, sep, suffix = version.partition("-")
+        versions.append(".".join(number) + sep + suffix)
+    return versions
+
+
+def main(nidm_original_version, spec_dir=None):
+    nidm_version = nidm_original_version.replace(".", "")
+
+    owl_file, import_files = get_owl_files(nidm_version)
+
     # check the file exists
     assert os.path.exists(owl_file)
 
@@ -171,7 +215,6 @@ def main(nidm_original_version):
         components["Inference"].remove(NIDM_CLUSTER_DEFINITION_CRITERIA)
         components["Inference"].remove(NIDM_PEAK_DEFINITION_CRITERIA)
         components["Inference"].remove(NIDM_DISPLAY_MASK_MAP)
-        components["Inference"].remove(NIDM_CONJUNCTION_INFERENCE)
 
         # The following classes were represented in another component in 0.2.0
         components["Parameters estimation"].remove(NIDM_RESELS_PER_VOXEL_MAP)
@@ -217,24 +260,27 @@ definitions and illustrative examples.</p>
     owlspec._header_footer(component="nidm-results", version=nidm_version)
 
     if not nidm_version == "dev":
-        if nidm_version == "110":
-            # Previous version
-            owlspec.text = owlspec.text.replace(
-                "nidm-results_020.html", "nidm-results_100.html")
-        elif nidm_version == "020":
-            # Previous version
-            owlspec.text = owlspec.text.replace(
-                "nidm-results_020.html", "nidm-results_010.html")
-        elif nidm_version == "130":
-            # Previous version
-            owlspec.text = owlspec.text.replace(
-                "nidm-results_020.html", "nidm-results_120.html")
-        else:
+        if nidm_version not in PREVIOUS_VERSIONS:
             raise Exception(
                 'Unknown previous specification for ' + nidm_version)
+        # Previous version
+        owlspec.text = owlspec.text.replace(
+            "nidm-results_020.html",
+            "nidm-results_" + PREVIOUS_VERSIONS[nidm_version] + ".html")
         owlspec.text = dev_to_release(owlspec.text, nidm_original_version)
 
-    owlspec.write_specification(component="nidm-results", version=nidm_version)
+    if spec_dir is None:
+        owlspec.write_specification(
+            component="nidm-results", version=nidm_version)
+    else:
+        owlspec.write_specification(spec_file=spec_file(
+            nidm_original_version, spec_dir))
+
+
+def spec_file(nidm_original_version, spec_dir):
+    """ Path of the specification of a version in spec_dir"""
+    return os.path.join(spec_dir, "nidm-results_" +
+                        nidm_original_version.replace(".", "") + ".html")
 
 
 def dev_to_release(text, full_version):
@@ -274,13 +320,90 @@ def _replace_term_by(renaming, components, used_by, generated_by,
              list(el if el != original_term else renamed_term for el in v))
             for (k, v) in components.items())
 
-    return list([components, used_by, generated_by, derived_from])
+    return list([components, used_by, generated_by, derived_from,
+                 attributed_to])
+
+
+def _build_version(args):
+    """ Build one specification in a worker process and return its entry
+    in the manifest"""
+    nidm_original_version, spec_dir = args
+    start = timeit.default_timer()
+    error = None
+    try:
+        main(nidm_original_version, spec_dir)
+    except Exception:
+        error = traceback.format_exc()
+
+    return collections.OrderedDict([
+        ("version", nidm_original_version),
+        ("file", spec_file(nidm_original_version, spec_dir or DOC_FOLDER)),
+        ("status", "failed" if error else "ok"),
+        ("seconds", round(timeit.default_timer() - start, 3)),
+        ("error", error)])
+
+
+def build_all(versions, jobs=1, manifest_file=MANIFEST_FILE, spec_dir=None):
+    """ Build the specification of each version in versions (in spec_dir if
+    given), in jobs parallel processes, and write a manifest of the
+    builds"""
+    start = timeit.default_timer()
+    tasks = [(version, spec_dir) for version in versions]
+
+    # Ontologies are read through the on-disk cache (see owl_cache.py) so
+    # that re-building the same versions does not parse them again
+    if jobs <= 1:
+        builds = list(map(_build_version, tasks))
+    else:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            builds = pool.map(_build_version, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    for build in builds:
+        if build["error"]:
+            logger.error("Specification " + build["version"] + " failed:\n" +
+                         build["error"])
+
+    manifest = collections.OrderedDict([
+        ("jobs", jobs),
+        ("seconds", round(timeit.default_timer() - start, 3)),
+        ("builds", builds)])
+    with open(manifest_file, 'w') as fid:
+        json.dump(manifest, fid, indent=2, separators=(',', ': '))
+
+    return manifest
 
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
-        nidm_version = sys.argv[1]
+    parser = argparse.ArgumentParser(
+        description="Create the NIDM-Results specification document(s)")
+    parser.add_argument("versions", nargs="*",
+                        help="version(s) to build, e.g. dev or 1.3.0")
+    parser.add_argument("--all", action="store_true",
+                        help="build all released versions and dev")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of versions built in parallel")
+    parser.add_argument("--manifest", default=MANIFEST_FILE,
+                        help="JSON file listing the outcome and duration of "
+                        "each build (when building several versions)")
+    parser.add_argument("--spec-dir",
+                        help="directory of the specifications (default: "
+                        "doc/content/specs)")
+    args = parser.parse_args()
+
+    versions = args.versions
+    if args.all:
+        versions = released_versions() + ["dev"]
+    elif not versions:
+        versions = ["dev"]
+
+    if len(versions) == 1 and args.jobs <= 1:
+        main(versions[0], args.spec_dir)
     else:
-        nidm_version = 'dev'
-
-    main(nidm_version)
+        manifest = build_all(versions, args.jobs, args.manifest,
+                             args.spec_dir)
+        if any(build["error"] for build in manifest["builds"]):
+            sys.exit(1)
@@ -20,7 +20,7 @@ NIDMRESULTSPATH = os.path.dirname(RELPATH)
 sys.path.append(os.path.join(NIDMRESULTSPATH, os.pardir, os.pardir, "scripts"))
 
 
-def main():
+def main(write=True):
     nidm_classes = {
         "ImagingInstrument": dict(
             id="niiri:mr_scanner_id",
@@ -646,7 +646,9 @@ def main():
         os.path.dirname(os.path.abspath(__file__))), 'spm')
     ttl_file = os.path.join(NIDM_SPM_DIR, 'spm_results.ttl')
     example = ExampleFromTemplate(nidm_classes, ttl_file, False)
-    example.create_example()
+    if write:
+        example.create_example()
+    return example
 
 
 if __name__ == '__main__':
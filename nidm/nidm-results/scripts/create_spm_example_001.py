@@ -19,7 +19,7 @@ from Constants import STATO_GLS_STR, STATO_GLS_LABEL, STATO_TSTATISTIC_STR, \
     NIDM_P_VALUE_UNCORRECTED_QNAME, NLX_MRI_SCANNER, q_graph, NLX_FMRI_PROTOCOL
 
 
-def main():
+def main(write=True):
     nidm_classes = {
         "ImagingInstrument": dict(
             id="niiri:mr_scanner_id",
@@ -635,7 +635,9 @@ c04ec92100a2d8ea86a8df24ba44617aca7457ddcb2f42253fc17e33296a1aea1cb",
         os.path.dirname(os.path.abspath(__file__))), 'spm', "example001")
     ttl_file = os.path.join(NIDM_SPM_DIR, 'example001_spm_results.ttl')
     example = ExampleFromTemplate(nidm_classes, ttl_file, False)
-    example.create_example()
+    if write:
+        example.create_example()
+    return example
 
 if __name__ == '__main__':
     main()
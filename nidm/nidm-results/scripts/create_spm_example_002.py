@@ -19,7 +19,7 @@ from Constants import STATO_OLS_STR, STATO_OLS_LABEL, STATO_TSTATISTIC_STR, \
     NIDM_P_VALUE_UNCORRECTED_QNAME, NLX_MRI_SCANNER, q_graph, NLX_FMRI_PROTOCOL
 
 
-def main():
+def main(write=True):
     nidm_classes = {
         "ImagingInstrument": dict(
             id="niiri:mr_scanner_id",
@@ -880,7 +880,9 @@ ecce86ba261f7aeb43717f5d0e47ad0b14cfb0402786251e3f2c507890c83b27652",
         os.path.dirname(os.path.abspath(__file__))), 'spm', "example002")
     ttl_file = os.path.join(NIDM_SPM_DIR, 'spm_results_2contrasts.ttl')
     example = ExampleFromTemplate(nidm_classes, ttl_file, False)
-    example.create_example()
+    if write:
+        example.create_example()
+    return example
 
 if __name__ == '__main__':
     main()
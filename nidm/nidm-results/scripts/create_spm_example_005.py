@@ -9,7 +9,7 @@ templates available in nidm/nidm-results/terms/templates
 import os
 from create_example_from_templates import ExampleFromTemplate
 
-def main():
+def main(write=True):
 	nidm_classes = {
 		"DisplayMaskMap": dict(
 			display_map_id="niiri:display_map_id",
@@ -42,7 +42,9 @@ def main():
         	os.path.abspath(__file__))), 'test', 'ground_truth', 'display_mask')
 	ttl_file = os.path.join(NIDM_SPM_DIR, 'nidm.ttl')
 	example = ExampleFromTemplate(nidm_classes, ttl_file, False)
-	example.create_example()
+	if write:
+		example.create_example()
+	return example
 	
 if __name__ == '__main__':
 	main()
\ No newline at end of file
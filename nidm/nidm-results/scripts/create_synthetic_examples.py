@@ -0,0 +1,449 @@
+"""
+Create synthetic NIDM-Results documents, of configurable size, by using the
+class templates available in nidm/nidm-results/terms/templates. These are
+meant to load test the queries, validation and serialisation on
+documents as large as the ones exported from real analyses (e.g. 10000
+peaks). The identifiers, sha512 and statistics are random but seeded: the
+same options always give the same documents.
+
+Usage: python create_synthetic_examples.py OUT_DIR [--documents N]
+    [--contrasts C] [--pe-maps M] [--clusters K] [--peaks P] [--seed S]
+    [--backend {text,graph}] [--no-json-ld] [--jobs J]
+
+Document i is written in OUT_DIR/synthetic_<i>/nidm.ttl (and nidm.json)
+and has C contrasts, each with K clusters of P peaks, and M parameter
+estimate maps.
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+"""
+import os
+import sys
+import math
+import random
+import argparse
+import multiprocessing
+from create_example_from_templates import ExampleFromTemplate
+
+RELPATH = os.path.dirname(os.path.abspath(__file__))
+NIDMRESULTSPATH = os.path.dirname(RELPATH)
+# Append parent script directory to path
+sys.path.append(os.path.join(NIDMRESULTSPATH, os.pardir, os.pardir, "scripts"))
+from Constants import STATO_OLS_STR, STATO_OLS_LABEL, STATO_TSTATISTIC_STR, \
+    STATO_TSTATISTIC_LABEL, OBO_P_VALUE_FWER_QNAME, NLX_MRI_SCANNER, \
+    NLX_FMRI_PROTOCOL, q_graph
+
+DOCUMENT_DIR = "synthetic_%04d"
+
+# Bounding box (in mm) of the MNI coordinates of the synthetic peaks
+MNI_BOUNDS = [(-78, 78), (-112, 76), (-50, 85)]
+# Number of voxels and resels of the synthetic search volume
+SEARCH_VOL_VOXELS = 69306
+SEARCH_VOL_RESELS = 467.07642343881
+ERROR_DOF = 72.9999999990787
+
+
+def _id(rng):
+    """ Identifier as exported by nidmresults (uuid-like)"""
+    return "niiri:%032x" % rng.getrandbits(128)
+
+
+def _sha(rng):
+    return "%0128x" % rng.getrandbits(512)
+
+
+def _float(value):
+    return "%.15g" % value
+
+
+def _map(rng, label, filename, coordinate_space_id, **kwargs):
+    """ Substitutes common to all the maps"""
+    return dict(label=label, location=filename, filename=filename,
+                format="image/nifti", coordinate_space_id=coordinate_space_id,
+                sha=_sha(rng), **kwargs)
+
+
+def _p_value_unc(t_value):
+    """ One-sided p-value of t_value (normal approximation)"""
+    return 0.5*math.erfc(t_value/math.sqrt(2))
+
+
+def synthetic_classes(contrasts=1, pe_maps=2, clusters=5, peaks=3,
+                      rng=None):
+    """ Substitutes of the class templates of a synthetic SPM analysis with
+    contrasts T-contrasts each with clusters clusters of peaks peaks"""
+    if rng is None:
+        rng = random.Random(0)
+
+    software_id = _id(rng)
+    exporter_id = _id(rng)
+    export_id = _id(rng)
+    scanner_id = _id(rng)
+    group_id = _id(rng)
+    data_id = _id(rng)
+    design_matrix_id = _id(rng)
+    design_matrix_png_id = _id(rng)
+    # niiri:error_model_id is used in the template of ModelParametersEstimation
+    error_model_id = "niiri:error_model_id"
+    model_pe_id = _id(rng)
+    coordinate_space_id = _id(rng)
+    mask_id = _id(rng)
+    rms_map_id = _id(rng)
+    pe_map_ids = [_id(rng) for pe_map in range(pe_maps)]
+    contrast_est_ids = [_id(rng) for contrast in range(contrasts)]
+
+    nidm_classes = {
+        "NIDMBundle": dict(
+            bundle_id=_id(rng),
+            label="NIDM-Results",
+            object_model="nidm:NIDM_0000027",
+            version="1.3.0",
+            time="2017-01-%02dT10:30:00.000+01:00" % rng.randint(1, 31),
+            export_id=export_id),
+        "Export": dict(
+            export_id=export_id,
+            label="NIDM-Results export",
+            exporter_id=exporter_id),
+        "ExporterSoftware": dict(
+            software_id=exporter_id,
+            software_type="nidm:NIDM_0000168",
+            label="spm_results_nidm",
+            version="12b.5858"),
+        "SPM_Software": dict(
+            software_id=software_id,
+            software_type="scr:SCR_007037",
+            label="SPM",
+            version="12b.5853"),
+        "ImagingInstrument": dict(
+            id=scanner_id,
+            label="MRI Scanner",
+            type=q_graph.qname(NLX_MRI_SCANNER)),
+        "Group": dict(
+            id=group_id,
+            label="Group: Control",
+            name="Control",
+            numsubjects=str(rng.randint(10, 100))),
+        "Data": dict(
+            data_id=data_id,
+            label="Data",
+            scaling="true",
+            target=100,
+            scanner_id=scanner_id,
+            sub_or_group_id=group_id,
+            mr_protocol=q_graph.qname(NLX_FMRI_PROTOCOL)),
+        "DesignMatrix": dict(
+            design_matrix_id=design_matrix_id,
+            label="Design Matrix",
+            location="DesignMatrix.csv",
+            format="text/csv",
+            filename="DesignMatrix.csv",
+            design_matrix_png_id=design_matrix_png_id),
+        "Image-DesignMatrix": dict(
+            image_id=design_matrix_png_id,
+            location="DesignMatrix.png",
+            filename="DesignMatrix.png",
+            format="image/png"),
+        "ErrorModel": dict(
+            error_model_id=error_model_id,
+            noise_distribution="obo:STATO_0000227",
+            variance_homo="true",
+            variance_spatial="nidm:NIDM_0000073",
+            dependence="nidm:NIDM_0000048",
+            dependence_spatial="nidm:NIDM_0000073"),
+        "ModelParametersEstimation": dict(
+            model_pe_id=model_pe_id,
+            label="Model parameters estimation",
+            est_method=STATO_OLS_STR,
+            est_method_comment=STATO_OLS_LABEL,
+            design_matrix_id=design_matrix_id,
+            data_matrix_id=data_id,
+            error_model_id=error_model_id,
+            software_id=software_id),
+        "CoordinateSpace": dict(
+            coordinate_space_id=coordinate_space_id,
+            label="Coordinate space 1",
+            voxel_to_world_mapping="[[-2, 0, 0, 78],[0, 2, 0, -112],\
+[0, 0, 2, -50],[0, 0, 0, 1]]",
+            voxel_units="[ \\\"mm\\\", \\\"mm\\\", \\\"mm\\\" ]",
+            voxel_size="[ 2, 2, 2 ]",
+            coord_system="nidm:NIDM_0000051",
+            number_of_dim="3",
+            dimensions="[ 79, 95, 68 ]"),
+        "MaskMap_Analysis": _map(
+            rng, "Mask", "Mask.nii.gz", coordinate_space_id,
+            mask_id=mask_id,
+            user_defined="false",
+            generated_by_act_id=model_pe_id,
+            used_by_act_id=contrast_est_ids[0]),
+        "ResidualMeanSquaresMap": _map(
+            rng, "Residual Mean Squares Map",
+            "ResidualMeanSquares.nii.gz", coordinate_space_id,
+            residual_mean_squares_map_id=rms_map_id,
+            param_est_id=model_pe_id),
+        "GrandMeanMap": _map(
+            rng, "Grand Mean Map", "GrandMean.nii.gz",
+            coordinate_space_id,
+            grand_mean_map_id=_id(rng),
+            masked_median=str(rng.randint(80, 150)),
+            model_pe_id=model_pe_id),
+        }
+
+    for pe_map, pe_map_id in enumerate(pe_map_ids, 1):
+        nidm_classes["ParameterEstimateMap-%d" % pe_map] = _map(
+            rng, "Beta Map %d" % pe_map,
+            "ParameterEstimate_%04d.nii.gz" % pe_map, coordinate_space_id,
+            beta_map_id=pe_map_id,
+            param_est_id=model_pe_id)
+
+    for contrast, contrast_est_id in enumerate(contrast_est_ids, 1):
+        contrast_id = _id(rng)
+        contrast_name = "contrast %d" % contrast
+        inference_id = _id(rng)
+        statistic_map_id = _id(rng)
+        height_threshold_id = _id(rng)
+        extent_threshold_id = _id(rng)
+        peak_def_id = _id(rng)
+        cluster_def_id = _id(rng)
+        excursion_set_id = _id(rng)
+        cluster_label_map_id = _id(rng)
+        mip_id = _id(rng)
+
+        weights = [0]*pe_maps
+        weights[(contrast-1) % pe_maps] = 1
+        nidm_classes["ContrastWeights-%d" % contrast] = dict(
+            contrast_id=contrast_id,
+            label="Contrast: " + contrast_name,
+            value=str(weights),
+            statistic_type=STATO_TSTATISTIC_STR,
+            stat_type_comment=STATO_TSTATISTIC_LABEL,
+            contrast_name=contrast_name)
+        nidm_classes["ContrastEstimation-%d" % contrast] = dict(
+            contrast_estimation_id=contrast_est_id,
+            label="Contrast estimation %d" % contrast,
+            software_id=software_id,
+            mask_id=mask_id,
+            residual_mean_squares_map_id=rms_map_id,
+            design_matrix_id=design_matrix_id,
+            contrast_id=contrast_id,
+            param_est_map=pe_map_ids[0])
+        for pe_map, pe_map_id in enumerate(pe_map_ids[1:], 2):
+            nidm_classes["ContrastEstUsedParamEst-%d-%d" % (
+                contrast, pe_map)] = dict(
+                    contrast_estimation_id=contrast_est_id,
+                    param_est_map=pe_map_id)
+        nidm_classes["ContrastMap-%d" % contrast] = _map(
+            rng, "Contrast Map: " + contrast_name,
+            "Contrast_%04d.nii.gz" % contrast, coordinate_space_id,
+            contrast_map_id=_id(rng),
+            contrast_name=contrast_name,
+            contrast_est_id=contrast_est_id)
+        nidm_classes["ContrastStandardErrorMap-%d" % contrast] = _map(
+            rng, "Contrast %d Standard Error Map" % contrast,
+            "ContrastStandardError_%04d.nii.gz" % contrast,
+            coordinate_space_id,
+            contrast_standard_error_map_id=_id(rng),
+            contrast_est_id=contrast_est_id)
+        nidm_classes["StatisticMap-%d" % contrast] = _map(
+            rng, "T-Statistic Map: " + contrast_name,
+            "TStatistic_%04d.nii.gz" % contrast, coordinate_space_id,
+            statistic_map_id=statistic_map_id,
+            statistic_type=STATO_TSTATISTIC_STR,
+            stat_type_comment=STATO_TSTATISTIC_LABEL,
+            contrast_name=contrast_name,
+            error_dof=_float(ERROR_DOF),
+            effect_dof="1",
+            contrast_est_id=contrast_est_id)
+
+        nidm_classes["HeightThreshold-%d" % contrast] = dict(
+            height_threshold_id=height_threshold_id,
+            thresh_type=OBO_P_VALUE_FWER_QNAME,
+            label="Height Threshold: p<0.05 (FWE)",
+            value="0.05")
+        nidm_classes["ExtentThresholdStat-%d" % contrast] = dict(
+            extent_threshold_id=extent_threshold_id,
+            label="Extent Threshold: k>=0",
+            cluster_size_vox="0")
+        nidm_classes["PeakDefinitionCriteria_MaxPeaks-%d" % contrast] = dict(
+            peak_definition_criteria_id=peak_def_id,
+            label="Peak Definition Criteria",
+            max_num_peaks=str(peaks),
+            min_dist_peaks="8.0")
+        nidm_classes["ClusterDefinitionCriteria-%d" % contrast] = dict(
+            cluster_definition_criteria_id=cluster_def_id,
+            label="Cluster Connectivity Criterion: 18",
+            connectivity="nidm:NIDM_0000128")
+        nidm_classes["Inference-%d" % contrast] = dict(
+            inference_id=inference_id,
+            label="Inference %d" % contrast,
+            alternative_hyp="nidm:NIDM_0000060",
+            stat_map_id=statistic_map_id,
+            height_thresh_id=height_threshold_id,
+            extent_thresh_id=extent_threshold_id,
+            peak_def_id=peak_def_id,
+            cluster_def_id=cluster_def_id,
+            mask_id=mask_id,
+            software_id=software_id)
+        nidm_classes["SearchSpaceMaskMap-%d" % contrast] = _map(
+            rng, "Search Space Mask Map",
+            "SearchSpaceMask_%04d.nii.gz" % contrast, coordinate_space_id,
+            search_space_id=_id(rng),
+            user_defined="false",
+            expected_num_voxels=_float(rng.uniform(1, 10)),
+            expected_num_clusters=_float(rng.uniform(0.01, 0.1)),
+            height_critical_fwe05=_float(rng.uniform(4.5, 5.5)),
+            height_critical_fdr05=_float(rng.uniform(5, 6)),
+            smallest_size_fwe05=str(rng.randint(5, 20)),
+            smallest_size_fdr05=str(rng.randint(20, 40)),
+            search_vol_voxels=str(SEARCH_VOL_VOXELS),
+            search_vol_units=str(SEARCH_VOL_VOXELS*8),
+            resel_size=_float(SEARCH_VOL_VOXELS/SEARCH_VOL_RESELS),
+            search_vol_resels=_float(SEARCH_VOL_RESELS),
+            search_vol_resels_geom="[7, 42.96312274763, 269.40914815306, \
+467.07642343881]",
+            noise_fwhm_in_voxels="[ 5.41278985910694, 5.43638957240286, \
+4.51666658877481 ]",
+            noise_fwhm_in_units="[ 16.2383695773208, 16.3091687172086, \
+13.5499997663244 ]",
+            random_field_station="true",
+            inference_id=inference_id)
+
+        # Largest clusters first, with the strongest peaks
+        cluster_sizes = sorted(
+            (int(rng.lognormvariate(4, 1.2))+1 for cluster in range(clusters)),
+            reverse=True)
+        nidm_classes["ExcursionSetMap-%d" % contrast] = _map(
+            rng, "Excursion Set Map",
+            "ExcursionSet_%04d.nii.gz" % contrast, coordinate_space_id,
+            id=excursion_set_id,
+            cluster_label_map_id=cluster_label_map_id,
+            max_intensity_projection_id=mip_id,
+            num_of_clusters=str(clusters),
+            p_value=_float(rng.uniform(1e-10, 1e-5)),
+            inference_id=inference_id)
+        nidm_classes["ClusterLabelsMap-%d" % contrast] = _map(
+            rng, "Cluster Labels Map", "ClusterLabels_%04d.nii.gz" % contrast,
+            coordinate_space_id,
+            cluster_label_map_id=cluster_label_map_id)
+        nidm_classes["Image-MaximumIntensityProjection-%d" % contrast] = \
+            dict(
+                image_id=mip_id,
+                location="MaximumIntensityProjection_%04d.png" % contrast,
+                filename="MaximumIntensityProjection_%04d.png" % contrast,
+                format="image/png")
+
+        t_values = sorted((rng.uniform(3.2, 20)
+                           for peak in range(clusters*peaks)), reverse=True)
+        for cluster, cluster_size in enumerate(cluster_sizes, 1):
+            cluster_id = _id(rng)
+            p_value_unc = 10**-(cluster_size**0.5*rng.uniform(0.3, 0.6))
+            nidm_classes["SupraThresholdCluster-%d-%d" % (
+                contrast, cluster)] = dict(
+                    cluster_id=cluster_id,
+                    label="Supra-Threshold Cluster: %04d" % cluster,
+                    cluster_size_in_voxels=str(cluster_size),
+                    cluster_label_id=str(cluster),
+                    cluster_size_in_resels=_float(
+                        cluster_size*SEARCH_VOL_RESELS/SEARCH_VOL_VOXELS),
+                    p_value_unc=_float(p_value_unc),
+                    p_value_fwe=_float(min(1, p_value_unc*SEARCH_VOL_RESELS)),
+                    p_value_fdr=_float(min(1, p_value_unc*clusters/cluster)),
+                    excursion_set_id=excursion_set_id)
+
+            for peak in range(1, peaks+1):
+                peak_num = (cluster-1)*peaks+peak
+                t_value = t_values[peak_num-1]
+                p_uncorr = _p_value_unc(t_value)
+                coordinate_id = _id(rng)
+                nidm_classes["Peak_ValueP-%d-%d" % (contrast, peak_num)] = \
+                    dict(
+                        peak_id=_id(rng),
+                        label="Peak: %04d" % peak_num,
+                        location=coordinate_id,
+                        value=_float(t_value),
+                        equiv_z=_float(t_value*(1-1/(4*ERROR_DOF))),
+                        p_uncorr=_float(p_uncorr),
+                        p_value_fwe=_float(
+                            min(1, p_uncorr*SEARCH_VOL_RESELS)),
+                        p_value_fdr=_float(
+                            min(1, p_uncorr*clusters*peaks/peak_num)),
+                        cluster_id=cluster_id)
+                nidm_classes["Coordinate-%d-%d" % (contrast, peak_num)] = \
+                    dict(
+                        coordinate_id=coordinate_id,
+                        label="Coordinate: %04d" % peak_num,
+                        coord="[ %s ]" % ", ".join(
+                            str(rng.randrange(low, high, 2))
+                            for low, high in MNI_BOUNDS))
+
+    return nidm_classes
+
+
+def document_rng(seed, document):
+    """ Random generator of document number document of a run seeded with
+    seed"""
+    return random.Random((seed, document))
+
+
+def create_document(out_dir, document, seed=0, backend="graph",
+                    json_ld=True, **size):
+    """ Write synthetic document number document (seeded with seed and
+    document) and return the path to its Turtle file"""
+    nidm_classes = synthetic_classes(
+        rng=document_rng(seed, document), **size)
+    ttl_file = os.path.join(out_dir, DOCUMENT_DIR % document, "nidm.ttl")
+    example = ExampleFromTemplate(nidm_classes, ttl_file, backend=backend)
+    example.create_example(json_ld)
+    return ttl_file
+
+
+def _create_document(args):
+    out_dir, document, options = args
+    return create_document(out_dir, document, **options)
+
+
+def main(out_dir, documents=1, jobs=1, **options):
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    tasks = [(out_dir, document, options)
+             for document in range(1, documents+1)]
+    if jobs <= 1:
+        return [_create_document(task) for task in tasks]
+
+    pool = multiprocessing.Pool(jobs)
+    try:
+        return pool.map(_create_document, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Create synthetic NIDM-Results documents")
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("-n", "--documents", type=int, default=1,
+                        help="number of documents")
+    parser.add_argument("--contrasts", type=int, default=1,
+                        help="number of contrasts per document")
+    parser.add_argument("--pe-maps", type=int, default=2,
+                        help="number of parameter estimate maps")
+    parser.add_argument("--clusters", type=int, default=5,
+                        help="number of clusters per contrast")
+    parser.add_argument("--peaks", type=int, default=3,
+                        help="number of peaks per cluster")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the documents")
+    parser.add_argument("--backend", choices=ExampleFromTemplate.BACKENDS,
+                        default="graph", help="example builder")
+    parser.add_argument("--no-json-ld", dest="json_ld", action="store_false",
+                        help="only write the Turtle documents (compacting "
+                        "large JSON-LD documents is slow)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of documents created in parallel")
+    args = parser.parse_args()
+
+    main(args.out_dir, documents=args.documents, jobs=args.jobs,
+         contrasts=args.contrasts, pe_maps=args.pe_maps,
+         clusters=args.clusters, peaks=args.peaks, seed=args.seed,
+         backend=args.backend, json_ld=args.json_ld)
@@ -31,7 +31,7 @@ NIDM_TERMS_DIR = os.path.join(os.path.dirname(
 EX_DIR = os.path.join(NIDM_TERMS_DIR, 'examples')
 
 
-def main():
+def main(write=True):
     nidm_classes = {
         "NIDMBundle": dict(
             comment="NIDM-Results Bundle",
@@ -596,11 +596,13 @@ _id",
             )
         }
 
-    # Delete old examples
-    shutil.rmtree(EX_DIR)
-    os.mkdir(EX_DIR)
     example = ExampleFromTemplate(nidm_classes, EX_DIR, True)
-    example.create_example()
+    if write:
+        # Delete old examples
+        shutil.rmtree(EX_DIR)
+        os.mkdir(EX_DIR)
+        example.create_example()
+    return example
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+"""
+nidm-bulk-query: run one of the NIDM-Results queries (see nidm_queries.py)
+over all the documents of a directory tree and write the results as a single
+table, with the path of the document each row comes from in a first "source"
+column.
+
+The documents are streamed to a bounded pool of worker processes (as in
+nidm_validate.py) and the rows of each document are written as soon as they
+are available, in the order of the documents, so that memory does not grow
+with the number of documents. The peaks and clusters queries are computed
+with nidm_tables.py (same rows, without SPARQL).
+
+Usage: nidm_bulk_query.py QUERY PATH [PATH ...] [--output FILE] [--jobs J]
+
+QUERY is a query name (contrasts, height_extent_metadata, peaks, clusters,
+mask) or the name of its file (e.g. peak.rq). Each PATH is a NIDM-Results
+document (Turtle .ttl or JSON-LD .json/.jsonld) or a directory searched
+(recursively) for such documents. The table is written in CSV (standard
+output by default) or in Parquet if FILE ends with .parquet (requires
+pyarrow). The types of the Parquet columns are those of the ontology ranges
+of the properties of the query: int64 (xsd:int, xsd:positiveInteger...),
+float64 (xsd:float, xsd:double) or string (any other value, e.g. IRIs or
+prov:value). Documents that cannot be read or queried, or with values that
+are not of the type of their column, are reported on the standard error
+(without writing any of their rows) and the exit code is then 1.
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+"""
+import os
+import sys
+import csv
+import argparse
+import multiprocessing
+from rdflib import XSD
+from nidm_validate import find_documents, load_document, imap_bounded
+from nidm_queries import QUERIES, prepare, query, column_predicates
+from nidm_tables import PEAK_COLUMNS, CLUSTER_COLUMNS, peak_rows, \
+    cluster_rows, _is_number
+from owl_cache import get_owl_reader
+from validate_examples import OWL_FILE, find_import_files
+
+# Queries computed without SPARQL: name -> (columns, rows(graph))
+FAST_QUERIES = {
+    "peaks": (PEAK_COLUMNS, peak_rows),
+    "clusters": (CLUSTER_COLUMNS, cluster_rows),
+}
+
+# Number of rows per Parquet row group
+ROW_GROUP_SIZE = 10000
+
+# Ranges of the integer and float columns
+INT_RANGES = frozenset([XSD['int'], XSD['integer'], XSD['positiveInteger']])
+FLOAT_RANGES = frozenset([XSD['float'], XSD['double']])
+
+
+def query_name(name):
+    """ Name of the query given by its name or file name"""
+    if name in QUERIES:
+        return name
+    for known_name, query_file in QUERIES.items():
+        if os.path.basename(name) == query_file:
+            return known_name
+    raise ValueError("Unknown query: " + name + " (should be one of " +
+                     ", ".join(QUERIES) + ")")
+
+
+def columns(name):
+    """ Columns of the table of query name (without source)"""
+    if name in FAST_QUERIES:
+        return list(FAST_QUERIES[name][0])
+    return list(prepare(name).columns)
+
+
+def column_types(name, owl_file=OWL_FILE):
+    """ Type ("int", "float" or "string") of each column of query name, from
+    the ontology ranges of the properties that bind it"""
+    ranges = get_owl_reader(owl_file, find_import_files(owl_file)).ranges
+    types = list()
+    for column, predicates in column_predicates(name).items():
+        column_ranges = [ranges.get(predicate) for predicate in predicates]
+        if not column_ranges or not all(column_ranges):
+            types.append("string")
+        elif all(found <= INT_RANGES for found in column_ranges):
+            types.append("int")
+        elif all(found <= INT_RANGES | FLOAT_RANGES
+                 for found in column_ranges):
+            types.append("float")
+        else:
+            types.append("string")
+    return types
+
+
+def column_value(value, column_type):
+    """ value converted to column_type ("int", "float" or "string"). Raises
+    ValueError if value is not of that type (e.g. 1.5 for "int")"""
+    if value is None or column_type == "string":
+        return _unicode(value)
+    try:
+        if isinstance(value, bool):
+            raise ValueError()
+        if column_type == "int":
+            # int(1.5) would truncate: numbers are converted from their text
+            return int(value if isinstance(value, (int, long))
+                       else _unicode(value))
+        return float(value if _is_number(value) else _unicode(value))
+    except (ValueError, TypeError):
+        raise ValueError("%s is not %s" % (repr(value), column_type))
+
+
+def _unicode(value):
+    if value is None or isinstance(value, unicode):
+        return value
+    if isinstance(value, float):
+        # str() would round to 12 significant digits
+        return unicode(repr(value))
+    if isinstance(value, str):
+        return value.decode('utf-8')
+    return unicode(value)
+
+
+def _text(value):
+    value = _unicode(value)
+    if value is None:
+        return None
+    return value.encode('utf-8')
+
+
+# Query of the current (worker) process
+_query_name = None
+
+
+def _init_worker(name):
+    global _query_name
+    _query_name = name
+
+
+def query_document(path):
+    """ (path, rows as tuples of Python values, error message or None) of
+    the current query on the document at path"""
+    try:
+        graph = load_document(path)
+        if _query_name in FAST_QUERIES:
+            rows = FAST_QUERIES[_query_name][1](graph)
+        else:
+            rows = query(_query_name, graph)
+    except Exception as e:
+        return path, (), "%s: %s" % (type(e).__name__, e)
+    return path, [tuple(row) for row in rows], None
+
+
+def bulk_query(name, paths, jobs=None):
+    """ (path, rows, error) of query name on each document in paths, in
+    order, computed by a pool of jobs processes (by default, one per CPU)"""
+    name = query_name(name)
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    return imap_bounded(query_document, find_documents(paths), jobs,
+                        _init_worker, (name,))
+
+
+class CsvTable(object):
+
+    def __init__(self, out, header):
+        self.writer = csv.writer(out)
+        self.writer.writerow(header)
+
+    def write(self, rows):
+        self.writer.writerows(
+            tuple(_text(value) for value in row) for row in rows)
+
+    def close(self):
+        pass
+
+
+class ParquetTable(object):
+    """ Table with columns of the given types ("int", "float" or "string"),
+    written by row groups of ROW_GROUP_SIZE rows"""
+
+    def __init__(self, path, header, types):
+        import pyarrow
+        import pyarrow.parquet
+        self.pyarrow = pyarrow
+        self.types = types
+        arrow_types = {"int": pyarrow.int64(), "float": pyarrow.float64(),
+                       "string": pyarrow.string()}
+        self.schema = pyarrow.schema(
+            [(column, arrow_types[column_type])
+             for column, column_type in zip(header, types)])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self.rows = list()
+
+    def write(self, rows):
+        # All the rows are converted before any is kept, so that rows with a
+        # value of the wrong type are not written at all
+        self.rows.extend([
+            tuple(column_value(value, column_type)
+                  for value, column_type in zip(row, self.types))
+            for row in rows])
+        if len(self.rows) >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            arrays = [self.pyarrow.array(list(column), type=field.type)
+                      for column, field in zip(zip(*self.rows), self.schema)]
+            self.writer.write_table(self.pyarrow.Table.from_arrays(
+                arrays, schema=self.schema))
+            self.rows = list()
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def main(name, paths, output=None, jobs=None):
+    name = query_name(name)
+    header = ["source"] + columns(name)
+
+    if output and output.endswith(".parquet"):
+        table = ParquetTable(output, header,
+                             ["string"] + column_types(name))
+        out = None
+    else:
+        out = open(output, 'wb') if output else sys.stdout
+        table = CsvTable(out, header)
+
+    num_documents = num_rows = num_errors = 0
+    try:
+        for path, rows, error in bulk_query(name, paths, jobs):
+            num_documents += 1
+            if not error:
+                try:
+                    table.write((path,) + row for row in rows)
+                except ValueError as e:
+                    error = "%s: %s" % (type(e).__name__, e)
+            if error:
+                num_errors += 1
+                sys.stderr.write(path + ": " + error + "\n")
+                continue
+            num_rows += len(rows)
+    finally:
+        table.close()
+        if out is not None and out is not sys.stdout:
+            out.close()
+
+    sys.stderr.write("%d row(s) from %d document(s), %d error(s)\n" % (
+        num_rows, num_documents, num_errors))
+    return not num_errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Run a NIDM-Results query over many documents")
+    parser.add_argument("query",
+                        help="query name or file (" + ", ".join(QUERIES) +
+                        ")")
+    parser.add_argument("paths", nargs="+", metavar="PATH",
+                        help="NIDM-Results documents (.ttl, .json) or "
+                        "directories")
+    parser.add_argument("-o", "--output",
+                        help="CSV or .parquet file (default: CSV on "
+                        "standard output)")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="number of processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    try:
+        name = query_name(args.query)
+    except ValueError as e:
+        parser.error(str(e))
+    sys.exit(0 if main(name, args.paths, args.output, args.jobs) else 1)
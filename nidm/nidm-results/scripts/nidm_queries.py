@@ -0,0 +1,141 @@
+"""
+Library of the NIDM-Results queries stored in nidm/nidm-results/query.
+
+Each query is read and prepared (parsed and translated to SPARQL algebra)
+once per process, and prepared again only if its file is modified, so that
+running a query over many graphs only costs its evaluation. Results are
+returned as lists of named tuples with one field per variable (in order of
+appearance in the query) where literals are converted to Python values
+(float, int, str...), IRIs are kept as rdflib URIRefs and unbound variables
+are None.
+
+e.g.
+    graph = Graph().parse("spm_results.ttl", format="turtle")
+    for peak in get_peaks(graph):
+        print peak.peak, peak.x, peak.zstat
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+"""
+import os
+import re
+import collections
+from rdflib import Literal, Variable, URIRef
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.parserutils import CompValue
+from nidmresults.objects.constants_rdflib import namespaces
+
+RELPATH = os.path.dirname(os.path.abspath(__file__))
+NIDMRESULTSPATH = os.path.dirname(RELPATH)
+QUERY_DIR = os.path.join(NIDMRESULTSPATH, "query")
+
+# Query name -> query file (in QUERY_DIR)
+QUERIES = collections.OrderedDict([
+    ("contrasts", "get_contrasts.rq"),
+    ("height_extent_metadata", "height_extent_metadata.rq"),
+    ("peaks", "peak.rq"),
+    ("clusters", "cluster.rq"),
+    ("mask", "get_mask.rq"),
+])
+
+VARIABLE_RE = re.compile(r'[?$](\w+)')
+
+PreparedQuery = collections.namedtuple(
+    "PreparedQuery", ["query", "columns", "row"])
+
+# Query name -> (mtime, PreparedQuery)
+_prepared = dict()
+
+
+def query_file(name):
+    if name not in QUERIES:
+        raise ValueError("Unknown query: " + str(name))
+    return os.path.join(QUERY_DIR, QUERIES[name])
+
+
+def prepare(name):
+    """ Prepared query, its columns and the named tuple of its rows"""
+    path = query_file(name)
+    mtime = os.path.getmtime(path)
+    if name not in _prepared or _prepared[name][0] != mtime:
+        with open(path, 'r') as fid:
+            text = fid.read()
+        query = prepareQuery(text, initNs=namespaces)
+
+        # Variables in order of appearance (the order of SELECT * is
+        # arbitrary)
+        variables = set(str(var) for var in query.algebra['PV'])
+        columns = list()
+        for var in VARIABLE_RE.findall(text):
+            if var in variables and var not in columns:
+                columns.append(var)
+        columns += sorted(variables.difference(columns))
+
+        _prepared[name] = (mtime, PreparedQuery(
+            query, columns, collections.namedtuple(
+                name.title().replace("_", "") + "Row", columns)))
+    return _prepared[name][1]
+
+
+def _triples(node):
+    """ Triple patterns of the algebra of a prepared query"""
+    if isinstance(node, CompValue):
+        if node.name == 'BGP':
+            for triple in node.triples:
+                yield triple
+        for value in node.values():
+            for triple in _triples(value):
+                yield triple
+    elif isinstance(node, (list, tuple)):
+        for value in node:
+            for triple in _triples(value):
+                yield triple
+
+
+def column_predicates(name):
+    """ Predicates (IRIs, not property paths) of the triple patterns that bind
+    each column of query name as their object"""
+    prepared = prepare(name)
+    predicates = collections.OrderedDict(
+        (column, set()) for column in prepared.columns)
+    for s, p, o in _triples(prepared.query.algebra):
+        if isinstance(o, Variable) and str(o) in predicates and \
+                isinstance(p, URIRef):
+            predicates[str(o)].add(p)
+    return predicates
+
+
+def _value(node):
+    if isinstance(node, Literal):
+        return node.toPython()
+    return node
+
+
+def query(name, graph, **bindings):
+    """ Rows of query name on graph (variables can be bound to initial
+    values with bindings)"""
+    prepared = prepare(name)
+    result = graph.query(prepared.query, initBindings=bindings)
+    variables = [Variable(column) for column in prepared.columns]
+    return [prepared.row(*[_value(row.get(var)) for var in variables])
+            for row in result.bindings]
+
+
+def get_contrasts(graph):
+    return query("contrasts", graph)
+
+
+def get_height_extent_metadata(graph):
+    return query("height_extent_metadata", graph)
+
+
+def get_peaks(graph):
+    return query("peaks", graph)
+
+
+def get_clusters(graph):
+    return query("clusters", graph)
+
+
+def get_mask(graph):
+    return query("mask", graph)
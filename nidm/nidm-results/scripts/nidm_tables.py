@@ -0,0 +1,163 @@
+"""
+Peak and cluster tables of a NIDM-Results graph, without SPARQL.
+
+peak_table and cluster_table return the same rows as query/peak.rq and
+query/cluster.rq (see nidm_queries.py) but follow the links of the graph
+(peak -> cluster -> excursion set -> inference -> statistic map) in
+dictionaries built with a single pass over the triples of each predicate
+involved, instead of joining the patterns with rdflib's SPARQL engine. This
+makes a difference for results with thousands of peaks.
+
+Tables are returned as ordered dictionaries column -> NumPy array (lists if
+NumPy is not installed), with the columns of the queries and rows in the
+order of the queries, e.g. pandas.DataFrame(peak_table(graph)). Numeric
+columns are float or integer arrays (NaN for missing values), other columns
+are object arrays of URIRefs, strings or None.
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+"""
+import numbers
+import collections
+from rdflib import RDF, Literal
+from nidmresults.objects.constants_rdflib import PROV, SPM, NIDM_PEAK, \
+    NIDM_SUPRA_THRESHOLD_CLUSTER, NIDM_STATISTIC_MAP, NIDM_CLUSTER_LABEL_ID, \
+    NIDM_CLUSTER_SIZE_IN_VOXELS, NIDM_COORDINATE_VECTOR, \
+    NIDM_EQUIVALENT_ZSTATISTIC, NIDM_P_VALUE_FWER, NIDM_P_VALUE_UNCORRECTED, \
+    NIDM_STATISTIC_TYPE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Columns of query/peak.rq and query/cluster.rq
+PEAK_COLUMNS = ['peak', 'cluster', 'coordinate', 'x', 'value', 'zstat',
+                'pvalcor', 'pvalunc', 'statmap', 'stat']
+CLUSTER_COLUMNS = ['cluster', 'label', 'sizeVx', 'sizeRz', 'pvalcor',
+                   'pvalunc']
+
+
+class _Index(object):
+    """ Objects of each (subject, predicate) of a graph, for the predicates
+    requested, each read from the graph in a single pass"""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._objects = dict()
+
+    def __call__(self, subject, predicate, optional=False):
+        if predicate not in self._objects:
+            objects = dict()
+            for s, p, o in self.graph.triples((None, predicate, None)):
+                objects.setdefault(s, list()).append(o)
+            self._objects[predicate] = objects
+        objects = self._objects[predicate].get(subject)
+        if not objects and optional:
+            # Unbound optional variable
+            return [None]
+        return objects or ()
+
+    def instances(self, class_name):
+        return sorted(self.graph.subjects(RDF['type'], class_name))
+
+    def has_type(self, node, class_name):
+        return class_name in self(node, RDF['type'])
+
+
+def _value(node):
+    if isinstance(node, Literal):
+        return node.toPython()
+    return node
+
+
+def _distinct(rows):
+    seen = set()
+    for row in rows:
+        if row not in seen:
+            seen.add(row)
+            yield row
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _table(columns, rows):
+    values = [list(column) for column in zip(*rows)] or \
+        [list() for column in columns]
+    if np is not None:
+        for i, column in enumerate(values):
+            present = [value for value in column if value is not None]
+            if present and all(_is_number(value) for value in present):
+                if len(present) < len(column):
+                    column = [np.nan if value is None else value
+                              for value in column]
+                values[i] = np.array(column)
+            else:
+                array = np.empty(len(column), dtype=object)
+                array[:] = column
+                values[i] = array
+    return collections.OrderedDict(zip(columns, values))
+
+
+def peak_rows(graph):
+    """ Rows (tuples of Python values) of query/peak.rq on graph, ordered by
+    cluster and peak"""
+    index = _Index(graph)
+    rows = list()
+    for peak in index.instances(NIDM_PEAK):
+        for cluster in index(peak, PROV['wasDerivedFrom']):
+            if not index.has_type(cluster, NIDM_SUPRA_THRESHOLD_CLUSTER):
+                continue
+            # cluster -> excursion set -> inference -> statistic map
+            statmaps = [
+                (statmap, stat)
+                for excursion_set in index(cluster, PROV['wasDerivedFrom'])
+                for inference in index(excursion_set, PROV['wasGeneratedBy'])
+                for statmap in index(inference, PROV['used'])
+                if index.has_type(statmap, NIDM_STATISTIC_MAP)
+                for stat in index(statmap, NIDM_STATISTIC_TYPE)]
+            if not statmaps:
+                continue
+            rows.extend(
+                (peak, cluster, coordinate, x, value, zstat, pvalcor,
+                 pvalunc, statmap, stat)
+                for coordinate in index(peak, PROV['atLocation'])
+                for x in index(coordinate, NIDM_COORDINATE_VECTOR)
+                for value in index(peak, PROV['value'], optional=True)
+                for zstat in index(peak, NIDM_EQUIVALENT_ZSTATISTIC)
+                for pvalcor in index(peak, NIDM_P_VALUE_FWER, optional=True)
+                for pvalunc in index(peak, NIDM_P_VALUE_UNCORRECTED)
+                for statmap, stat in statmaps)
+
+    # ORDER BY ?cluster ?peak
+    rows.sort(key=lambda row: (row[1], row[0]))
+    return [tuple(_value(node) for node in row) for row in _distinct(rows)]
+
+
+def cluster_rows(graph):
+    """ Rows (tuples of Python values) of query/cluster.rq on graph, ordered
+    by cluster"""
+    index = _Index(graph)
+    rows = [
+        (cluster, label, size_vx, size_rz, pvalcor, pvalunc)
+        for cluster in index.instances(NIDM_SUPRA_THRESHOLD_CLUSTER)
+        for label in index(cluster, NIDM_CLUSTER_LABEL_ID)
+        for size_vx in index(cluster, NIDM_CLUSTER_SIZE_IN_VOXELS)
+        for size_rz in index(cluster, SPM['clusterSizeInResels'],
+                             optional=True)
+        for pvalcor in index(cluster, NIDM_P_VALUE_FWER, optional=True)
+        for pvalunc in index(cluster, NIDM_P_VALUE_UNCORRECTED,
+                             optional=True)]
+    return [tuple(_value(node) for node in row) for row in _distinct(rows)]
+
+
+def peak_table(graph):
+    """ Columns of query/peak.rq on graph"""
+    return _table(PEAK_COLUMNS, peak_rows(graph))
+
+
+def cluster_table(graph):
+    """ Columns of query/cluster.rq on graph"""
+    return _table(CLUSTER_COLUMNS, cluster_rows(graph))
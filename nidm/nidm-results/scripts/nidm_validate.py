@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+"""
+nidm-validate: check NIDM-Results documents against the ontology (class
+names, attributes, ranges and restrictions), with the checks of
+test/TestExamplesMatchVocabulary.py, for any number of files.
+
+The ontology is read once per worker process and compiled into hash tables
+(classes, attributes per class, ranges and restrictions per property, types
+of the named individuals, labels) so that checking a document only costs
+dictionary lookups. The documents are streamed to a bounded pool of worker
+processes and the report is written one line (a JSON object) per document,
+in the order of the input, as soon as it is available:
+
+    {"file": ..., "valid": ..., "classes": [...], "attributes": [...],
+     "ranges": [...], "restrictions": [...]}
+
+or {"file": ..., "valid": false, "error": ...} if the document could not be
+read.
+
+Usage: nidm_validate.py PATH [PATH ...] [--owl OWL_FILE] [--jobs J]
+    [--report FILE]
+
+Each PATH is a NIDM-Results document (Turtle .ttl or JSON-LD .json/.jsonld)
+or a directory searched (recursively) for such documents. The exit code is
+0 if all documents are valid and 1 otherwise.
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+"""
+import os
+import sys
+import json
+import argparse
+import itertools
+import collections
+import multiprocessing
+from rdflib import RDF, term
+from rdflib.graph import Graph, ConjunctiveGraph
+from nidmresults.objects.constants_rdflib import *
+
+RELPATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(
+    os.path.join(RELPATH, os.pardir, os.pardir, os.pardir, "scripts"))
+from owl_cache import get_owl_reader
+from validate_examples import OWL_FILE, find_import_files, CLASSES, \
+    ATTRIBUTES, RANGES, RESTRICTIONS
+
+# Document extensions -> rdflib/pyld format
+FORMATS = {".ttl": "turtle", ".json": "json-ld", ".jsonld": "json-ld"}
+
+# Names of the exceptions in the report
+KINDS = collections.OrderedDict([
+    (CLASSES, "classes"), (ATTRIBUTES, "attributes"), (RANGES, "ranges"),
+    (RESTRICTIONS, "restrictions")])
+
+# Attributes not checked (as in OwlReader.check_attributes)
+IGNORED_ATTRIBUTES = frozenset([
+    RDFS['label'],
+    RDF['type'],
+    PROV['value'], PROV['atTime'], PROV['used'],
+    PROV['wasAssociatedWith'],
+    PROV['qualifiedGeneration'], PROV['wasGeneratedBy'],
+    PROV['atLocation'],
+    PROV['wasAttributedTo'],
+    PROV['activity'],
+    PROV['wasDerivedFrom'],
+    CRYPTO['sha512']
+    ])
+
+
+class CompiledOntology(object):
+    """ Classes, attributes, ranges and restrictions of an OwlReader as hash
+    tables. check() returns the same exceptions as OwlReader's
+    check_class_names and check_attributes except that:
+     - simple literals (e.g. strings read from JSON-LD) are read as
+       xsd:string (OwlReader reports them as out of range, with no type),
+     - restrictions are only checked on literals (OwlReader fails on an IRI)
+    """
+
+    def __init__(self, owl):
+        self.owl = owl
+        self.class_names = frozenset(owl.get_class_names())
+        self.attributes = dict(
+            (class_name, frozenset(attributes))
+            for class_name, attributes in owl.attributes.items())
+        self.ranges = dict(
+            (prp, frozenset(ranges)) for prp, ranges in owl.ranges.items())
+        self.restrictions = owl.type_restrictions
+
+        self.individual_types = dict()
+        for individual in owl.graph.subjects(
+                RDF['type'], OWL['NamedIndividual']):
+            self.individual_types[individual] = frozenset(
+                owl.graph.objects(individual, RDF['type']))
+
+        self.namespaces = list(owl.graph.namespaces())
+        self._labels = dict()
+        self._name_labels = dict()
+
+    def label(self, uri):
+        if uri not in self._labels:
+            self._labels[uri] = self.owl.get_label(uri)
+        return self._labels[uri]
+
+    def name_label(self, uri):
+        if uri not in self._name_labels:
+            self._name_labels[uri] = self.owl.get_name_label(uri)
+        return self._name_labels[uri]
+
+    def check(self, graph):
+        """ Exceptions (lists of messages indexed by CLASSES, ATTRIBUTES,
+        RANGES and RESTRICTIONS) found in graph"""
+        exceptions = [set(), set(), set(), set()]
+        qnames = dict()
+
+        def qname(uri):
+            if uri not in qnames:
+                qnames[uri] = graph.qname(uri)
+            return qnames[uri]
+
+        # Check that all entity, activity, agent are defined in the data model
+        for class_name in set(graph.objects(None, RDF['type'])):
+            if not isinstance(class_name, term.BNode) and \
+                    class_name not in self.class_names and \
+                    not class_name.startswith(str(PROV)):
+                exceptions[CLASSES].add(
+                    "Unrecognised sub-type: " + qname(class_name))
+
+        types = dict()
+        for s, p, o in graph:
+            if p in IGNORED_ATTRIBUTES:
+                continue
+
+            # *** Check domain
+            if s not in types:
+                types[s] = sorted(graph.objects(s, RDF['type']))
+            found_attributes = False
+            for class_name in types[s]:
+                if p in self.attributes.get(class_name, ()):
+                    found_attributes = True
+            if not found_attributes:
+                class_names = ", ".join(
+                    qname(class_name) + " (i.e. " + self.label(class_name) +
+                    ")" for class_name in types[s])
+                exceptions[ATTRIBUTES].add(
+                    "Unrecognised attribute: " + qname(p) + " (i.e. " +
+                    self.label(p) + ")" + " in " + class_names)
+
+            # *** Check range for ObjectProperties and DataProperties
+            if isinstance(o, term.URIRef):
+                # An ObjectProperty can point to an instance, a term or an
+                # individual (then we look for its type)
+                found_range = set(graph.objects(o, RDF['type'])) or \
+                    self.individual_types.get(o) or set([o])
+            elif isinstance(o, term.Literal):
+                # Simple literals (e.g. strings read from JSON-LD) are
+                # xsd:string
+                if o.datatype is None and not o.language:
+                    found_range = set([XSD['string']])
+                else:
+                    found_range = set([o.datatype])
+            else:
+                found_range = set()
+
+            if p in self.ranges:
+                owl_ranges = self.ranges[p]
+                # A bit more complicated to deal with "positiveInteger"
+                correct_range = bool(found_range & owl_ranges) or (
+                    XSD['positiveInteger'] in owl_ranges and
+                    found_range == set([XSD['int']]) and
+                    o.value is not None and o.value >= 0)
+                if not correct_range:
+                    found_range_line = ""
+                    if None not in found_range:
+                        found_range_line = ', '.join(
+                            map(self.name_label, sorted(found_range)))
+                    exceptions[RANGES].add(
+                        "Unrecognised range: " + found_range_line + ' for ' +
+                        self.name_label(p) + ' should be ' +
+                        ', '.join(map(self.name_label, sorted(owl_ranges))))
+            else:
+                # No range found for current attribute
+                exceptions[RANGES].add("No range defined for: " + qname(p))
+
+            # Restrictions only apply to (well-formed) literals, other values
+            # are reported as out of range
+            if p in self.restrictions and isinstance(o, term.Literal) and \
+                    o.value is not None:
+                restrictions = self.restrictions[p]
+                value = o.value
+                if ('minInclusive' in restrictions and
+                        value < restrictions['minInclusive'].value) or \
+                        ('minExclusive' in restrictions and
+                         value <= restrictions['minExclusive'].value) or \
+                        ('maxInclusive' in restrictions and
+                         value > restrictions['maxInclusive'].value) or \
+                        ('maxExclusive' in restrictions and
+                         value >= restrictions['maxExclusive'].value):
+                    exceptions[RESTRICTIONS].add(
+                        "Contraints: value " + str(value) + ' for ' +
+                        qname(p) + ' does not observe contraints ' +
+                        ', '.join(sorted(restrictions)))
+
+        return [sorted(exception) for exception in exceptions]
+
+
+def load_document(path, namespaces=()):
+    """ Graph of the NIDM-Results document at path (Turtle or JSON-LD)"""
+    doc_format = FORMATS[os.path.splitext(path)[1].lower()]
+    if doc_format == "json-ld":
+        # The NIDM-Results context is read from terms/nidmr.json, which types
+        # the numeric values
+        import pyld as ld
+        from create_example_from_templates import load_context_document
+        with open(path, 'r') as fid:
+            nquads = ld.jsonld.to_rdf(
+                json.load(fid), {'format': 'application/nquads',
+                                 'documentLoader': load_context_document})
+        graph = ConjunctiveGraph()
+        graph.parse(data=nquads, format='nquads')
+    else:
+        graph = Graph()
+        graph.parse(path, format='turtle')
+
+    # Messages use the prefixes of the ontology
+    for prefix, namespace in namespaces:
+        graph.bind(prefix, namespace, override=False)
+    return graph
+
+
+def find_documents(paths):
+    """ NIDM-Results documents in paths (files or directories), lazily"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in FORMATS:
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+# Ontology of the current (worker) process
+_ontology = None
+
+
+def _init_worker(owl_file, import_files):
+    global _ontology
+    _ontology = CompiledOntology(get_owl_reader(owl_file, import_files))
+
+
+def check_document(path):
+    """ Report (dict) of the document at path"""
+    report = collections.OrderedDict([("file", path)])
+    try:
+        graph = load_document(path, _ontology.namespaces)
+    except Exception as e:
+        report["valid"] = False
+        report["error"] = "%s: %s" % (type(e).__name__, e)
+        return report
+
+    exceptions = _ontology.check(graph)
+    report["valid"] = not any(exceptions)
+    for kind, name in KINDS.items():
+        report[name] = exceptions[kind]
+    return report
+
+
+def imap_bounded(function, items, jobs, initializer=None, initargs=()):
+    """ function(item) for each item, in order, computed by a pool of jobs
+    processes (in this process if jobs <= 1) with at most jobs*16 items
+    waiting in memory"""
+    items = iter(items)
+    if jobs <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in items:
+            yield function(item)
+        return
+
+    pool = multiprocessing.Pool(jobs, initializer, initargs)
+    try:
+        # Sliding window of submitted items: a new item is submitted as soon
+        # as the oldest result is returned, so that the workers are never
+        # waiting for the slowest item of a batch and the items and results
+        # in memory do not grow with the number of items
+        window = jobs*16
+        pending = collections.deque()
+        for item in itertools.islice(items, window):
+            pending.append(pool.apply_async(function, (item,)))
+        while pending:
+            result = pending.popleft().get()
+            for item in itertools.islice(items, 1):
+                pending.append(pool.apply_async(function, (item,)))
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def validate(paths, owl_file=OWL_FILE, import_files=None, jobs=None):
+    """ Reports of the documents in paths, in order, checked by a pool of
+    jobs processes (by default, one per CPU)"""
+    if import_files is None:
+        import_files = find_import_files(owl_file)
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    return imap_bounded(check_document, find_documents(paths), jobs,
+                        _init_worker, (owl_file, import_files))
+
+
+def main(paths, owl_file=OWL_FILE, jobs=None, out=None):
+    out = out or sys.stdout
+    num_documents = num_invalid = 0
+    for report in validate(paths, owl_file, jobs=jobs):
+        out.write(json.dumps(report) + "\n")
+        out.flush()
+        num_documents += 1
+        num_invalid += not report["valid"]
+
+    sys.stderr.write("%d document(s) checked, %d invalid\n" % (
+        num_documents, num_invalid))
+    return not num_invalid
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Check NIDM-Results documents against the ontology")
+    parser.add_argument("paths", nargs="+", metavar="PATH",
+                        help="NIDM-Results documents (.ttl, .json) or "
+                        "directories")
+    parser.add_argument("--owl", default=OWL_FILE,
+                        help="ontology (default: nidm-results.owl)")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="number of processes (default: one per CPU)")
+    parser.add_argument("--report",
+                        help="report file (default: standard output)")
+    args = parser.parse_args()
+
+    if args.report:
+        with open(args.report, 'w') as fid:
+            valid = main(args.paths, args.owl, args.jobs, fid)
+    else:
+        valid = main(args.paths, args.owl, args.jobs)
+    sys.exit(0 if valid else 1)
@@ -1,10 +1,21 @@
 """
 Create SPM ans FSL examples stored in nidm/nidm-results/ by using the class
 templates available in nidm/nidm-results/terms/templates
+
+Usage: python recompute_all_ex.py [--jobs N]
+
+With --jobs N, the example generators (which all write to separate files)
+are run concurrently in a pool of N processes.
+
 @author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
 @copyright: University of Warwick 2013-2014
 """
 import logging
+import argparse
+import importlib
+import multiprocessing
+import traceback
+from StringIO import StringIO
 
 import create_term_examples
 import create_spm_example
@@ -21,30 +32,75 @@ import create_minimal_examples
 logging.basicConfig(filename='debug.log', level=logging.DEBUG, filemode='w')
 logger = logging.getLogger(__name__)
 
+GENERATORS = [
+    create_term_examples,
+    create_spm_example,
+    create_spm_example_001,
+    create_spm_example_002,
+    create_spm_example_003,
+    create_spm_example_005,
+    create_fsl_example,
+    create_fsl_example_001,
+    create_fsl_example_002,
+    create_fsl_example_003,
+    create_minimal_examples,
+]
+
+
+def _run_generator(module_name):
+    """ Run one example generator in a worker process and return its log
+    output and traceback (if it failed)"""
+    log_txt = StringIO()
+    handler = logging.StreamHandler(log_txt)
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    root_logger = logging.getLogger()
+    # Do not write concurrently to debug.log, logs are sent back to the parent
+    original_handlers = root_logger.handlers
+    root_logger.handlers = [handler]
+
+    error = None
+    try:
+        importlib.import_module(module_name).main()
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        root_logger.handlers = original_handlers
 
-def main():
-    logger.debug(" *** create_term_examples")
-    create_term_examples.main()
-    logger.debug(" *** create_spm_example")
-    create_spm_example.main()
-    logger.debug(" *** create_spm_example_001")
-    create_spm_example_001.main()
-    logger.debug(" *** create_spm_example_002")
-    create_spm_example_002.main()
-    logger.debug(" *** create_spm_example_003")
-    create_spm_example_003.main()
-    logger.debug(" *** create_spm_example_005")
-    create_spm_example_005.main()
-    logger.debug(" *** create_fsl_example")
-    create_fsl_example.main()
-    logger.debug(" *** create_fsl_example_001")
-    create_fsl_example_001.main()
-    logger.debug(" *** create_fsl_example_002")
-    create_fsl_example_002.main()
-    logger.debug(" *** create_fsl_example_003")
-    create_fsl_example_003.main()
-    logger.debug(" *** create_minimal_examples")
-    create_minimal_examples.main()
+    return module_name, log_txt.getvalue(), error
+
+
+def main(jobs=1):
+    if jobs <= 1:
+        for generator in GENERATORS:
+            logger.debug(" *** " + generator.__name__)
+            generator.main()
+        return
+
+    pool = multiprocessing.Pool(jobs)
+    try:
+        results = pool.map(
+            _run_generator, [generator.__name__ for generator in GENERATORS])
+    finally:
+        pool.close()
+        pool.join()
+
+    errors = list()
+    for module_name, log_txt, error in results:
+        logger.debug(" *** " + module_name)
+        if log_txt:
+            logger.debug(log_txt.rstrip("\n"))
+        if error:
+            logger.error(module_name + " failed:\n" + error)
+            errors.append(module_name + ":\n" + error)
+
+    if errors:
+        raise Exception("Example generation failed for:\n" + "\n".join(errors))
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(
+        description="Re-create all NIDM-Results examples from templates")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of example generators to run in parallel")
+    args = parser.parse_args()
+
+    main(args.jobs)
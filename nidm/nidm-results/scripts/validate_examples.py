@@ -0,0 +1,186 @@
+"""
+Check NIDM-Results examples against the ontology (class names, attributes,
+ranges and restrictions), as in test/TestExamplesMatchVocabulary.py, with
+the examples spread across a pool of processes. Each process reads each
+ontology once and the exceptions found in all the examples are merged as by
+merge_exception_dict. The error messages do not depend on the number of
+processes or on the order in which the examples were checked.
+
+Usage: python validate_examples.py [PATH ...] [--owl OWL_FILE] [--jobs J]
+
+Each PATH is a turtle file or a directory searched (recursively) for turtle
+files. By default, all the examples of the repository are checked.
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+"""
+import os
+import sys
+import glob
+import argparse
+import multiprocessing
+from rdflib.graph import Graph
+from nidmresults.test.test_commons import example_filenames, \
+    merge_exception_dict
+
+RELPATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(
+    os.path.join(RELPATH, os.pardir, os.pardir, os.pardir, "scripts"))
+from owl_cache import get_owl_reader
+NIDMRESULTSPATH = os.path.dirname(RELPATH)
+OWL_FILE = os.path.join(NIDMRESULTSPATH, "terms", "nidm-results.owl")
+NAMESPACES_FILE = os.path.join(
+    NIDMRESULTSPATH, "terms", "templates", "Namespaces.txt")
+
+# Kinds of exceptions returned by check_example (and validate)
+CLASSES, ATTRIBUTES, RANGES, RESTRICTIONS = range(4)
+
+
+def find_owl_file(example_file):
+    """ Ontology of a repository example (the owl file in the closest
+    "terms" directory)"""
+    example_dir = os.path.dirname(os.path.abspath(example_file))
+    for parents in range(1, 4):
+        term_dir = os.path.join(example_dir, *([os.pardir]*parents +
+                                               ['terms']))
+        if os.path.isdir(term_dir):
+            break
+    return os.path.normpath(glob.glob(os.path.join(term_dir, '*.owl'))[0])
+
+
+def find_import_files(owl_file):
+    """ Imports (and main ontology for extensions) of owl_file"""
+    owl_path = os.path.dirname(owl_file)
+
+    if "extension" not in owl_path:
+        import_files = glob.glob(os.path.join(
+            owl_path, os.pardir, os.pardir, "imports", '*.ttl'))
+    else:
+        import_files = glob.glob(os.path.join(
+            owl_path, os.pardir, os.pardir, os.pardir, os.pardir, "imports",
+            '*.ttl'))
+        # Main ontology file
+        import_files += glob.glob(os.path.join(
+            owl_path, os.pardir, os.pardir, os.pardir, "terms", '*.owl'))
+    return import_files
+
+
+def repository_examples():
+    """ Examples of the repository (example_filenames and term examples)
+    as tuples (name, turtle file, owl file, is term example)"""
+    term_examples = glob.glob(
+        os.path.join(NIDMRESULTSPATH, "terms", "examples", '*.txt'))
+
+    examples = list()
+    for example_file in example_filenames.union(term_examples):
+        ttl_file = os.path.join(NIDMRESULTSPATH, example_file)
+        examples.append((example_file, ttl_file, find_owl_file(ttl_file),
+                         example_file in term_examples))
+    return sorted(examples)
+
+
+def check_example(example):
+    """ Exceptions (indexed by CLASSES, ATTRIBUTES, RANGES and RESTRICTIONS)
+    found in example, a tuple (name, turtle file, owl file, is term
+    example)"""
+    example_name, ttl_file, owl_file, term_example = example
+
+    example_graph = Graph()
+    if term_example:
+        # Term examples do not declare the namespaces they use
+        with open(NAMESPACES_FILE, 'r') as fid:
+            namespaces = fid.read()
+        with open(ttl_file, 'r') as fid:
+            example_graph.parse(data=namespaces+fid.read(), format='turtle')
+    else:
+        example_graph.parse(ttl_file, format='turtle')
+
+    owl = get_owl_reader(owl_file, find_import_files(owl_file))
+    exceptions = [owl.check_class_names(example_graph, example_name)]
+    exceptions += owl.check_attributes(example_graph, example_name)
+    if term_example:
+        # Ignore range exceptions for term examples (as for object
+        # properties the linked object will be missing)
+        exceptions[RANGES] = dict()
+    return example_name, exceptions
+
+
+def validate(examples, jobs=None):
+    """ Check examples (tuples as returned by repository_examples) with jobs
+    processes (by default, one per CPU) and return the exceptions of all
+    the examples merged, indexed by CLASSES, ATTRIBUTES, RANGES and
+    RESTRICTIONS"""
+    examples = sorted(examples)
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    jobs = min(jobs, len(examples))
+
+    if jobs <= 1:
+        results = [check_example(example) for example in examples]
+    else:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            results = pool.map(check_example, examples, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    merged = [dict(), dict(), dict(), dict()]
+    for example_name, exceptions in sorted(results):
+        for kind, exception in enumerate(exceptions):
+            merged[kind] = merge_exception_dict(merged[kind], exception)
+    return merged
+
+
+def error_message(*exceptions):
+    """ Exceptions aggregated over examples for conciseness"""
+    error_msg = ""
+    for exception in exceptions:
+        for key in sorted(exception):
+            error_msg += key+" (from "+', '.join(sorted(exception[key]))+")"
+    return error_msg
+
+
+def ttl_examples(paths, owl_file=OWL_FILE):
+    """ Turtle files in paths (files or directories) as tuples (name,
+    turtle file, owl file, is term example)"""
+    examples = list()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                for name in files:
+                    if name.endswith(".ttl"):
+                        ttl_file = os.path.join(root, name)
+                        examples.append(
+                            (ttl_file, ttl_file, owl_file, False))
+        else:
+            examples.append((path, path, owl_file, False))
+    return examples
+
+
+def main(paths=None, owl_file=OWL_FILE, jobs=None):
+    if paths:
+        examples = ttl_examples(paths, owl_file)
+    else:
+        examples = repository_examples()
+
+    error_msg = error_message(*validate(examples, jobs))
+    if error_msg:
+        sys.stderr.write(error_msg.lstrip("\n") + "\n")
+    return not error_msg
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Check NIDM-Results examples against the ontology")
+    parser.add_argument("paths", nargs="*",
+                        help="turtle files or directories (default: "
+                        "examples of the repository)")
+    parser.add_argument("--owl", default=OWL_FILE,
+                        help="ontology used for PATH (default: "
+                        "nidm-results.owl)")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="number of processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    sys.exit(0 if main(args.paths, args.owl, args.jobs) else 1)
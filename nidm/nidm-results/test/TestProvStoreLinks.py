@@ -8,12 +8,16 @@ import unittest
 from nidmresults.test.test_commons import *
 import logging
 import re
+import sys
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 RELPATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+sys.path.append(os.path.join(RELPATH, os.pardir, os.pardir, "scripts"))
+from graph_hash import compare_ttl_documents
+
 
 class TestProvStoreLinks(unittest.TestCase):
 
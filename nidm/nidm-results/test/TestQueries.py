@@ -5,15 +5,18 @@
 @copyright: University of Warwick 2014
 '''
 import unittest
-from rdflib.graph import Graph
 from nidmresults.test.test_commons import *
 import logging
+from example_cache import get_graph
+
+RELPATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(RELPATH, "scripts"))
+from nidm_queries import query, get_peaks, get_clusters
+from nidmresults.objects.constants_rdflib import NIIRI
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-RELPATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
 class TestQueries(unittest.TestCase):
 
     def __init__(self, *args, **kwargs):
@@ -25,38 +28,50 @@ class TestQueries(unittest.TestCase):
             # ttl_file_url = get_turtle(provn_file)
             # ttl_file = provn_file.replace(".provn", ".ttl")
 
-            # Read turtle
-            self.examples[example_file] = Graph()
-            self.examples[example_file].parse(ttl_file, format='turtle')
+            # Read turtle (parsed once for all tests)
+            self.examples[example_file] = get_graph(ttl_file)
 
     def test_get_contrasts(self):
         logger.info("TestQueries: test_get_contrasts")
-        self.run_query_and_test("get_contrasts.rq", "Contrast not found", "Contrast query")
+        self.run_query_and_test("contrasts", "Contrast not found", "Contrast query")
         
     def test_get_height_extent_metadata(self):
-        self.run_query_and_test("height_extent_metadata.rq", "Height/Extent metatdata not found", "Height/Extent query")
+        self.run_query_and_test("height_extent_metadata", "Height/Extent metatdata not found", "Height/Extent query")
 
     def test_peaks(self):
-        self.run_query_and_test("peak.rq","Peaks not found","Peaks query")
+        self.run_query_and_test("peaks","Peaks not found","Peaks query")
         
     def test_clusters(self):
-        self.run_query_and_test("cluster.rq","Clusters not found","Clusters query")
+        self.run_query_and_test("clusters","Clusters not found","Clusters query")
             
     def test_get_mask(self):
         logger.info("TestQueries: test_get_mask")
-        self.run_query_and_test("get_mask.rq", "Mask not found", "Mask query")        
+        self.run_query_and_test("mask", "Mask not found", "Mask query")        
 
-    def run_query_and_test(self, query_file, error_prefix, query_result_prefix):
-        my_exception = dict()
+    def test_typed_rows(self):
+        graph = get_graph(os.path.join(RELPATH, "spm", "spm_results.ttl"))
 
-        file = open(os.path.join(RELPATH, 'query', query_file), 'r')
-        query = file.read();
-        
+        peaks = get_peaks(graph)
+        self.assertEqual(len(peaks), 7)
+        self.assertEqual(peaks[0]._fields, (
+            'peak', 'cluster', 'coordinate', 'x', 'value', 'zstat',
+            'pvalcor', 'pvalunc', 'statmap', 'stat'))
+        self.assertEqual(peaks[0].peak, NIIRI['peak_0001'])
+        self.assertEqual(peaks[0].x, "[ -60, -28, 13 ]")
+        self.assertIsInstance(peaks[0].pvalunc, float)
+
+        clusters = get_clusters(graph)
+        self.assertEqual([c.label for c in clusters], [1, 2, 3])
+        self.assertEqual(clusters[0].sizeVx, 530)
+        # Unbound variables are None
+        self.assertIsNone(clusters[0].sizeRz)
+
+    def run_query_and_test(self, query_name, error_prefix, query_result_prefix):
         my_exception = dict()
 
         for example_name, example_graph in self.examples.items():
             exception_msg = dict()
-            sd = example_graph.query(query)
+            sd = query(query_name, example_graph)
 
             if not sd:
                 key = error_prefix
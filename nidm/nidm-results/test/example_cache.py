@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+'''Parsed examples shared by all the tests of a session.
+
+unittest creates one TestCase instance per test method. Instead of parsing
+all the examples in each instance, they are parsed once per process and
+parsed again only if the file was modified in the meantime (e.g.
+re-generated by test_examples_match_templates). The graphs returned are
+shared between tests and must not be modified. (Ontologies are shared with
+scripts/owl_cache.get_owl_reader.)
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+import os
+from rdflib.graph import Graph
+
+# Files -> (modification stamp of the files, graph)
+_graphs = dict()
+
+
+def _stamp(paths):
+    """ Modification time and size of paths"""
+    stamp = list()
+    for path in paths:
+        stat = os.stat(path)
+        stamp.append((stat.st_mtime, stat.st_size))
+    return tuple(stamp)
+
+
+def _cached(cache, paths, load):
+    key = tuple(os.path.abspath(path) for path in paths)
+    stamp = _stamp(paths)
+    if key not in cache or cache[key][0] != stamp:
+        cache[key] = (stamp, load())
+    return cache[key][1]
+
+
+def get_graph(ttl_file, namespaces_file=None):
+    """ Graph parsed from ttl_file. If namespaces_file is given, its content
+    is prepended to the turtle (for term examples, which do not declare the
+    namespaces they use)"""
+    def load():
+        graph = Graph()
+        if namespaces_file is None:
+            graph.parse(ttl_file, format='turtle')
+        else:
+            with open(namespaces_file, 'r') as fid:
+                namespaces = fid.read()
+            with open(ttl_file, 'r') as fid:
+                graph.parse(data=namespaces+fid.read(), format='turtle')
+        return graph
+
+    paths = [ttl_file]
+    if namespaces_file is not None:
+        paths.append(namespaces_file)
+    return _cached(_graphs, paths, load)
+
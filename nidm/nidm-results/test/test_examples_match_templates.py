@@ -7,8 +7,9 @@ nidm/nidm-results/terms/templates.
 '''
 import os
 import unittest
+from string import Template
 from rdflib import Graph
-from rdflib.compare import *
+from rdflib.compare import isomorphic
 
 NIDM_RESULTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SCRIPT_DIR = os.path.join(NIDM_RESULTS_DIR, "scripts")
@@ -24,207 +25,207 @@ import create_fsl_example
 import create_fsl_example_001
 import create_fsl_example_002
 import create_fsl_example_003
+from create_example_from_templates import ExampleFromTemplate, templates, \
+    GraphTemplate
 from nidmresults.test.test_commons import *
+sys.path.append(os.path.join(NIDM_RESULTS_DIR, os.pardir, os.pardir, "scripts"))
+from graph_hash import canonical_hash, compare_graphs
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-class TestExamplesMatchTemplates(unittest.TestCase):    
-    def _parse_graph(self, ex_file, replace_by=None):
-        logger.info(ex_file)
-        
-        ex_fid = open(ex_file, "r")
-        ex = ex_fid.read()
-        ex_fid.close()
+class TestExamplesMatchTemplates(unittest.TestCase):
+    def _parse_graph(self, example):
         my_graph = Graph()
-        
-        # Replace before parsing new graph so that if parsing fails the file
-        # is in a consistent state
-        if replace_by is not None:
-            # Write back current version of the example (the purpose of this 
-            # function is just testing not updating the example).
-            spm_ex_fid = open(ex_file, "w")
-            spm_ex_fid.write(replace_by)
-            spm_ex_fid.close()
-
-        my_graph.parse(data=ex, format="turtle")
-
-        return list([my_graph, ex])
-
-    def _compare_graphs(self, graph1, graph2):
-        iso1 = to_isomorphic(graph1)
-        iso2 = to_isomorphic(graph2)
-
-        found_difference = False
-        if iso1 != iso2:
-            in_both, in_first, in_second = graph_diff(iso1, iso2)
-
-            # diff_graph = (in_first+in_second)
-            found_difference_1 = display_graph(in_first, "\t In first: ")
-            found_difference_2 = display_graph(in_second, "\t In second: ")
-            found_difference = found_difference_1 or found_difference_2
-
-        return found_difference
+        my_graph.parse(data=example, format="turtle")
+        return my_graph
+
+    def _is_up_to_date(self, generator):
+        """ Compare the example on disk with the one the generator would
+        write now (rendered in memory, the example file is left untouched)"""
+        example = generator.main(write=False)
+        logger.info(example.file)
+        with open(example.file, "r") as fid:
+            current = fid.read()
+        updated = example.render()
+
+        # Fast path: same text, otherwise compare the canonical hashes (and
+        # display the differences)
+        if current == updated:
+            return True
+        return not compare_graphs(self._parse_graph(current),
+                                  self._parse_graph(updated))
 
     def test_unit_examples(self):
-        # unit_examples = ["Cluster", "ClusterDefinitionCriteria", \
-        # "ContrastEstimation", "ContrastMap", "ContrastStandardErrorMap",
-        # "ContrastWeights", "Coordinate", "Data", "De" "DesignMatrix"]
         exception_msg = ""
-        found_difference = False
 
         current = dict()
-        updated = dict()
-
         for ex_file in os.listdir(EX_TERMS_DIR):
             if ex_file.endswith(".txt"):
-                example_file = os.path.join(EX_TERMS_DIR, ex_file)
-
-                example_fid = open(example_file, "r")
-                current[ex_file] = example_fid.read()
-                example_fid.close()
-
-        create_term_examples.main()
+                with open(os.path.join(EX_TERMS_DIR, ex_file), "r") as fid:
+                    current[ex_file] = fid.read()
 
-        for ex_file in current.keys():
-            example_file = os.path.join(EX_TERMS_DIR, ex_file)
-            
-            example_fid = open(example_file, "r")
-            updated[ex_file] = example_fid.read()
-            example_fid.close()
+        updated = dict(
+            (os.path.basename(example_file), example) for example_file,
+            example in create_term_examples.main(write=False).render().items())
 
-            example_fid = open(example_file, "w")
-            example_fid.write(current[ex_file])
-            example_fid.close()
-
-        for ex_file in os.listdir(EX_TERMS_DIR):
-            if ex_file.endswith(".txt"):
-                found_difference = not (current[ex_file] == updated[ex_file])
-
-                if found_difference:
-                    exception_msg = exception_msg+"\n"+\
-                        ex_file+" is not up to date with templates. \
+        for ex_file in sorted(set(current) | set(updated)):
+            if current.get(ex_file) != updated.get(ex_file):
+                exception_msg = exception_msg+"\n"+\
+                    ex_file+" is not up to date with templates. \
 Please use nidm/nidm-results/scripts/create_term_examples.py."
 
         if exception_msg:
             raise Exception(exception_msg)
 
     def test_spm_results(self):
-        example_file = os.path.join(NIDM_RESULTS_DIR, "spm", "spm_results.ttl")
-
-        current_graph, spm_current = self._parse_graph(example_file)
-        create_spm_example.main()
-        updated_graph, unused = self._parse_graph(example_file, spm_current)
-
-
-        found_difference = self._compare_graphs(current_graph, updated_graph)
-
-
-        if found_difference:
+        if not self._is_up_to_date(create_spm_example):
             raise Exception("spm_results.ttl is not up to date with templates. \
                 Please use nidm/nidm-results/scripts/create_spm_examples.py.")
 
     def test_spm_ex001(self):
-        example_file = os.path.join(NIDM_RESULTS_DIR, "spm", \
-            "example001", 'example001_spm_results.ttl')
-
-        current_graph, spm_current = self._parse_graph(example_file)
-        create_spm_example_001.main()
-        updated_graph, unused = self._parse_graph(example_file, spm_current)
-
-        found_difference = self._compare_graphs(current_graph, updated_graph)
-
-        if found_difference:
+        if not self._is_up_to_date(create_spm_example_001):
             raise Exception("example001_spm_results.ttl is not up to date  \
                 with templates. Please use \
                 nidm/nidm-results/scripts/create_spm_example_001.py.")
 
     def test_spm_ex002(self):
-        spm_example_file = os.path.join(NIDM_RESULTS_DIR, "spm", \
-            "example002", 'spm_results_2contrasts.ttl')
-
-        current_graph, spm_current = self._parse_graph(spm_example_file)
-        create_spm_example_002.main()
-        updated_graph, unused = self._parse_graph(spm_example_file, spm_current)
-
-        found_difference = self._compare_graphs(current_graph, updated_graph)
-
-        if found_difference:
+        if not self._is_up_to_date(create_spm_example_002):
             raise Exception("example002/spm_results_2contrasts.ttl is not up \
                 to date with templates. Please use \
                 nidm/nidm-results/scripts/create_spm_example_002.py.")
 
     def test_spm_ex003(self):
-        spm_example_file = os.path.join(NIDM_RESULTS_DIR, "spm", \
-            "example003", 'spm_results_conjunction.ttl')
-
-        current_graph, spm_current = self._parse_graph(spm_example_file)
-        create_spm_example_003.main()
-        updated_graph, unused = self._parse_graph(spm_example_file, spm_current)
-
-        found_difference = self._compare_graphs(current_graph, updated_graph)
-
-        if found_difference:
+        if not self._is_up_to_date(create_spm_example_003):
             raise Exception("example003/spm_results_conjunction.ttl is not up \
                 to date with templates. Please use \
-                nidm/nidm-results/scripts/create_spm_example_003.py.")    
+                nidm/nidm-results/scripts/create_spm_example_003.py.")
 
     def test_fsl_ex001(self):
-        example_file = os.path.join(NIDM_RESULTS_DIR, "fsl", "example001", "fsl_nidm.ttl")
-
-        current_graph, fsl_current = self._parse_graph(example_file)
-        create_fsl_example_001.main()
-        updated_graph, unused = self._parse_graph(example_file, fsl_current)
-
-
-        found_difference = self._compare_graphs(current_graph, updated_graph)
-
-
-        if found_difference:
+        if not self._is_up_to_date(create_fsl_example_001):
             raise Exception("example001/fsl_nidm.ttl is not up to date with templates. \
                 Please use nidm/nidm-results/scripts/create_fsl_example001.py.")
 
     def test_fsl_ex002(self):
-        example_file = os.path.join(NIDM_RESULTS_DIR, "test", "ground_truth", "voxelwise_p001_unc", "nidm.ttl")
-
-        current_graph, fsl_current = self._parse_graph(example_file)
-        create_fsl_example_002.main()
-        updated_graph, unused = self._parse_graph(example_file, fsl_current)
-
-        found_difference = self._compare_graphs(current_graph, updated_graph)
-
-        if found_difference:
+        if not self._is_up_to_date(create_fsl_example_002):
             raise Exception("example002/fsl_nidm.ttl is not up to date with templates. \
                 Please use nidm/nidm-results/scripts/create_fsl_example002.py.")
 
     def test_fsl_ex003(self):
-        example_file = os.path.join(NIDM_RESULTS_DIR, "test", "ground_truth", "voxelwise_p050_fwe", "nidm.ttl")
-
-        current_graph, fsl_current = self._parse_graph(example_file)
-        create_fsl_example_003.main()
-        updated_graph, unused = self._parse_graph(example_file, fsl_current)
-
-        found_difference = self._compare_graphs(current_graph, updated_graph)
-
-        if found_difference:
+        if not self._is_up_to_date(create_fsl_example_003):
             raise Exception("example003/fsl_nidm.ttl is not up to date with templates. \
                 Please use nidm/nidm-results/scripts/create_fsl_example003.py.")
 
-
     def test_fsl_results(self):
-        example_file = os.path.join(NIDM_RESULTS_DIR, "fsl", "fsl_results.ttl")
-
-        current_graph, fsl_current = self._parse_graph(example_file)
-        create_fsl_example.main()
-        updated_graph, unused = self._parse_graph(example_file, fsl_current)
-
-
-        found_difference = self._compare_graphs(current_graph, updated_graph)
-
-
-        if found_difference:
+        if not self._is_up_to_date(create_fsl_example):
             raise Exception("fsl_results.ttl is not up to date with templates. \
                 Please use nidm/nidm-results/scripts/create_fsl_examples.py.")
 
+    def test_graph_backend(self):
+        nidm_classes = {
+            "ImagingInstrument": dict(
+                id="niiri:mr_scanner_id",
+                label="MRI Scanner",
+                type="nlx:ixl_0050000"),
+            "DesignMatrix_HRFBasis2": dict(
+                design_matrix_id="niiri:design_matrix_id",
+                label='Design Matrix \\"listening\\"',
+                location="DesignMatrix.csv",
+                format="text/csv",
+                filename="DesignMatrix.csv",
+                design_matrix_png_id="niiri:design_matrix_png_id",
+                hrf_basis_2="spm:SPM_0000006 "),
+            # Not a single term: parsed from Turtle
+            "ExporterSoftware": dict(
+                software_id="niiri:exporter_id",
+                software_type="nidm:NIDM_0000168, prov:Agent",
+                label="spm_results_nidm",
+                version="12b.5858"),
+            }
+        example = ExampleFromTemplate(nidm_classes, None, backend="graph")
+        graph = Graph()
+        for triple in example.create_graph():
+            graph.add(triple)
+
+        text = templates.read("Namespaces")
+        for nidm_class, substitutes in nidm_classes.items():
+            text += "\n" + templates.render(nidm_class, substitutes)
+        text_graph = Graph()
+        text_graph.parse(data=text, format="turtle")
+
+        self.assertEqual(canonical_hash(text_graph), canonical_hash(graph))
+
+    def test_alphanum_prefixes(self):
+        # Identifiers of terms/prefixes.csv are replaced, prefixes defined by
+        # order of first use
+        example = ExampleFromTemplate(dict(), None)
+        text = example.replace_alphanum_id_by_prefixes(
+            "niiri:x a obo:STATO_0000039, nidm:NIDM_0000034 ;\n"
+            "    dc:title nidm:NIDM_00000340, nidm:NIDM_0000034 .")
+        self.assertEqual(
+            text,
+            "@prefix obo_statistic: "
+            "<http://purl.obolibrary.org/obo/STATO_0000039> .\n"
+            "@prefix nidm_HeightThreshold: "
+            "<http://purl.org/nidash/nidm#NIDM_0000034> .\n\n\n"
+            "niiri:x a obo_statistic:, nidm_HeightThreshold: ;\n"
+            "    dc:title nidm:NIDM_00000340, nidm_HeightThreshold: .")
+
+
+NAMESPACES = """@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+"""
+
+
+class TestGraphTemplate(unittest.TestCase):
+    """ Constructs parsed by GraphTemplate (and not by rdflib)"""
+
+    def _check(self, source, compiled=True, **substitutes):
+        """ Check that the graph built from the template is the graph of the
+        rendered Turtle, and whether the template was compiled"""
+        template = GraphTemplate(NAMESPACES, source)
+        graph = Graph()
+        self.assertEqual(template.add_to(graph, substitutes), compiled)
+
+        text_graph = Graph()
+        text_graph.parse(data=NAMESPACES + Template(source).substitute(
+            **substitutes), format="turtle")
+        if compiled:
+            self.assertTrue(isomorphic(graph, text_graph), source)
+
+    def test_literals(self):
+        self._check('$id ex:p "$value"^^xsd:float ;\n'
+                    '    ex:q "$value"^^<http://example.org/unit> .\n',
+                    id="ex:a", value="0.5")
+        self._check('$id ex:p "$label"@en , "fixed"@fr .\n',
+                    id="ex:a", label='a \\"quoted\\" \\n label')
+        self._check('$id ex:p "$value"^^xsd:boolean .\n',
+                    id="ex:a", value="1")
+
+    def test_multiline_strings(self):
+        # Placeholders in long strings are rendered as Turtle
+        self._check('$id ex:p """a "b" $value\nc""" ; ex:q "d" .\n',
+                    compiled=False, id="ex:a", value="x")
+        self._check("$id ex:p \'\'\'$value\'\'\' .\n",
+                    compiled=False, id="ex:a", value="x")
+        # Other placeholders of a template with long strings
+        self._check('$id ex:p """a "b" #c\nd""" ; ex:q "$value" .\n',
+                    id="ex:a", value="x")
+
+    def test_continuations(self):
+        self._check('$id a ex:C ;\n    ex:p $object , ex:o2 ;\n'
+                    '    ex:q "$value" , "$value2" .\n',
+                    id="ex:a", object="ex:o1", value="x", value2="y")
+        # Lists of objects in a substitute are rendered as Turtle
+        self._check('$id ex:p $object .\n', compiled=False,
+                    id="ex:a", object="ex:o1, ex:o2")
+
+    def test_blank_nodes(self):
+        self._check('$id ex:p [ a ex:B ; ex:q "$value"^^xsd:int ] ,\n'
+                    '    [ ex:r $object ] .\n',
+                    id="ex:a", value="3", object="ex:o")
+        self._check('$id ex:p ( $object "x" [ ex:q $object ] ) .\n',
+                    id="ex:a", object="ex:o")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
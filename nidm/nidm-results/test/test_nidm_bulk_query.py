@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+'''Test that nidm_bulk_query.py returns the rows of each query on each
+document
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+import os
+import sys
+import csv
+import shutil
+import tempfile
+import unittest
+from example_cache import get_graph
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+NIDM_RESULTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(NIDM_RESULTS_DIR, "scripts"))
+from nidm_bulk_query import bulk_query, main, query_name, column_types, \
+    column_value
+from nidm_queries import query
+
+SPM_DIR = os.path.join(NIDM_RESULTS_DIR, "spm")
+
+
+class TestNidmBulkQuery(unittest.TestCase):
+
+    def assertRowsEqual(self, rows, expected, msg):
+        # Floats of the JSON-LD examples have 12 significant digits
+        self.assertEqual(len(rows), len(expected), msg)
+        for row, expected_row in zip(rows, expected):
+            self.assertEqual(len(row), len(expected_row), msg)
+            for value, expected_value in zip(row, expected_row):
+                if isinstance(expected_value, float):
+                    self.assertAlmostEqual(
+                        value, expected_value,
+                        delta=abs(expected_value)*1e-10, msg=msg)
+                else:
+                    self.assertEqual(value, expected_value, msg)
+
+    def test_query_name(self):
+        self.assertEqual(query_name("peak.rq"), "peaks")
+        self.assertEqual(query_name("get_contrasts.rq"), "contrasts")
+        self.assertEqual(query_name("mask"), "mask")
+        self.assertRaises(ValueError, query_name, "unknown.rq")
+
+    def test_same_rows_as_queries(self):
+        for name in ("contrasts", "peaks"):
+            # Order of the rows of a document is not always defined
+            results = [(path, sorted(rows), error) for path, rows, error
+                       in bulk_query(name, [SPM_DIR], jobs=2)]
+            self.assertEqual(results, [
+                (path, sorted(rows), error) for path, rows, error
+                in bulk_query(name, [SPM_DIR], jobs=1)])
+            documents = [path for path, rows, error in results
+                         if path.endswith(".ttl")]
+            self.assertEqual(len(documents), 4)
+
+            # JSON-LD documents have the same (typed) rows as their Turtle
+            # version
+            expected = dict()
+            for path in documents:
+                expected[os.path.splitext(path)[0]] = sorted(
+                    tuple(row) for row in query(name, get_graph(path)))
+            for path, rows, error in results:
+                self.assertIsNone(error, path)
+                self.assertRowsEqual(
+                    rows, expected[os.path.splitext(path)[0]], path)
+            self.assertEqual(len(results), 2*len(documents))
+
+    def test_column_types(self):
+        self.assertEqual(
+            column_types("clusters"),
+            ['string', 'int', 'int', 'string', 'float', 'float'])
+        self.assertEqual(column_types("mask"), ['string'])
+
+    def test_column_value(self):
+        self.assertEqual(column_value(530, "int"), 530)
+        self.assertEqual(column_value(u"530", "int"), 530)
+        self.assertEqual(column_value(u"inf", "float"), float("inf"))
+        self.assertEqual(column_value(3, "float"), 3.0)
+        self.assertEqual(column_value(0.1, "string"), u"0.1")
+        self.assertIsNone(column_value(None, "float"))
+        # Values that are not of the type of the column are rejected
+        self.assertRaises(ValueError, column_value, 1.5, "int")
+        self.assertRaises(ValueError, column_value, u"abc", "float")
+        self.assertRaises(ValueError, column_value, True, "int")
+
+    def test_csv(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(tmp_dir, 'syntax.ttl'), 'w') as fid:
+                fid.write("not turtle")
+            csv_file = os.path.join(tmp_dir, 'clusters.csv')
+            success = main(
+                "cluster.rq",
+                [os.path.join(SPM_DIR, "spm_results.ttl"), tmp_dir],
+                csv_file, jobs=1)
+            with open(csv_file, 'rb') as fid:
+                table = list(csv.reader(fid))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertFalse(success)
+        self.assertEqual(table[0], ['source', 'cluster', 'label', 'sizeVx',
+                                    'sizeRz', 'pvalcor', 'pvalunc'])
+        self.assertEqual([row[0] for row in table[1:]],
+                         [os.path.join(SPM_DIR, "spm_results.ttl")]*3)
+        self.assertEqual([row[2] for row in table[1:]], ['1', '2', '3'])
+
+    @unittest.skipUnless(pyarrow, "requires pyarrow")
+    def test_parquet(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            # Cluster label that is not an integer
+            spm_results = os.path.join(SPM_DIR, "spm_results.ttl")
+            with open(spm_results, 'r') as fid:
+                ttl = fid.read()
+            label_file = os.path.join(tmp_dir, 'label.ttl')
+            with open(label_file, 'w') as fid:
+                fid.write(ttl.replace('nidm_clusterLabelId: "1"^^xsd:int',
+                                      'nidm_clusterLabelId: "1.5"^^xsd:float'))
+            parquet_file = os.path.join(tmp_dir, 'clusters.parquet')
+            success = main(
+                "clusters",
+                [spm_results, label_file,
+                 os.path.join(SPM_DIR, "spm_results.json")],
+                parquet_file, jobs=1)
+            table = pyarrow.parquet.read_table(parquet_file)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertFalse(success)
+        types = dict((field.name, field.type) for field in table.schema)
+        self.assertEqual(types['source'], pyarrow.string())
+        self.assertEqual(types['label'], pyarrow.int64())
+        self.assertEqual(types['sizeVx'], pyarrow.int64())
+        self.assertEqual(types['sizeRz'], pyarrow.string())
+        self.assertEqual(types['pvalunc'], pyarrow.float64())
+        # No row of label.ttl, same rows for the Turtle and JSON-LD documents
+        columns = table.to_pydict()
+        self.assertEqual(columns['source'],
+                         [spm_results]*3 +
+                         [os.path.join(SPM_DIR, "spm_results.json")]*3)
+        self.assertEqual(columns['label'], [1, 2, 3]*2)
+        self.assertEqual(columns['sizeRz'], [None]*6)
+        self.assertEqual(columns['pvalunc'][:3], columns['pvalunc'][3:])
+
+if __name__ == '__main__':
+    unittest.main()
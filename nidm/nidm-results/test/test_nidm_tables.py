@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+'''Test that the peak and cluster tables of nidm_tables.py match the results
+of query/peak.rq and query/cluster.rq
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+import os
+import sys
+import glob
+import unittest
+from example_cache import get_graph
+
+NIDM_RESULTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(NIDM_RESULTS_DIR, "scripts"))
+from nidm_queries import query, prepare
+from nidm_tables import PEAK_COLUMNS, CLUSTER_COLUMNS, peak_rows, \
+    cluster_rows, peak_table, cluster_table
+
+EXAMPLES = sorted(
+    glob.glob(os.path.join(NIDM_RESULTS_DIR, 'spm', '*.ttl')) +
+    glob.glob(os.path.join(NIDM_RESULTS_DIR, 'spm', '*', '*.ttl')) +
+    glob.glob(os.path.join(NIDM_RESULTS_DIR, 'fsl', '*.ttl')) +
+    glob.glob(os.path.join(NIDM_RESULTS_DIR, 'fsl', '*', '*.ttl')))
+
+
+class TestNidmTables(unittest.TestCase):
+
+    def test_columns(self):
+        self.assertEqual(PEAK_COLUMNS, prepare("peaks").columns)
+        self.assertEqual(CLUSTER_COLUMNS, prepare("clusters").columns)
+
+    def test_same_rows_as_queries(self):
+        for example in EXAMPLES:
+            graph = get_graph(example)
+            for name, rows in (("peaks", peak_rows),
+                               ("clusters", cluster_rows)):
+                expected = [tuple(row) for row in query(name, graph)]
+                self.assertTrue(expected, example)
+                found = rows(graph)
+                # Order of rows with the same sort keys is not defined
+                self.assertEqual(sorted(found), sorted(expected), example)
+                self.assertEqual([row[:2] for row in found],
+                                 [row[:2] for row in expected], example)
+
+    def test_tables(self):
+        graph = get_graph(os.path.join(NIDM_RESULTS_DIR, "spm",
+                                       "spm_results.ttl"))
+        peaks = peak_table(graph)
+        self.assertEqual(list(peaks), PEAK_COLUMNS)
+        self.assertEqual(len(peaks['peak']), 7)
+        self.assertEqual(
+            list(peaks['zstat']), [row.zstat for row in query("peaks", graph)])
+
+        clusters = cluster_table(graph)
+        self.assertEqual(list(clusters['label']), [1, 2, 3])
+        self.assertEqual(list(clusters['sizeRz']), [None, None, None])
+
+if __name__ == '__main__':
+    unittest.main()
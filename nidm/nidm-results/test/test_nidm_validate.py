@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+'''Test that nidm_validate.py reports the same exceptions as the OwlReader
+checks used in TestExamplesMatchVocabulary.py
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+import os
+import sys
+import glob
+import shutil
+import time
+import tempfile
+import unittest
+from rdflib import Graph, Literal, RDF, XSD
+from nidmresults.objects.constants_rdflib import NIIRI, NIDM_PEAK, \
+    NIDM_P_VALUE_UNCORRECTED, NIDM_SUPRA_THRESHOLD_CLUSTER, \
+    NIDM_CLUSTER_SIZE_IN_VOXELS, NIDM_STATISTIC_MAP, NIDM_CONTRAST_NAME
+
+NIDM_RESULTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_DIR = os.path.join(NIDM_RESULTS_DIR, "scripts")
+sys.path.append(SCRIPT_DIR)
+from nidm_validate import CompiledOntology, load_document, validate, \
+    imap_bounded
+from validate_examples import OWL_FILE, find_import_files, RANGES, \
+    RESTRICTIONS
+from owl_cache import get_owl_reader
+
+EXAMPLES = sorted(
+    glob.glob(os.path.join(NIDM_RESULTS_DIR, 'spm', '*.ttl')) +
+    glob.glob(os.path.join(NIDM_RESULTS_DIR, 'spm', '*', '*.ttl')) +
+    glob.glob(os.path.join(NIDM_RESULTS_DIR, 'fsl', '*.ttl')) +
+    glob.glob(os.path.join(NIDM_RESULTS_DIR, 'fsl', '*', '*.ttl')))
+
+
+def _square_slowly(value):
+    # Items do not all take the same time
+    time.sleep(0.001*(value % 7))
+    return value*value
+
+
+class TestNidmValidate(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.owl = get_owl_reader(OWL_FILE, find_import_files(OWL_FILE))
+        cls.ontology = CompiledOntology(cls.owl)
+
+    def test_same_exceptions(self):
+        for example in EXAMPLES:
+            graph = load_document(example, self.ontology.namespaces)
+            exceptions = [self.owl.check_class_names(graph, example)]
+            exceptions += self.owl.check_attributes(graph, example)
+            self.assertEqual(
+                self.ontology.check(graph),
+                [sorted(key.replace("\n ", "", 1) for key in exception)
+                 for exception in exceptions], example)
+
+    def test_json_ld(self):
+        # JSON-LD examples have the same report as their Turtle version
+        json_examples = [os.path.splitext(example)[0] + ".json"
+                         for example in EXAMPLES]
+        json_examples = [example for example in json_examples
+                         if os.path.isfile(example)]
+        self.assertIn(os.path.join(NIDM_RESULTS_DIR, 'spm',
+                                   'spm_results.json'), json_examples)
+        for report in validate(json_examples, jobs=1):
+            self.assertNotIn("error", report)
+            ttl_report = next(validate(
+                [os.path.splitext(report["file"])[0] + ".ttl"], jobs=1))
+            del report["file"], ttl_report["file"]
+            self.assertEqual(report, ttl_report)
+
+    def _check(self, class_name, prp, value):
+        """ Exceptions of a document with one instance of class_name with
+        value for prp"""
+        graph = Graph()
+        for prefix, namespace in self.ontology.namespaces:
+            graph.bind(prefix, namespace)
+        graph.add((NIIRI['x'], RDF['type'], class_name))
+        graph.add((NIIRI['x'], prp, value))
+        return self.ontology.check(graph)
+
+    def test_plain_literals(self):
+        # Read as xsd:string (e.g. from JSON-LD)
+        self.assertEqual(self._check(NIDM_STATISTIC_MAP, NIDM_CONTRAST_NAME,
+                                     Literal("motor")), [[], [], [], []])
+        ranges = self._check(NIDM_PEAK, NIDM_P_VALUE_UNCORRECTED,
+                             Literal("0.01"))[RANGES]
+        self.assertEqual(len(ranges), 1)
+        self.assertTrue(ranges[0].startswith(
+            "Unrecognised range: string (i.e. xsd:string) for"), ranges[0])
+
+    def test_iri_with_restrictions(self):
+        exceptions = self._check(NIDM_PEAK, NIDM_P_VALUE_UNCORRECTED,
+                                 NIIRI['not_a_literal'])
+        self.assertEqual(len(exceptions[RANGES]), 1)
+        self.assertEqual(exceptions[RESTRICTIONS], [])
+
+        exceptions = self._check(NIDM_PEAK, NIDM_P_VALUE_UNCORRECTED,
+                                 Literal(-0.1, datatype=XSD['float']))
+        self.assertEqual(exceptions[RANGES], [])
+        self.assertEqual(len(exceptions[RESTRICTIONS]), 1)
+
+    def test_positive_integer(self):
+        # xsd:int values are accepted for xsd:positiveInteger if positive
+        for value, num_errors in ((530, 0), (0, 0), (-1, 1)):
+            exceptions = self._check(
+                NIDM_SUPRA_THRESHOLD_CLUSTER, NIDM_CLUSTER_SIZE_IN_VOXELS,
+                Literal(value, datatype=XSD['int']))
+            self.assertEqual(len(exceptions[RANGES]), num_errors, value)
+        exceptions = self._check(
+            NIDM_SUPRA_THRESHOLD_CLUSTER, NIDM_CLUSTER_SIZE_IN_VOXELS,
+            Literal("many", datatype=XSD['int']))
+        self.assertEqual(len(exceptions[RANGES]), 1)
+
+    def test_invalid_documents(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with open(EXAMPLES[0], 'r') as fid:
+                ttl = fid.read()
+            with open(os.path.join(tmp_dir, 'unknown_class.ttl'), 'w') as fid:
+                fid.write(ttl + "\nniiri:x a nidm:NIDM_9999999 .\n")
+            with open(os.path.join(tmp_dir, 'syntax.ttl'), 'w') as fid:
+                fid.write("not turtle")
+
+            reports = list(validate([tmp_dir, EXAMPLES[0]], jobs=1))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertEqual([r["valid"] for r in reports], [False, False, True])
+        self.assertIn("error", reports[0])
+        self.assertEqual(reports[1]["classes"],
+                         ["Unrecognised sub-type: nidm:NIDM_9999999"])
+
+    def test_imap_bounded(self):
+        # More items than the window of submitted items (jobs*16)
+        values = range(100)
+        for jobs in (1, 2):
+            self.assertEqual(
+                list(imap_bounded(_square_slowly, iter(values), jobs)),
+                [value*value for value in values])
+
+if __name__ == '__main__':
+    unittest.main()
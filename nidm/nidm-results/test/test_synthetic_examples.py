@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+'''Test the synthetic NIDM-Results documents created by
+nidm/nidm-results/scripts/create_synthetic_examples.py
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+import os
+import sys
+import random
+import unittest
+from rdflib import RDF, Graph
+from rdflib.compare import to_isomorphic
+
+NIDM_RESULTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_DIR = os.path.join(NIDM_RESULTS_DIR, "scripts")
+sys.path.append(SCRIPT_DIR)
+from create_example_from_templates import ExampleFromTemplate
+from create_synthetic_examples import synthetic_classes, document_rng
+from nidm_queries import get_peaks, get_clusters
+from nidm_validate import CompiledOntology
+from validate_examples import OWL_FILE, find_import_files
+from owl_cache import get_owl_reader
+from nidmresults.objects.constants_rdflib import *
+
+
+class TestSyntheticExamples(unittest.TestCase):
+
+    def _graph(self, seed, **size):
+        nidm_classes = synthetic_classes(rng=random.Random(seed), **size)
+        return ExampleFromTemplate(
+            nidm_classes, None, backend="graph").create_graph()
+
+    def test_size(self):
+        g = self._graph(0, contrasts=2, pe_maps=3, clusters=4, peaks=5)
+
+        def count(nidm_type):
+            return len(list(g.subjects(RDF.type, nidm_type)))
+
+        self.assertEqual(count(NIDM_STATISTIC_MAP), 2)
+        self.assertEqual(count(NIDM_PARAMETER_ESTIMATE_MAP), 3)
+        self.assertEqual(count(NIDM_SUPRA_THRESHOLD_CLUSTER), 2*4)
+        self.assertEqual(count(NIDM_PEAK), 2*4*5)
+
+    def test_queries(self):
+        graph = Graph()
+        for triple in self._graph(3, contrasts=2, clusters=3, peaks=2):
+            graph.add(triple)
+        self.assertEqual(len(get_peaks(graph)), 2*3*2)
+        self.assertEqual(len(get_clusters(graph)), 2*3)
+
+    def test_valid(self):
+        ontology = CompiledOntology(
+            get_owl_reader(OWL_FILE, find_import_files(OWL_FILE)))
+        graph = Graph()
+        for triple in self._graph(4, contrasts=2, clusters=2, peaks=2):
+            graph.add(triple)
+        for prefix, namespace in ontology.namespaces:
+            graph.bind(prefix, namespace, override=False)
+
+        self.assertEqual(ontology.check(graph), [[], [], [], []])
+
+    def test_seeded(self):
+        self.assertEqual(to_isomorphic(self._graph(1)),
+                         to_isomorphic(self._graph(1)))
+        self.assertNotEqual(to_isomorphic(self._graph(1)),
+                            to_isomorphic(self._graph(2)))
+        # Documents of runs with different seeds differ
+        self.assertNotEqual(document_rng(0, 1).random(),
+                            document_rng(1, 0).random())
+        self.assertEqual(document_rng(2, 3).random(),
+                         document_rng(2, 3).random())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+''' Canonical hash and diff of NIDM documents.
+
+rdflib.compare.to_isomorphic canonicalises all the triples of a graph, which
+is very slow for large documents. In NIDM documents most nodes are IRIs
+(niiri:...) and the few blank nodes (e.g. qualified generations) are shallow,
+so each blank node is instead labelled by a hash of its (hashed)
+neighbourhood, refined until all blank nodes have distinct labels. Triples
+are then written as N-Triples with the canonical labels and sorted, which
+gives a stable digest and a diff by set difference. Only graphs in which
+some blank nodes cannot be told apart this way are canonicalised with
+rdflib.compare.
+
+Usage: python graph_hash.py FILE [FILE ...]
+    prints the canonical hash of each turtle FILE (as sha256sum does)
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+
+import sys
+import hashlib
+from json.encoder import encode_basestring_ascii
+from rdflib import BNode, URIRef
+from rdflib.graph import Graph
+from rdflib.compare import to_canonical_graph
+
+
+def _sha(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _n3(node, labels):
+    if isinstance(node, BNode):
+        return "_:b" + labels[node]
+    if isinstance(node, URIRef):
+        return u"<%s>" % node
+    # Literal (quoted as a JSON string, much faster than Literal.n3)
+    lexical = encode_basestring_ascii(node)
+    if node.language:
+        return lexical + "@" + node.language
+    if node.datatype:
+        return u"%s^^<%s>" % (lexical, node.datatype)
+    return lexical
+
+
+def bnode_labels(triples):
+    """ Canonical label of each blank node of triples, None if some blank
+    nodes could not be distinguished from their neighbourhood"""
+    # Triples around each blank node
+    around = dict()
+    for s, p, o in triples:
+        if isinstance(s, BNode):
+            around.setdefault(s, list()).append((True, p, o))
+        if isinstance(o, BNode):
+            around.setdefault(o, list()).append((False, p, s))
+
+    labels = dict((bnode, "") for bnode in around)
+    num_labels = 1 if labels else 0
+    while num_labels < len(labels):
+        labels = dict(
+            (bnode, _sha(labels[bnode] + "\n".join(sorted(
+                ("> " if outgoing else "< ") + _n3(p, labels) + " " +
+                _n3(other, labels)
+                for outgoing, p, other in triples))))
+            for bnode, triples in around.items())
+        refined = len(set(labels.values()))
+        if refined == num_labels:
+            # No more refinement possible
+            return None
+        num_labels = refined
+    return labels
+
+
+def canonical_triples(graph):
+    """ Triples of graph, with canonical blank nodes, indexed by their
+    canonical line (as N-Triples, with literals quoted as JSON strings)"""
+    triples = list(graph)
+    labels = bnode_labels(triples)
+    if labels is None:
+        triples = list(to_canonical_graph(graph))
+        labels = dict((node, str(node)) for triple in triples
+                      for node in triple if isinstance(node, BNode))
+
+    lines = dict()
+    for triple in triples:
+        s, p, o = triple
+        if labels and (isinstance(s, BNode) or isinstance(o, BNode)):
+            triple = tuple(BNode("b" + labels[node])
+                           if isinstance(node, BNode) else node
+                           for node in triple)
+        lines[u"%s %s %s ." % (_n3(s, labels), _n3(p, labels),
+                               _n3(o, labels))] = triple
+    return lines
+
+
+def canonical_hash(graph):
+    """ Digest of graph, equal for isomorphic graphs"""
+    return _sha("\n".join(sorted(canonical_triples(graph))))
+
+
+def document_hash(ttl_file):
+    """ Digest of the turtle document ttl_file"""
+    graph = Graph()
+    graph.parse(ttl_file, format='turtle')
+    return canonical_hash(graph)
+
+
+def _as_graph(triples):
+    graph = Graph()
+    for triple in triples:
+        graph.add(triple)
+    return graph
+
+
+def graph_diff(graph1, graph2):
+    """ Triples in both graphs, in graph1 only and in graph2 only (as
+    rdflib.compare.graph_diff)"""
+    triples1 = canonical_triples(graph1)
+    triples2 = canonical_triples(graph2)
+    return (
+        _as_graph(triples1[line] for line in triples1 if line in triples2),
+        _as_graph(triples1[line] for line in triples1
+                  if line not in triples2),
+        _as_graph(triples2[line] for line in triples2
+                  if line not in triples1))
+
+
+def compare_graphs(graph1, graph2):
+    """ Drop-in replacement for test_commons.compare_graphs: True (and log
+    the differences) if the graphs are not isomorphic"""
+    from nidmresults.test.test_commons import display_graph
+
+    if canonical_hash(graph1) == canonical_hash(graph2):
+        return False
+
+    in_both, in_first, in_second = graph_diff(graph1, graph2)
+    found_difference_1 = display_graph(in_first, "\t In first: ")
+    found_difference_2 = display_graph(in_second, "\t In second: ")
+    return found_difference_1 or found_difference_2
+
+
+def compare_ttl_documents(ttl_doc1, ttl_doc2):
+    """ Drop-in replacement for test_commons.compare_ttl_documents (ttl_doc1
+    and ttl_doc2 are files or URLs)"""
+    from nidmresults.test.test_commons import _get_ttl_doc_content
+
+    doc_graph = Graph()
+    doc_graph.parse(data=_get_ttl_doc_content(ttl_doc1), format='turtle')
+    same_doc_graph = Graph()
+    same_doc_graph.parse(data=_get_ttl_doc_content(ttl_doc2),
+                         format='turtle')
+    return compare_graphs(same_doc_graph, doc_graph)
+
+
+if __name__ == '__main__':
+    for ttl_file in sys.argv[1:]:
+        sys.stdout.write(document_hash(ttl_file) + "  " + ttl_file + "\n")
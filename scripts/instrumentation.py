@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+''' Optional timers and call counters for the specification generator.
+
+Set the environment variable NIDM_SPEC_PROFILE to "table" (or "1") or to
+"json" to time the main phases of a specification build and count the calls
+to each method of the instrumented object. A summary is printed once the
+specification is written. Nothing is wrapped when profiling is off, so that
+the generator then runs the plain methods.
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+
+import os
+import sys
+import json
+import types
+import timeit
+import functools
+import collections
+
+PROFILE_ENV = "NIDM_SPEC_PROFILE"
+
+
+def get_profile_format():
+    """ Output format requested through NIDM_SPEC_PROFILE, None if
+    profiling is off"""
+    profile = os.environ.get(PROFILE_ENV, "").lower()
+    if profile in ("", "0"):
+        return None
+    if profile == "json":
+        return "json"
+    return "table"
+
+
+class Profiler(object):
+
+    def __init__(self, output="table"):
+        if output not in ("table", "json"):
+            raise ValueError("Unknown profile output: " + str(output))
+        self.output = output
+        self.timings = collections.OrderedDict()
+        self.calls = collections.Counter()
+        self._running = set()
+
+    def instrument(self, obj, phases, report_after=None):
+        """ Count calls to all methods of obj and time the methods listed in
+        phases (ordered dict phase name -> method name). The summary is
+        reported each time method report_after returns."""
+        phase_of = dict((method, phase) for phase, method in phases.items())
+        for phase in phases:
+            self.timings[phase] = 0.0
+
+        methods = set()
+        for cls in type(obj).__mro__:
+            for name, function in vars(cls).items():
+                if not name.startswith("__") and \
+                        isinstance(function, types.FunctionType):
+                    methods.add(name)
+
+        for name in methods:
+            # The instance attribute shadows the method of the class
+            setattr(obj, name, self._wrap(
+                getattr(obj, name), name, phase_of.get(name),
+                name == report_after))
+
+    def _wrap(self, method, name, phase=None, report=False):
+        @functools.wraps(method)
+        def counted(*args, **kwargs):
+            self.calls[name] += 1
+            # Recursive calls (e.g. sections of child classes) are only
+            # timed once
+            if phase is None or phase in self._running:
+                result = method(*args, **kwargs)
+            else:
+                self._running.add(phase)
+                start = timeit.default_timer()
+                try:
+                    result = method(*args, **kwargs)
+                finally:
+                    self.timings[phase] += timeit.default_timer() - start
+                    self._running.discard(phase)
+            if report:
+                self.report()
+            return result
+        return counted
+
+    def summary(self):
+        return collections.OrderedDict([
+            ("phases", self.timings),
+            ("calls", collections.OrderedDict(
+                sorted(self.calls.items(), key=lambda x: (-x[1], x[0]))))])
+
+    def report(self, out=None):
+        out = out or sys.stdout
+        summary = self.summary()
+        if self.output == "json":
+            out.write(json.dumps(
+                summary, indent=2, separators=(",", ": ")) + "\n")
+            return
+
+        out.write("%-30s %10s\n" % ("Phase", "Time (s)"))
+        for phase, elapsed in summary["phases"].items():
+            out.write("%-30s %10.3f\n" % (phase, elapsed))
+        out.write("\n%-30s %10s\n" % ("Method", "Calls"))
+        for name, num_calls in summary["calls"].items():
+            out.write("%-30s %10d\n" % (name, num_calls))
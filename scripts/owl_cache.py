@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+''' On-disk cache of parsed ontologies.
+
+Parsing nidm-results.owl and all the imports from turtle is the most
+expensive step of most of our scripts. CachedOwlReader is a drop-in
+replacement for OwlReader that stores the merged graph (owl file + imports)
+in a binary dump keyed by the content of all input files, so that warm runs
+can skip turtle parsing altogether. get_owl_reader additionally shares a
+single reader per ontology between all the callers of a process.
+
+Set the environment variable NIDM_OWL_CACHE to a directory to relocate the
+cache or to "0" to disable it.
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+
+import os
+import hashlib
+import logging
+import tempfile
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+import rdflib
+from rdflib.graph import Graph
+from nidmresults.owl.owl_reader import OwlReader
+from nidmresults.objects.constants_rdflib import namespaces as namespace_names
+
+RELPATH = os.path.dirname(os.path.abspath(__file__))
+NIDM_ROOT = os.path.dirname(RELPATH)
+OWL_CACHE_DIR = os.path.join(NIDM_ROOT, ".owl_cache")
+
+logger = logging.getLogger(__name__)
+
+
+def get_cache_dir():
+    cache_dir = os.environ.get("NIDM_OWL_CACHE", OWL_CACHE_DIR)
+    if cache_dir == "0":
+        return None
+    return cache_dir
+
+
+def ontology_key(owl_file, import_files=None):
+    """ Content hash of an owl file and its imports"""
+    sha = hashlib.sha1()
+    # Invalidate the cache when rdflib (and hence the pickled terms) changes
+    sha.update(rdflib.__version__.encode('utf-8'))
+    for owl_path in [owl_file] + list(import_files or []):
+        with open(owl_path, 'rb') as fid:
+            sha.update(hashlib.sha1(fid.read()).digest())
+    return sha.hexdigest()
+
+
+def load_graph(owl_file, import_files=None):
+    """ Return the graph merging owl_file and import_files, read from the
+    cache if available, parsed from turtle (and cached) otherwise"""
+    cache_dir = get_cache_dir()
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = os.path.join(
+            cache_dir, ontology_key(owl_file, import_files) + ".pickle")
+        if os.path.isfile(cache_file):
+            logger.debug("Ontology cache hit for " + owl_file)
+            with open(cache_file, 'rb') as fid:
+                bindings, triples = pickle.load(fid)
+            owl_graph = Graph()
+            for prefix, namespace in bindings:
+                owl_graph.bind(prefix, namespace)
+            for triple in triples:
+                owl_graph.add(triple)
+            for name, namespace in namespace_names.items():
+                owl_graph.bind(name, namespace)
+            return owl_graph
+
+    owl_graph = _parse_graph(owl_file, import_files)
+
+    if cache_file is not None:
+        logger.debug("Ontology cache miss for " + owl_file)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        # Write to a temporary file first so that concurrent scripts never
+        # read a partial dump
+        fd, tmp_file = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(fd, 'wb') as fid:
+            pickle.dump((list(owl_graph.namespaces()), list(owl_graph)),
+                        fid, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_file, cache_file)
+
+    return owl_graph
+
+
+def _parse_graph(owl_file, import_files=None):
+    # Same as OwlReader.get_graph
+    owl_graph = Graph()
+    owl_graph.parse(owl_file, format='turtle')
+
+    if import_files:
+        for import_file in import_files:
+            import_graph = Graph()
+            import_graph.parse(import_file, format='turtle')
+            owl_graph = owl_graph + import_graph
+
+    # Overwrite namespaces
+    for name, namespace in namespace_names.items():
+        owl_graph.bind(name, namespace)
+
+    return owl_graph
+
+
+class CachedOwlReader(OwlReader):
+
+    def get_graph(self):
+        return load_graph(self.file, self.import_files)
+
+
+# Ontologies already loaded in this process
+_owl_readers = dict()
+
+
+def get_owl_reader(owl_file, import_files=None):
+    """ Return a CachedOwlReader for owl_file and import_files, shared by all
+    callers in the current process"""
+    key = (os.path.abspath(owl_file),
+           frozenset(map(os.path.abspath, import_files or [])))
+    if key not in _owl_readers:
+        _owl_readers[key] = CachedOwlReader(owl_file, import_files)
+    return _owl_readers[key]
+
+
+def clear_owl_readers():
+    _owl_readers.clear()
@@ -1,23 +1,41 @@
 import os
 import codecs
-from nidmresults.owl.owl_reader import OwlReader
+import logging
+import collections
+from owl_cache import CachedOwlReader
+from instrumentation import Profiler, get_profile_format
 from nidmresults.objects.constants_rdflib import *
 import cgi
 import markdown2
+from rdflib import RDF
 
 RELPATH = os.path.dirname(os.path.abspath(__file__))
 NIDM_ROOT = os.path.dirname(RELPATH)
 DOC_FOLDER = os.path.join(NIDM_ROOT, 'doc', 'content', 'specs')
 INCLUDE_FOLDER = os.path.join(DOC_FOLDER, "include")
 
+# Maximum number of definitions kept rendered in memory
+DEFINITION_CACHE_SIZE = 4096
+
+# Methods timed when profiling is enabled (see instrumentation.py)
+PROFILED_PHASES = collections.OrderedDict([
+    ("index build", "index_terms"),
+    ("subcomponent tables", "create_subcomponent_table"),
+    ("class sections", "create_class_section"),
+    ("header/footer", "_header_footer"),
+    ("write", "write_specification"),
+])
+
+logger = logging.getLogger(__name__)
+
 
 class OwlSpecification(object):
 
     def __init__(self, owl_file, import_files, spec_name, subcomponents=None,
                  used_by=None, generated_by=None, derived_from=None,
                  attributed_to=None, prefix=None, commentable=False,
-                 intro=None):
-        self.owl = OwlReader(owl_file, import_files)
+                 intro=None, profile=None):
+        self.owl = CachedOwlReader(owl_file, import_files)
         self.owl.graph.bind('dct', 'http://purl.org/dc/terms/')
         self.owl.graph.bind('dicom', 'http://purl.org/nidash/dicom#')
         self.owl.graph.bind('nidm', 'http://purl.org/nidash/nidm#')
@@ -29,29 +47,149 @@ class OwlSpecification(object):
         self.name = spec_name
         self.component = self.name.lower().replace("-", "_")
         self.section_open = 0
-        self.already_defined_classes = list()
+        self.already_defined_classes = set()
         self.commentable = commentable
 
         self.attributes_done = set()
-        self.text = ""
+        # HTML fragments of the specification, only joined when needed
+        self._fragments = list()
+        # Definitions already rendered to HTML (least recently used first)
+        self._definitions_html = collections.OrderedDict()
+        self.definition_hits = 0
+        self.definition_misses = 0
+        # Reverse of the used_by and generated_by relations
+        self._reverse_indexes = dict()
+
+        # Profile format ("table" or "json"), read from NIDM_SPEC_PROFILE by
+        # default
+        if profile is None:
+            profile = get_profile_format()
+        self.profiler = None
+        if profile:
+            self.profiler = Profiler(profile)
+            self.profiler.instrument(self, PROFILED_PHASES,
+                                     report_after="write_specification")
+
+        # Must come after the namespace bindings above (used by the qnames)
+        self.index_terms()
         self.create_specification(subcomponents, used_by, generated_by,
                                   derived_from, attributed_to, prefix, intro)
 
+    def index_terms(self):
+        """ Build the record (label, qname, definition, parent, children, PROV
+        type and individuals) of all terms of the ontology, so that rendering
+        does not query the graph again for each reference to a term"""
+        self.terms = dict()
+
+        # Children and individuals in one pass over the graph
+        for subject, predicate, obj in self.owl.graph:
+            if predicate == RDFS['subClassOf']:
+                if not self.owl.is_deprecated(subject):
+                    self._record(obj).setdefault(
+                        "children", set()).add(subject)
+            elif predicate == RDF['type']:
+                self._record(obj).setdefault(
+                    "individuals", list()).append(subject)
+
+        lookups = (self._label, self._qname, self._definition,
+                   self._nidm_parent, self._prov_class)
+        for term_uri in self.owl.classes | self.owl.properties | \
+                set(self.owl.individuals):
+            for lookup in lookups:
+                try:
+                    lookup(term_uri)
+                except Exception:
+                    # Raised again if the term is actually rendered
+                    pass
+
+        # Attribute definitions are repeated in every class using them
+        self.prerender_definitions(
+            record["definition"] for record in self.terms.values()
+            if "definition" in record)
+
+    def _record(self, term_uri):
+        return self.terms.setdefault(term_uri, dict())
+
+    def _lookup(self, term_uri, field, read):
+        # Terms outside of the ontology (e.g. PROV types) are indexed on
+        # first use
+        record = self._record(term_uri)
+        if field not in record:
+            record[field] = read(term_uri)
+        return record[field]
+
+    def _label(self, term_uri):
+        return self._lookup(term_uri, "label", self.owl.get_label)
+
+    def _qname(self, term_uri):
+        return self._lookup(term_uri, "qname", self.owl.graph.qname)
+
+    def _name(self, term_uri):
+        return self._qname(term_uri).split(":")[1]
+
+    def _definition(self, term_uri):
+        return self._lookup(term_uri, "definition", self.owl.get_definition)
+
+    def _nidm_parent(self, term_uri):
+        return self._lookup(term_uri, "nidm_parent", self.owl.get_nidm_parent)
+
+    def _prov_class(self, term_uri):
+        return self._lookup(term_uri, "prov_class", self.owl.get_prov_class)
+
+    def _children(self, term_uri):
+        return self._record(term_uri).get("children", set())
+
+    def _individuals(self, term_uri):
+        return self._record(term_uri).get("individuals", list())
+
+    def _is_prov(self, term_uri):
+        return self._label(term_uri).startswith("prov")
+
+    def _reverse_index(self, relation, many=False):
+        """ Map each value of relation (e.g. an activity in used_by) to the
+        list of keys (e.g. entities) it is related to"""
+        if id(relation) not in self._reverse_indexes:
+            reverse = dict()
+            for key, values in relation.items():
+                if not many:
+                    values = [values]
+                for value in values:
+                    reverse.setdefault(value, list()).append(key)
+            # Keep a reference to relation so that its id is not re-used
+            self._reverse_indexes[id(relation)] = (relation, reverse)
+        return self._reverse_indexes[id(relation)][1]
+
+    def _sorted_by_labels(self, term_list):
+        # Same ordering as OwlReader.sorted_by_labels
+        return [term_uri for (label, term_uri) in
+                sorted(zip(map(self._label, term_list), term_list))]
+
+    @property
+    def text(self):
+        if len(self._fragments) != 1:
+            self._fragments = ["".join(self._fragments)]
+        return self._fragments[0]
+
+    @text.setter
+    def text(self, text):
+        self._fragments = [text]
+
+    def _write(self, fragment):
+        self._fragments.append(fragment)
+
     def create_specification(self, subcomponents, used_by, generated_by,
                              derived_from, attributed_to, prefix, intro=None):
         self.create_title(self.name+": Types and relations", "definitions")
 
-        print "into create_specification"
-
         if intro is not None:
-            self.text += intro
+            self._write(intro)
 
         table_num = 3
         for subcomponent_name, classes in subcomponents.items():
             classes_by_types = self.owl.get_class_names_by_prov_type(
                 classes,
                 prefix=prefix, but=self.already_defined_classes)
-            self.already_defined_classes += classes
+            self.already_defined_classes.update(classes)
 
             self.create_subcomponent_table(classes_by_types, table_num,
                                            subcomponent_name)
@@ -65,26 +203,26 @@ class OwlSpecification(object):
             for class_name in all_classes:
                 self.create_class_section(
                     class_name,
-                    self.owl.get_definition(class_name),
+                    self._definition(class_name),
                     self.owl.attributes.setdefault(class_name, None),
                     used_by, generated_by, derived_from, attributed_to,
                     children=not (
-                        self.owl.get_prov_class(class_name) == PROV['Entity']))
+                        self._prov_class(class_name) == PROV['Entity']))
 
             if subcomponent_name:
-                self.text += """
-            </section>"""
+                self._write("""
+            </section>""")
 
         self.close_sections()
 
+        logger.debug("Rendered definitions: %d cache hits, %d misses" % (
+            self.definition_hits, self.definition_misses))
+
     def create_subcomponent_table(self, classes, table_num,
                                   subcomponent_name=None):
-
-        print "into create_subcomponent"
-
         if subcomponent_name:
-            self.text += """
-        <section><h1>"""+subcomponent_name+"""</h1>"""
+            self._write("""
+        <section><h1>"""+subcomponent_name+"""</h1>""")
             # Check if there is a header file to include here
             fname = os.path.join(
                 INCLUDE_FOLDER,
@@ -92,7 +230,7 @@ class OwlSpecification(object):
                 subcomponent_name.split(" ")[0].lower()+".html")
             if os.path.isfile(fname):
                 fid = open(fname, "r")
-                self.text += fid.read()
+                self._write(fid.read())
                 fid.close()
 
         else:
@@ -101,7 +239,7 @@ class OwlSpecification(object):
         # Did not find how to handle table numbering and ids with Respec as we
         # did for figures?
         table_id = "prov-mapping-"""+subcomponent_name.lower()
-        self.text += """
+        self._write("""
         <div style="text-align: left;">
             <table class="thinborder" \
             style="margin-left: auto; margin-right: auto;">
@@ -116,11 +254,11 @@ class OwlSpecification(object):
                         <th align="center"><b>PROV type</b></th>
                         <th align="center"><b>Identifier</b></th>
                     </tr>
-        """
+        """)
 
-        self.text += """
+        self._write("""
         <!-- HERE ------------- Beginning of PROV Entities ------------- -->
-        """
+        """)
 
         for prov_class in list([
                 PROV['Activity'],
@@ -128,53 +266,49 @@ class OwlSpecification(object):
                 PROV['Agent']]):
             sorted_classes = classes[prov_class]
             for class_uri in sorted_classes:
-                self.text += """
+                self._write("""
                         <tr>
                             <td>"""+self.term_link(class_uri)+"""
                             </td>
-                    """
+                    """)
 
                 # First iteration
                 if class_uri is sorted_classes[0]:
-                    self.text += """
-                                <td rowspan=\""""+str(len(sorted_classes)) + \
-                        """\" style="text-align: center;"> """ + \
-                        self.owl.get_label(prov_class) + \
-                        """</td>
+                    self._write(
                         """
+                                <td rowspan=\""""+str(len(sorted_classes)) +
+                        """\" style="text-align: center;"> """ +
+                        self._label(prov_class) +
+                        """</td>
+                        """)
 
-                self.text += """
-                                <td>"""+self.owl.graph.qname(class_uri) + \
-                             """</td>
+                self._write(
+                    """
+                                <td>"""+self._qname(class_uri) +
+                    """</td>
                             </tr>
-                """
+                """)
 
-        self.text += """
+        self._write("""
                 </tbody>
                 </table>
-            </div>"""
+            </div>""")
 
     def create_title(self, title, id=None):
-
-        print "into create_title"
-
         if id is None:
-            self.text += """
+            self._write("""
         <section>
-        """
+        """)
         else:
-            self.text += """
+            self._write("""
         <section id=\""""+id+"""\">
-        """
-        self.text += """
+        """)
+        self._write("""
             <h1>"""+title+"""</h1>
-        """
+        """)
         self.section_open += 1
 
     def _format_markdown(self, text):
-
-        print "into _format_markdown"
-
         # Replace links specified in markdown by html
         text = markdown2.markdown(text).replace("<p>", "").replace("</p>", "")
         # Remove trailing new line
@@ -182,9 +316,29 @@ class OwlSpecification(object):
         return text
 
     def format_definition(self, definition):
-
-        print "into format_definition"
-
+        if definition in self._definitions_html:
+            self.definition_hits += 1
+            # Move to the end (most recently used)
+            html = self._definitions_html.pop(definition)
+        else:
+            self.definition_misses += 1
+            html = self._render_definition(definition)
+            if len(self._definitions_html) >= DEFINITION_CACHE_SIZE:
+                self._definitions_html.popitem(last=False)
+        self._definitions_html[definition] = html
+
+        return html
+
+    def prerender_definitions(self, definitions):
+        """ Render a batch of definitions ahead of time so that subsequent
+        calls to format_definition are cache hits"""
+        for definition in set(definitions):
+            if definition not in self._definitions_html and \
+                    len(self._definitions_html) < DEFINITION_CACHE_SIZE:
+                self._definitions_html[definition] = \
+                    self._render_definition(definition)
+
+    def _render_definition(self, definition):
         # Capitalize first letter, format markdown and end with dot
         if definition:
             definition = definition[0].upper() + definition[1:]
@@ -194,13 +348,10 @@ class OwlSpecification(object):
         return definition
 
     def linked_listing(self, uri_list, prefix="", suffix="", sort=True):
-
-        print "into linked_listing"
-
         linked_listing = prefix
 
         if sort:
-            uri_list = self.owl.sorted_by_labels(uri_list)
+            uri_list = self._sorted_by_labels(uri_list)
 
         for i, uri in enumerate(uri_list):
             if i == 0:
@@ -214,17 +365,14 @@ class OwlSpecification(object):
         return linked_listing+suffix
 
     def term_link(self, term_uri, tag="a", text=None):
-
-        print "into term_link"
-
         href = ""
         if self.owl.is_external_namespace(term_uri):
             href = " href =\""+str(term_uri)+"\""
 
         if text is None:
-            text = self.owl.get_label(term_uri)
+            text = self._label(term_uri)
 
-        term_link = "<" + tag + " title=\"" + self.owl.get_name(term_uri) + \
+        term_link = "<" + tag + " title=\"" + self._name(term_uri) + \
                     "\"" + href + ">" + text+"</"+tag+">"
 
         # # This could be handled by Respec, here we overwrite the id and href
@@ -262,124 +410,114 @@ class OwlSpecification(object):
                              derived_from=None, attributed_to=None,
                              children=False,
                              is_range=False):
-        class_label = self.owl.get_label(class_uri)
-        class_name = self.owl.get_name(class_uri)
+        class_label = self._label(class_uri)
+        class_name = self._name(class_uri)
 
         definition = self.format_definition(definition)
 
-        print "into create_class_section"
-
-        self.text += """
+        self._write("""
             <!-- """+class_label+""" ("""+class_name+""")"""+""" -->
             <section id="section-"""+class_label+"""">
                 <h1 label=\""""+class_name+"""\">"""+class_label+"""</h1>
                 <div class="glossary-ref">
-                    """+self.term_link(class_uri, "dfn") + ": " + definition
+                    """+self.term_link(class_uri, "dfn") + ": " + definition)
 
-        self.text += "<p> "+self.term_link(class_uri)+" is"
+        self._write("<p> "+self.term_link(class_uri)+" is")
 
-        nidm_class = self.owl.get_nidm_parent(class_uri)
+        nidm_class = self._nidm_parent(class_uri)
         if nidm_class:
-            self.text += " a "+self.term_link(nidm_class)
+            self._write(" a "+self.term_link(nidm_class))
         else:
-            prov_class = self.owl.get_prov_class(class_uri)
+            prov_class = self._prov_class(class_uri)
             if prov_class:
-                self.text += " a "+self.owl.get_label(prov_class)
+                self._write(" a "+self._label(prov_class))
 
         found_used_by = False
         if used_by:
             if class_uri in used_by:
-                self.text += self.linked_listing(used_by[class_uri],
-                                                 " used by ")
+                self._write(self.linked_listing(used_by[class_uri],
+                                                " used by "))
                 found_used_by = True
-            used_entities = list()
-
-            for used_entity, used_activities in used_by.items():
-                for used_act in used_activities:
-                    if used_act == class_uri:
-                        used_entities.append(used_entity)
+            used_entities = self._reverse_index(used_by, many=True).get(
+                class_uri)
             if used_entities:
-                self.text += self.linked_listing(used_entities,
-                                                 " that uses ",
-                                                 " entities")
+                self._write(self.linked_listing(used_entities,
+                                                " that uses ",
+                                                " entities"))
 
         found_attr_to = False
         if attributed_to:
             if class_uri in attributed_to:
                 if found_used_by:
-                    self.text += " and "
-                self.text += self.linked_listing(attributed_to[class_uri],
-                                                 " attributed to ")
+                    self._write(" and ")
+                self._write(self.linked_listing(attributed_to[class_uri],
+                                                " attributed to "))
                 found_attr_to = True
 
         found_generated_by = False
         if generated_by:
             if class_uri in generated_by:
                 if found_used_by or found_generated_by:
-                    self.text += " and "
+                    self._write(" and ")
 
-                self.text += self.linked_listing(
-                    list([generated_by[class_uri]]), " generated by ")
+                self._write(self.linked_listing(
+                    list([generated_by[class_uri]]), " generated by "))
 
                 found_generated_by = True
 
-            if class_uri in generated_by.values():
-                generated_entities = list()
-                for generated_entity, generated_act in generated_by.items():
-                    if generated_act == class_uri:
-                        generated_entities.append(generated_entity)
-
-                if generated_entities:
-                    self.text += self.linked_listing(
-                        generated_entities,
-                        ". This activity generates ", " entities")
+            generated_entities = self._reverse_index(generated_by).get(
+                class_uri)
+            if generated_entities:
+                self._write(self.linked_listing(
+                    generated_entities,
+                    ". This activity generates ", " entities"))
 
         if derived_from:
             if class_uri in derived_from:
                 if found_used_by or found_generated_by or found_attr_to:
-                    self.text += " and "
+                    self._write(" and ")
 
-                self.text += self.linked_listing(
-                    list([derived_from[class_uri]]), " derived from ")
+                self._write(self.linked_listing(
+                    list([derived_from[class_uri]]), " derived from "))
 
-        class_children = self.owl.get_direct_children(class_uri)
+        class_children = self._children(class_uri)
         if class_children:
             if found_used_by or found_generated_by or found_attr_to:
-                self.text += ". It "
+                self._write(". It ")
             else:
-                self.text += " and "
-            self.text += " has the following child"
+                self._write(" and ")
+            self._write(" has the following child")
             if len(class_children) > 1:
-                self.text += "ren"
-            self.text += ": " + \
-                         self.linked_listing(class_children)
+                self._write("ren")
+            self._write(": " + self.linked_listing(class_children))
 
-        self.text += "."
-        self.text += "</p>"
+        self._write(".")
+        self._write("</p>")
 
         range_classes = list()
 
-        self.text += """
-                </div>"""
+        self._write("""
+                </div>""")
 
         if attributes and (attributes != set([CRYPTO['sha512']])):
-            self.text += """
+            self._write(
+                """
                 <p></p>
-                <div class="attributes" id="attributes-"""+class_label + \
-                """"> A """ + \
+                <div class="attributes" id="attributes-"""+class_label +
+                """"> A """ +
                 self.term_link(class_uri)+""" has attributes:
                 <ul>
-                    <li><span class="attribute" id=\"""" + \
+                    <li><span class="attribute" id=\"""" +
                 class_label+""".label">rdfs:label</span>: \
-                    (<em class="rfc2119" title="OPTIONAL">OPTIONAL</em>) """\
-            """Human readable description of the """ + \
-                self.term_link(class_uri)+""".</li>"""
+                    (<em class="rfc2119" title="OPTIONAL">OPTIONAL</em>) """
+                """Human readable description of the """ +
+                self.term_link(class_uri)+""".</li>""")
 
             for att in sorted(attributes):
 
                 # Do not display prov relations as attributes
                 # (except prov:atLocation...)
-                if not self.owl.is_prov(att) or (att == PROV['atLocation']):
+                if not self._is_prov(att) or (att == PROV['atLocation']):
                     if att not in self.attributes_done:
                         # First definition of this attribute
                         att_tag = "dfn"
@@ -389,18 +527,19 @@ class OwlSpecification(object):
                     self.attributes_done.add(att)
 
                     # if att_label.startswith("nidm:"):
-                    att_def = self.owl.get_definition(att)
-                    self.text += """
-                        <li>"""+self.term_link(att, att_tag) + \
-                        '</span>: (<em class="rfc2119" title="OPTIONAL">' + \
-                        'OPTIONAL</em>) ' + self.format_definition(att_def)
+                    att_def = self._definition(att)
+                    self._write(
+                        """
+                        <li>"""+self.term_link(att, att_tag) +
+                        '</span>: (<em class="rfc2119" title="OPTIONAL">' +
+                        'OPTIONAL</em>) ' + self.format_definition(att_def))
 
                     if att in self.owl.parent_ranges:
                         child_ranges = list()
                         for parent_range in self.owl.parent_ranges[att]:
-                            child_ranges += self.owl.get_direct_children(
+                            child_ranges += self._children(
                                 parent_range)
-                            if self.owl.get_label(parent_range).\
+                            if self._label(parent_range).\
                                     startswith('nidm'):
                                 range_classes.append(parent_range)
                         child_ranges = sorted(child_ranges)
@@ -412,98 +551,90 @@ class OwlSpecification(object):
                             child_range_txt = self.linked_listing(
                                 child_ranges, " such as ")
 
-                        self.text += self.linked_listing(
+                        self._write(self.linked_listing(
                             self.owl.parent_ranges[att],
-                            " (range ", child_range_txt+")")
-                        self.text += "."
+                            " (range ", child_range_txt+")"))
+                        self._write(".")
 
-                        self.text += "</li>"
+                        self._write("</li>")
 
-            self.text += """
+            self._write("""
                 </ul>
-                </div>"""
+                </div>""")
 
         BASE_REPOSITORY = "https://raw.githubusercontent.com/" + \
             "incf-nidash/nidm/master/"
         for title, example in self.owl.get_example(class_uri, BASE_REPOSITORY):
-            self.text += """
+            self._write(
+                """
                 </ul>
                 </div>
-                <pre class='example highlight' title=\""""+title+"""\">""" + \
-                cgi.escape(example) + """</pre>"""
+                <pre class='example highlight' title=\""""+title+"""\">""" +
+                cgi.escape(example) + """</pre>""")
 
         # For object property list also children (in sub-sections)
         if children:
-            direct_children = self.owl.sorted_by_labels(
-                self.owl.get_direct_children(class_uri))
+            direct_children = self._sorted_by_labels(
+                self._children(class_uri))
             for child in direct_children:
-                if not child in self.already_defined_classes:
+                if child not in self.already_defined_classes:
                     self.create_class_section(
                         child,
-                        self.owl.get_definition(child),
+                        self._definition(child),
                         self.owl.attributes.setdefault(child, None),
                         children=True)
-                    self.already_defined_classes.append(child)
+                    self.already_defined_classes.add(child)
 
         # Display individuals
-        individuals = self.owl.sorted_by_labels(
-            self.owl.get_individuals(class_uri))
+        individuals = self._sorted_by_labels(
+            self._individuals(class_uri))
         if individuals:
-            self.text += \
-                " Examples of "+self.term_link(class_uri)+" includes " + \
-                "<ul>"
+            self._write(
+                " Examples of "+self.term_link(class_uri)+" includes " +
+                "<ul>")
 
             for indiv in individuals:
-                self.text += "<li>" + self.term_link(indiv, "dfn") + ": " + \
-                             self.format_definition(
-                                 self.owl.get_definition(indiv)) + \
-                             "</li>"
+                self._write("<li>" + self.term_link(indiv, "dfn") + ": " +
+                            self.format_definition(
+                                self._definition(indiv)) +
+                            "</li>")
 
-            self.text += "</ul>"
+            self._write("</ul>")
 
         if is_range:
-            self.text += """
-                </section>"""
+            self._write("""
+                </section>""")
 
-        for range_name in self.owl.sorted_by_labels(range_classes):
-            if not range_name in self.already_defined_classes:
-                self.already_defined_classes.append(range_name)
+        for range_name in self._sorted_by_labels(range_classes):
+            if range_name not in self.already_defined_classes:
+                self.already_defined_classes.add(range_name)
                 self.create_class_section(
                     range_name,
-                    self.owl.get_definition(range_name),
+                    self._definition(range_name),
                     self.owl.attributes.setdefault(range_name, None),
                     children=True, is_range=True)
 
         if not is_range:
-            self.text += """
-                </section>"""
+            self._write("""
+                </section>""")
 
     def close_sections(self):
-
-        print "into close_sections"
-
         for x in range(0, self.section_open):
-            self.text += "\t"*x+"</section>\n"
+            self._write("\t"*x+"</section>\n")
 
     # Write out specification
     def write_specification(self, spec_file=None, component=None,
                             version=None):
 
-        print "into write_specification"
-
-
         if component and version:
             spec_file = os.path.join(DOC_FOLDER, component+"_"+version+".html")
 
         spec_open = codecs.open(spec_file, 'w', "utf-8")
-        spec_open.write(self.text)
+        spec_open.writelines(self._fragments)
         spec_open.close()
 
     def _header_footer(self, prev_file=None, follow_file=None, component=None,
                        version=None):
-
-        print "into _header_footer"
-
         release_notes = None
         if component:
             prev_file = os.path.join(
@@ -525,13 +656,13 @@ class OwlSpecification(object):
 
         if prev_file is not None:
             prev_file_open = open(prev_file, 'r')
-            self.text = prev_file_open.read().decode('utf-8')+self.text
+            self._fragments.insert(0, prev_file_open.read().decode('utf-8'))
             prev_file_open.close()
         if release_notes is not None:
             release_note_open = open(release_notes, 'r')
-            self.text = self.text+release_note_open.read()
+            self._write(release_note_open.read())
             release_note_open.close()
         if follow_file is not None:
             follow_file_open = open(follow_file, 'r')
-            self.text = self.text+follow_file_open.read()
+            self._write(follow_file_open.read())
             follow_file_open.close()
@@ -1,14 +1,28 @@
 """
 Re-generate examples (based on templates), specification documents (based on
 owl files) and term README (based on owl files)
+
+Usage: python refresh.py [--incremental]
+
+With --incremental, only the outputs whose inputs (owl files, imports,
+templates, included HTML, generator scripts) changed since the last refresh
+are re-built. The content hashes of the inputs and outputs of each step are
+stored in .refresh_state.json at the root of the repository.
+
 @author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
 @copyright: University of Warwick 2015
 """
 
 import os
 import sys
+import glob
+import json
+import hashlib
+import argparse
+import logging
 
 REL_PATH = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(REL_PATH)
 NIDM_PATH = os.path.join(REL_PATH, os.pardir, "nidm")
 
 # Adding nidm-results/scripts and nidm-experiment/scripts to the path
@@ -25,27 +39,197 @@ import create_results_specification
 import UpdateTermReadme
 import UpdateExampleReadmes
 import recompute_all_ex
+import create_example_from_templates
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = os.path.join(REPO_ROOT, ".refresh_state.json")
+
+# Inputs and outputs are globs relative to the root of the repository
+RESULTS = os.path.join("nidm", "nidm-results")
+EXPE = os.path.join("nidm", "nidm-experiment")
+RESULTS_OWL = [os.path.join(RESULTS, "terms", "nidm-results.owl"),
+               os.path.join("nidm", "imports", "*.ttl")]
+EXPE_OWL = [os.path.join(EXPE, "terms", "nidm-experiment.owl"),
+            os.path.join(EXPE, "imports", "*.ttl")]
+RESULTS_EXAMPLES = [
+    os.path.join(RESULTS, "spm", "*.ttl"),
+    os.path.join(RESULTS, "spm", "*", "*.ttl"),
+    os.path.join(RESULTS, "fsl", "*.ttl"),
+    os.path.join(RESULTS, "fsl", "*", "*.ttl"),
+    os.path.join(RESULTS, "afni", "*", "*.ttl"),
+    os.path.join(RESULTS, "test", "ground_truth", "*", "*.ttl")]
+SPECS = os.path.join("doc", "content", "specs")
+
+
+def _script(module):
+    return os.path.relpath(
+        os.path.abspath(module.__file__).replace(".pyc", ".py"), REPO_ROOT)
+
+
+class RefreshStep(object):
+    """ One step of the refresh with the files it reads and writes"""
+
+    def __init__(self, name, run, inputs, outputs=None):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs or list()
+
+    def files(self, patterns):
+        files = set()
+        for pattern in patterns:
+            files.update(
+                os.path.relpath(f, REPO_ROOT)
+                for f in glob.glob(os.path.join(REPO_ROOT, pattern)))
+        return files
+
+    def build(self):
+        """ Run step and return the files it actually read and wrote"""
+        self.run()
+        return self.files(self.inputs), self.files(self.outputs)
+
+
+class ExampleStep(RefreshStep):
+    """ Example generator: the templates read and examples written are only
+    known after the generator ran"""
+
+    def build(self):
+        create_example_from_templates.templates_read.clear()
+        create_example_from_templates.files_written.clear()
+
+        inputs, outputs = super(ExampleStep, self).build()
+
+        inputs.update(os.path.relpath(f, REPO_ROOT) for f in
+                      create_example_from_templates.templates_read)
+        outputs.update(os.path.relpath(f, REPO_ROOT) for f in
+                       create_example_from_templates.files_written)
+        return inputs, outputs
 
 
-def main():
+def get_steps():
+    example_lib = [_script(create_example_from_templates),
+                   os.path.join("scripts", "Constants.py"),
+                   os.path.join(RESULTS, "terms", "nidmr.json"),
+                   os.path.join(RESULTS, "terms", "prefixes.csv")] + \
+        RESULTS_OWL
+
+    steps = list()
     # --- NIDM-Experiment
     # Update terms README
-    UpdateExpTermReadme.main()
+    steps.append(RefreshStep(
+        "NIDM-Experiment terms README", UpdateExpTermReadme.main,
+        [_script(UpdateExpTermReadme), EXPE_OWL[0]],
+        [os.path.join(EXPE, "terms", "README.md")]))
     # --- NIDM-Results
-    # Create a JSON-LD context for NIDM-Results
-    create_nidmr_context.main()
+    # Update csv file of preferred prefixes
+    steps.append(RefreshStep(
+        "Preferred prefixes", create_prefixes.main,
+        [_script(create_prefixes)] + RESULTS_OWL,
+        [os.path.join(RESULTS, "terms", "prefixes.csv")]))
+    # Create a JSON-LD context for NIDM-Results (from the preferred prefixes)
+    steps.append(RefreshStep(
+        "NIDM-Results JSON-LD context", create_nidmr_context.main,
+        [_script(create_nidmr_context),
+         os.path.join(RESULTS, "terms", "prefixes.csv")] + RESULTS_OWL,
+        [os.path.join(RESULTS, "terms", "nidmr.json")]))
     # Re-create turtle examples from template
-    recompute_all_ex.main()
+    for generator in recompute_all_ex.GENERATORS:
+        steps.append(ExampleStep(
+            "Example " + generator.__name__, generator.main,
+            [_script(generator)] + example_lib))
     # Convert turtle to provn and upload to Prov Store
-    UpdateExampleReadmes.main()
+    steps.append(RefreshStep(
+        "Prov Store links", UpdateExampleReadmes.main,
+        [_script(UpdateExampleReadmes)] + RESULTS_EXAMPLES,
+        [os.path.join(os.path.dirname(f), "README.md")
+         for f in RESULTS_EXAMPLES]))
     # Update terms README
-    UpdateTermReadme.main()
+    steps.append(RefreshStep(
+        "NIDM-Results terms README", UpdateTermReadme.main,
+        [_script(UpdateTermReadme), RESULTS_OWL[0]],
+        [os.path.join(RESULTS, "terms", "README.md")]))
     # Update specifications
-    create_results_specification.main("dev")
-    create_expe_specification.main()
-    # Update csv file of preferred prefixes
-    create_prefixes.main()
+    spec_lib = [os.path.join("scripts", "owl_to_webpage.py")]
+    steps.append(RefreshStep(
+        "NIDM-Results specification",
+        lambda: create_results_specification.main("dev"),
+        [_script(create_results_specification),
+         os.path.join(RESULTS, "terms", "nidm-results_dev_notes.html"),
+         os.path.join(RESULTS, "terms", "examples", "*.txt"),
+         os.path.join(SPECS, "include", "nidm-results*.html"),
+         os.path.join(SPECS, "include", "nidm_results*.html")] +
+        RESULTS_OWL + spec_lib,
+        [os.path.join(SPECS, "nidm-results_dev.html")]))
+    steps.append(RefreshStep(
+        "NIDM-Experiment specification", create_expe_specification.main,
+        [_script(create_expe_specification),
+         os.path.join(SPECS, "include", "nidm-experiment*.html"),
+         os.path.join(SPECS, "include", "nidm_experiment*.html")] +
+        EXPE_OWL + spec_lib,
+        [os.path.join(SPECS, "nidm-experiment_dev.html")]))
+    return steps
+
+
+def _hash(relpath):
+    path = os.path.join(REPO_ROOT, relpath)
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as fid:
+        return hashlib.sha1(fid.read()).hexdigest()
+
+
+def _hashes(files):
+    return dict((f, _hash(f)) for f in files)
+
+
+def is_stale(step, step_state):
+    if step_state is None:
+        return True
+    # New input files (e.g. an additional import)
+    if not step.files(step.inputs).issubset(step_state["inputs"]):
+        return True
+    # Modified inputs or outputs (including outputs edited by hand)
+    for recorded in (step_state["inputs"], step_state["outputs"]):
+        for relpath, sha in recorded.items():
+            if _hash(relpath) != sha:
+                return True
+    return False
+
+
+def load_state():
+    if os.path.isfile(STATE_FILE):
+        with open(STATE_FILE, 'r') as fid:
+            return json.load(fid)
+    return dict()
+
+
+def save_state(state):
+    with open(STATE_FILE, 'w') as fid:
+        json.dump(state, fid, indent=2, sort_keys=True)
+
+
+def main(incremental=False):
+    state = load_state()
+
+    for step in get_steps():
+        if incremental and not is_stale(step, state.get(step.name)):
+            logger.info("Up to date: " + step.name)
+            continue
+
+        logger.info("Building: " + step.name)
+        inputs, outputs = step.build()
+        # Save after each step so that an interrupted refresh is resumed
+        state[step.name] = dict(inputs=_hashes(inputs),
+                                outputs=_hashes(outputs))
+        save_state(state)
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(
+        description="Re-generate NIDM examples, specifications and READMEs")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-build outputs with modified inputs")
+    args = parser.parse_args()
+
+    main(args.incremental)
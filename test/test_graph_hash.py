@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+'''Test that canonical hashes and diffs of NIDM documents agree with
+rdflib.compare
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+import unittest
+import os
+import sys
+import glob
+from rdflib import BNode, Literal, URIRef
+from rdflib.graph import Graph
+from rdflib.compare import to_isomorphic, graph_diff
+
+RELPATH = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(RELPATH)
+
+sys.path.append(os.path.join(REPO_ROOT, "scripts"))
+import graph_hash
+
+EXAMPLES = sorted(
+    glob.glob(os.path.join(REPO_ROOT, "nidm", "nidm-results", "spm", "*",
+                           "*.ttl")) +
+    glob.glob(os.path.join(REPO_ROOT, "nidm", "nidm-results", "fsl", "*",
+                           "*.ttl")))
+
+EX = "http://example.org/"
+
+
+def _relabelled(graph):
+    """ Copy of graph with new blank nodes"""
+    bnodes = dict()
+    copy = Graph()
+    for triple in graph:
+        copy.add(tuple(bnodes.setdefault(node, BNode())
+                       if isinstance(node, BNode) else node
+                       for node in triple))
+    return copy
+
+
+class TestGraphHash(unittest.TestCase):
+
+    def test_examples(self):
+        for example in EXAMPLES:
+            graph = Graph()
+            graph.parse(example, format='turtle')
+            copy = _relabelled(graph)
+            self.assertEqual(graph_hash.canonical_hash(graph),
+                             graph_hash.canonical_hash(copy), example)
+            self.assertEqual(graph_hash.document_hash(example),
+                             graph_hash.canonical_hash(copy), example)
+
+            # Change the value attached to a blank node
+            bnode_triple = next(triple for triple in copy
+                                if isinstance(triple[0], BNode))
+            copy.remove(bnode_triple)
+            copy.add(bnode_triple[:2] + (Literal("changed"),))
+            self.assertNotEqual(graph_hash.canonical_hash(graph),
+                                graph_hash.canonical_hash(copy), example)
+
+            in_both, in_first, in_second = graph_hash.graph_diff(graph, copy)
+            iso_both, iso_first, iso_second = graph_diff(
+                to_isomorphic(graph), to_isomorphic(copy))
+            self.assertEqual((len(in_both), len(in_first), len(in_second)),
+                             (len(iso_both), len(iso_first), len(iso_second)))
+            self.assertEqual(to_isomorphic(in_first), to_isomorphic(iso_first))
+
+    def test_indistinguishable_bnodes(self):
+        # Blank nodes with the same neighbourhood need the full
+        # canonicalisation
+        graph = Graph()
+        for value in (1, 2):
+            for bnode in (BNode(), BNode()):
+                graph.add((URIRef(EX + "a"), URIRef(EX + "p"), bnode))
+                graph.add((bnode, URIRef(EX + "q"), Literal(value)))
+        bnode = BNode()
+        graph.add((URIRef(EX + "b"), URIRef(EX + "p"), bnode))
+        graph.add((bnode, URIRef(EX + "p"), bnode))
+
+        self.assertIsNone(graph_hash.bnode_labels(list(graph)))
+        self.assertEqual(graph_hash.canonical_hash(graph),
+                         graph_hash.canonical_hash(_relabelled(graph)))
+        in_both, in_first, in_second = graph_hash.graph_diff(
+            graph, _relabelled(graph))
+        self.assertEqual((len(in_both), len(in_first), len(in_second)),
+                         (len(graph), 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+'''Test that ontologies read from the on-disk cache match the turtle sources
+
+@author: Camille Maumet <c.m.j.maumet@warwick.ac.uk>
+@copyright: University of Warwick 2017
+'''
+import unittest
+import os
+import sys
+import glob
+import shutil
+import tempfile
+from rdflib.compare import isomorphic
+
+RELPATH = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(RELPATH)
+
+sys.path.append(os.path.join(REPO_ROOT, "scripts"))
+import owl_cache
+
+OWL_FILE = os.path.join(
+    REPO_ROOT, "nidm", "nidm-results", "terms", "nidm-results.owl")
+IMPORT_FILES = sorted(glob.glob(os.path.join(REPO_ROOT, "nidm", "imports",
+                                             "*.ttl")))
+
+
+class TestOwlCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        os.environ["NIDM_OWL_CACHE"] = self.cache_dir
+
+    def tearDown(self):
+        del os.environ["NIDM_OWL_CACHE"]
+        shutil.rmtree(self.cache_dir)
+
+    def test_warm_load_matches_parse(self):
+        parsed = owl_cache._parse_graph(OWL_FILE, IMPORT_FILES)
+
+        cold = owl_cache.load_graph(OWL_FILE, IMPORT_FILES)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        warm = owl_cache.load_graph(OWL_FILE, IMPORT_FILES)
+
+        self.assertTrue(isomorphic(parsed, cold))
+        self.assertTrue(isomorphic(parsed, warm))
+        self.assertEqual(sorted(parsed.namespaces()),
+                         sorted(warm.namespaces()))
+
+    def test_key_depends_on_imports(self):
+        self.assertNotEqual(
+            owl_cache.ontology_key(OWL_FILE),
+            owl_cache.ontology_key(OWL_FILE, IMPORT_FILES))
+
+if __name__ == '__main__':
+    unittest.main()
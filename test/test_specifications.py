@@ -9,6 +9,9 @@ import os
 import sys
 import difflib
 import logging
+import json
+import shutil
+import tempfile
 
 RELPATH = os.path.dirname(os.path.abspath(__file__))
 REPO_ROOT = os.path.dirname(RELPATH)
@@ -20,7 +23,8 @@ sys.path.append(script_path)
 script_path = os.path.join(REPO_ROOT, "nidm", "nidm-experiment", "scripts")
 sys.path.append(script_path)
 
-from create_results_specification import main as create_res_spec
+from create_results_specification import main as create_res_spec, \
+    released_versions, build_all
 from create_expe_specification import main as create_expe_spec
 
 logging.basicConfig(filename='debug.log', level=logging.DEBUG, filemode='w')
@@ -54,6 +58,41 @@ class TestSpecifications(unittest.TestCase):
     #     self._run(component, create_res_spec, "create_results_specification",
     #               "1.1.0")
 
+    def test_released_versions(self):
+        self.assertEqual(released_versions(), ["0.2.0", "1.1.0", "1.3.0"])
+
+    def test_build_all(self):
+        # dev and a released version (0.2.0 has no remote examples) built in
+        # two processes, in a temporary directory
+        versions = ["0.2.0", "dev"]
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            manifest_file = os.path.join(tmp_dir, "manifest.json")
+            manifest = build_all(versions, jobs=2,
+                                 manifest_file=manifest_file,
+                                 spec_dir=tmp_dir)
+            with open(manifest_file, 'r') as fid:
+                self.assertEqual(json.load(fid), manifest)
+            specs = dict()
+            for build in manifest["builds"]:
+                with open(build["file"], 'r') as fid:
+                    specs[build["version"]] = fid.read()
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertEqual(manifest["jobs"], 2)
+        self.assertEqual(
+            [(build["version"], build["status"], build["error"])
+             for build in manifest["builds"]],
+            [(version, "ok", None) for version in versions])
+        # Same dev specification as the one built on its own (the released
+        # specifications in doc/content/specs predate the script)
+        self.assertEqual(specs["dev"],
+                         self._get_spec_txt("nidm-results", None, "dev"))
+        self.assertNotIn("(under development)", specs["0.2.0"])
+        self.assertIn("0.2.0", specs["0.2.0"])
+        self.assertIn("nidm-results_010.html", specs["0.2.0"])
+
     def test_nidm_experiment(self):
         component = "nidm-experiment"
         self._run(component, create_expe_spec, "create_expe_specification")